@@ -0,0 +1,511 @@
+"""JSON-API unter ``/api/v1`` (z.B. für den Abgleich mit dem LMS).
+
+Lesen:
+    GET /api/v1/<art>?cursor=…&limit=…&fields=id,text    Liste (art: questions, topics, tests)
+    GET /api/v1/<art>/<id>?fields=…                       ein Eintrag
+    GET /api/v1/export/<art>.ndjson                       alles, eine JSON-Zeile pro Eintrag
+
+Schreiben (ein Request = eine Transaktion, bei einem Fehler wird nichts
+geschrieben):
+    POST /api/v1/<art>                   {"items": [...]} – mit "id" ändern
+                                         (nur die angegebenen Felder), ohne anlegen
+    PUT  /api/v1/tests/<id>/questions    {"question_ids": [...]}
+
+Geblättert wird mit einem Cursor statt Seitennummern: ``next_cursor`` der
+Antwort ist ``cursor`` des nächsten Aufrufs. Jede Seite ist ein
+Index-Zugriff ab der letzten ID, egal wie weit hinten sie liegt.
+
+Ist ``API_TOKEN`` gesetzt, braucht jeder Request den Header
+``Authorization: Bearer <token>``.
+"""
+import hmac
+import json
+import sqlite3
+
+from flask import Blueprint, current_app, g, jsonify, request, stream_with_context
+
+import assignments
+import database
+import jobs
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Zeilen pro Block beim NDJSON-Export (fetchmany)
+EXPORT_BATCH = 500
+
+
+class ApiError(Exception):
+    """Fehler, der als JSON ``{"error": …, "details": […]}`` beantwortet wird."""
+
+    def __init__(self, message, status=400, details=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+# --- Prüfung der Eingabefelder --------------------------------------------
+# Jede Funktion gibt den bereinigten Wert zurück oder wirft ValueError.
+
+def _text(value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError("muss ein nicht-leerer Text sein")
+    return value.strip()
+
+
+def _optional_text(value):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError("muss Text oder null sein")
+    return value.strip()
+
+
+def _integer(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("muss eine ganze Zahl sein")
+    return value
+
+
+def _difficulty(value):
+    value = _integer(value)
+    if not 1 <= value <= 5:
+        raise ValueError("muss zwischen 1 und 5 liegen")
+    return value
+
+
+def _points(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError("muss eine Zahl >= 0 sein")
+    return float(value)
+
+
+def _flag(value):
+    if value not in (True, False, 0, 1):
+        raise ValueError("muss true/false sein")
+    return int(value)
+
+
+def _id_list(value):
+    if not isinstance(value, list):
+        raise ValueError("muss eine Liste von IDs sein")
+    return [_integer(v) for v in value]
+
+
+# Ressourcen der API.
+# fields:   Name -> SQL-Ausdruck für SELECT. Nur diese Namen sind in ?fields=…
+#           erlaubt und landen so im SQL.
+# filters:  Felder, nach denen Listen und Export gefiltert werden können
+# writable: Name -> Prüffunktion; required: Pflichtfelder beim Anlegen;
+#           defaults: Werte für fehlende Felder beim Anlegen
+RESOURCES = {
+    "questions": {
+        "fields": {
+            "id": "id",
+            "text": "text",
+            "topic_id": "topic_id",
+            "difficulty": "difficulty",
+            "points": "points",
+            "solution": "solution",
+            "is_active": "is_active",
+            "created_at": "created_at",
+            "updated_at": "updated_at",
+        },
+        "filters": ("topic_id", "difficulty"),
+        "writable": {
+            "text": _text,
+            "topic_id": _integer,
+            "difficulty": _difficulty,
+            "points": _points,
+            "solution": _optional_text,
+            "is_active": _flag,
+        },
+        "required": ("text", "topic_id"),
+        "defaults": {"difficulty": 1, "points": 1.0, "solution": None, "is_active": 1},
+    },
+    "topics": {
+        "fields": {
+            "id": "id",
+            "name": "name",
+            "description": "description",
+        },
+        "filters": (),
+        "writable": {
+            "name": _text,
+            "description": _optional_text,
+        },
+        "required": ("name",),
+        "defaults": {"description": None},
+    },
+    "tests": {
+        "fields": {
+            "id": "id",
+            "name": "name",
+            "date": "date",
+            "notes": "notes",
+            "version": "version",
+            # Fragen in Testreihenfolge als JSON-Array (eine Unterabfrage pro Test)
+            "question_ids": """(
+                SELECT json_group_array(question_id) FROM (
+                    SELECT question_id FROM test_questions
+                    WHERE test_id = tests.id
+                    ORDER BY position, question_id
+                )
+            )""",
+        },
+        "filters": (),
+        "writable": {
+            "name": _text,
+            "date": _optional_text,
+            "notes": _optional_text,
+            "question_ids": _id_list,
+        },
+        "required": ("name",),
+        "defaults": {"date": None, "notes": None},
+    },
+}
+
+# Felder, die nicht in der Tabelle selbst stehen
+JSON_FIELDS = {"question_ids"}
+
+
+def get_db():
+    """Verbindung des Requests – dieselbe wie ``app.get_db_connection`` (g.db)."""
+    if "db" not in g:
+        g.db = current_app.db_pool.acquire()
+    return g.db
+
+
+def get_jobs_db():
+    """Auftragsdatei des Requests – dieselbe wie ``app.get_jobs_connection`` (g.jobs_db)."""
+    if "jobs_db" not in g:
+        g.jobs_db = jobs.connect(current_app.config["JOBS_DB_PATH"])
+    return g.jobs_db
+
+
+@bp.before_request
+def check_token():
+    token = current_app.config.get("API_TOKEN")
+    if not token:
+        return None
+    given = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+        return jsonify({"error": "Nicht autorisiert"}), 401
+    return None
+
+
+@bp.errorhandler(ApiError)
+def handle_api_error(error):
+    body = {"error": error.message}
+    if error.details is not None:
+        body["details"] = error.details
+    return jsonify(body), error.status
+
+
+def _resource(kind):
+    if kind not in RESOURCES:
+        raise ApiError(f"Unbekannte Art '{kind}'", 404)
+    return RESOURCES[kind]
+
+
+def _selected_fields(resource):
+    """Felder aus ``?fields=…`` (Standard: alle). ``id`` ist immer dabei."""
+    names = request.args.get("fields", "")
+    if not names:
+        return list(resource["fields"])
+    fields = ["id"]
+    for name in names.split(","):
+        name = name.strip()
+        if not name or name in fields:
+            continue
+        if name not in resource["fields"]:
+            raise ApiError(f"Unbekanntes Feld '{name}'")
+        fields.append(name)
+    return fields
+
+
+def _select(kind, fields):
+    resource = RESOURCES[kind]
+    columns = ", ".join(f"{resource['fields'][name]} AS {name}" for name in fields)
+    return f"SELECT {columns} FROM {kind}"
+
+
+def _filters(resource):
+    """WHERE-Teile und Parameter für die Filter aus dem Query-String."""
+    clauses, params = [], []
+    for name in resource["filters"]:
+        value = request.args.get(name)
+        if value is None or value == "":
+            continue
+        try:
+            params.append(int(value))
+        except ValueError:
+            raise ApiError(f"Filter '{name}' muss eine ganze Zahl sein")
+        clauses.append(f"{name} = ?")
+    return clauses, params
+
+
+def _row_dict(row, fields):
+    item = {}
+    for name, value in zip(fields, row):
+        item[name] = json.loads(value) if name in JSON_FIELDS else value
+    return item
+
+
+@bp.route("/<kind>")
+def list_items(kind):
+    """Eine Seite, sortiert nach ID: ``{"items": [...], "next_cursor": …}``."""
+    resource = _resource(kind)
+    fields = _selected_fields(resource)
+    limit = max(1, min(request.args.get("limit", DEFAULT_LIMIT, type=int), MAX_LIMIT))
+    cursor = request.args.get("cursor", 0, type=int)
+
+    clauses, params = _filters(resource)
+    clauses.append("id > ?")
+    rows = get_db().execute(
+        f"{_select(kind, fields)} WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?",
+        params + [cursor, limit + 1]
+    ).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+    return jsonify({
+        "items": [_row_dict(row, fields) for row in rows],
+        "next_cursor": next_cursor,
+    })
+
+
+@bp.route("/<kind>/<int:item_id>")
+def get_item(kind, item_id):
+    resource = _resource(kind)
+    fields = _selected_fields(resource)
+    row = get_db().execute(f"{_select(kind, fields)} WHERE id = ?", (item_id,)).fetchone()
+    if row is None:
+        raise ApiError("Nicht gefunden", 404)
+    return jsonify(_row_dict(row, fields))
+
+
+@bp.route("/export/<kind>.ndjson")
+def export_items(kind):
+    """Alle Einträge als NDJSON, gestreamt.
+
+    Eine einzige Abfrage, gelesen in Blöcken zu ``EXPORT_BATCH`` Zeilen:
+    der Speicherbedarf hängt nicht von der Größe der Fragenbank ab, und der
+    Export sieht einen konsistenten Stand der Datenbank.
+    """
+    resource = _resource(kind)
+    fields = _selected_fields(resource)
+    clauses, params = _filters(resource)
+    clauses.append("id > 0")
+    pool = current_app.db_pool
+
+    def generate():
+        # Eigene Verbindung: g.db geht schon vor dem ersten Block an den Pool zurück
+        with pool.connection() as conn:
+            cursor = conn.execute(
+                f"{_select(kind, fields)} WHERE {' AND '.join(clauses)} ORDER BY id",
+                params
+            )
+            try:
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH)
+                    if not rows:
+                        break
+                    yield "".join(
+                        json.dumps(_row_dict(row, fields), ensure_ascii=False) + "\n"
+                        for row in rows
+                    )
+            finally:
+                cursor.close()
+
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
+def _parse_items(resource):
+    """Einträge aus dem Request-Body prüfen: (neu, geändert) als Listen von Dicts."""
+    payload = request.get_json(silent=True)
+    items = payload.get("items") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise ApiError('Erwartet: {"items": [...]} oder eine JSON-Liste')
+    if len(items) > current_app.config["API_MAX_BATCH"]:
+        raise ApiError(f"Höchstens {current_app.config['API_MAX_BATCH']} Einträge pro Request",
+                       413)
+
+    creates, updates, errors = [], [], []
+    seen_ids = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"index": index, "error": "Eintrag muss ein Objekt sein"})
+            continue
+
+        cleaned = {}
+        for name, value in item.items():
+            if name == "id":
+                continue
+            check = resource["writable"].get(name)
+            if check is None:
+                errors.append({"index": index, "error": f"{name}: unbekanntes Feld"})
+                continue
+            try:
+                cleaned[name] = check(value)
+            except ValueError as e:
+                errors.append({"index": index, "error": f"{name}: {e}"})
+
+        if "id" in item:
+            item_id = item["id"]
+            if isinstance(item_id, bool) or not isinstance(item_id, int):
+                errors.append({"index": index, "error": "id: muss eine ganze Zahl sein"})
+            elif item_id in seen_ids:
+                errors.append({"index": index, "error": "id: mehrfach im selben Request"})
+            else:
+                seen_ids.add(item_id)
+                cleaned["id"] = item_id
+                updates.append(cleaned)
+        else:
+            missing = [name for name in resource["required"] if name not in item]
+            if missing:
+                errors.append({"index": index, "error": "Pflichtfeld fehlt: " + ", ".join(missing)})
+            creates.append(dict(resource["defaults"], **cleaned))
+
+    if errors:
+        raise ApiError("Ungültige Einträge, nichts gespeichert", details=errors[:100])
+    return creates, updates
+
+
+def _missing_ids(conn, table, ids):
+    """IDs aus ``ids``, die es in ``table`` nicht gibt (eine Abfrage über json_each)."""
+    if not ids:
+        return []
+    return [row[0] for row in conn.execute(
+        f"""
+        SELECT j.value
+        FROM json_each(?) AS j
+        WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE id = j.value)
+        """,
+        (json.dumps(sorted(set(ids))),)
+    )]
+
+
+def _check_references(conn, kind, creates, updates):
+    """Existenz geänderter Einträge und referenzierter Themen/Fragen prüfen."""
+    missing = _missing_ids(conn, kind, [item["id"] for item in updates])
+    if missing:
+        raise ApiError("Einträge nicht gefunden, nichts gespeichert", 404,
+                       details={"missing_ids": missing[:100]})
+
+    items = creates + updates
+    if kind == "questions":
+        references = ("topics", [i["topic_id"] for i in items if "topic_id" in i])
+    elif kind == "tests":
+        references = ("questions", [q for i in items for q in i.get("question_ids", ())])
+    else:
+        return
+    missing = _missing_ids(conn, *references)
+    if missing:
+        raise ApiError(f"Unbekannte Verweise auf {references[0]}, nichts gespeichert",
+                       details={"missing_ids": missing[:100]})
+
+
+@bp.route("/<kind>", methods=["POST"])
+def write_items(kind):
+    """Einträge anlegen und ändern, alles in einer Transaktion.
+
+    Antwort: ``{"created": [neue IDs in Reihenfolge], "updated": [IDs]}``.
+    """
+    resource = _resource(kind)
+    creates, updates = _parse_items(resource)
+    columns = [name for name in resource["writable"] if name not in JSON_FIELDS]
+    conn = get_db()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _check_references(conn, kind, creates, updates)
+
+        # Neue Einträge: IDs vorab vergeben, ein executemany für alle
+        first_id = database.next_id(conn, kind)
+        for offset, item in enumerate(creates):
+            item["id"] = first_id + offset
+        conn.executemany(
+            f"INSERT INTO {kind} (id, {', '.join(columns)}) "
+            f"VALUES (?{', ?' * len(columns)})",
+            [[item["id"]] + [item[name] for name in columns] for item in creates]
+        )
+
+        # Änderungen: ein executemany pro Kombination geänderter Felder
+        groups = {}
+        for item in updates:
+            names = tuple(name for name in columns if name in item)
+            if names:
+                groups.setdefault(names, []).append(item)
+        for names, group in groups.items():
+            assignments_sql = ", ".join(f"{name} = ?" for name in names)
+            if kind == "questions":
+                assignments_sql += ", updated_at = datetime('now')"
+            conn.executemany(
+                f"UPDATE {kind} SET {assignments_sql} WHERE id = ?",
+                [[item[name] for name in names] + [item["id"]] for item in group]
+            )
+
+        if kind == "tests":
+            conn.executemany(
+                "INSERT INTO test_questions (test_id, question_id, position) VALUES (?, ?, ?)",
+                [
+                    (item["id"], qid, pos)
+                    for item in creates
+                    for pos, qid in enumerate(dict.fromkeys(item.get("question_ids", ())),
+                                              start=1)
+                ]
+            )
+            for item in updates:
+                if "question_ids" in item:
+                    assignments.apply_assignment(conn, item["id"], item["question_ids"])
+
+        conn.commit()
+    except sqlite3.IntegrityError as e:
+        conn.rollback()
+        raise ApiError(f"Konflikt, nichts gespeichert: {e}", 409)
+    except BaseException:
+        conn.rollback()
+        raise
+
+    if kind == "questions" and (creates or updates):
+        # Duplikat-Index im Hintergrund nachziehen (Stapel bis API_MAX_BATCH)
+        jobs.enqueue_once(get_jobs_db(), "dedupe_index", "Neue Fragen auf Duplikate prüfen")
+        current_app.job_runner.wake()
+
+    return jsonify({
+        "created": [item["id"] for item in creates],
+        "updated": [item["id"] for item in updates],
+    })
+
+
+@bp.route("/tests/<int:test_id>/questions", methods=["PUT"])
+def put_test_questions(test_id):
+    """Fragen eines Tests setzen: ``{"question_ids": [...]}`` in Testreihenfolge."""
+    payload = request.get_json(silent=True)
+    try:
+        question_ids = _id_list(payload.get("question_ids") if isinstance(payload, dict)
+                                else None)
+    except ValueError as e:
+        raise ApiError(f"question_ids: {e}")
+
+    conn = get_db()
+    if conn.execute("SELECT 1 FROM tests WHERE id = ?", (test_id,)).fetchone() is None:
+        raise ApiError("Test nicht gefunden", 404)
+    missing = _missing_ids(conn, "questions", question_ids)
+    if missing:
+        raise ApiError("Unbekannte Fragen, nichts gespeichert",
+                       details={"missing_ids": missing[:100]})
+
+    try:
+        changes = assignments.save_assignment(conn, test_id, question_ids)
+    except sqlite3.IntegrityError as e:
+        raise ApiError(f"Konflikt, nichts gespeichert: {e}", 409)
+    return jsonify(changes)
@@ -1,34 +1,402 @@
-from flask import Flask, render_template, request, redirect, url_for
-import sqlite3
+from flask import (Blueprint, Flask, current_app, render_template, request, redirect,
+                   url_for, g, jsonify, flash, send_file, stream_template, stream_with_context)
+from jinja2 import FileSystemBytecodeCache
+import datetime
+import json
 import os
+import tempfile
+import sqlite3
+
+import api
+import archive
+import assignments
+import config
+import database
+import duplicates
+import generator
+import history
+import instrumentation
+import jobs
+import pdf_export
+import results
+import search as search_index
+import snapshots
+import tenants
+import variants
+from connection_pool import ConnectionPool
+from render_cache import RenderCache
+
+# Seitengröße für Fragenlisten (?page_size=…)
+DEFAULT_PAGE_SIZE = 50
+CATALOG_PAGE_SIZE = 200  # Druckansicht: größere Seiten
+SEARCH_PAGE_SIZE = 20
+DUPLICATES_PAGE_SIZE = 50
+HISTORY_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Gestreamte Seiten (Katalog, Vorschau) werden in Blöcken dieser Größe gesendet
+STREAM_CHUNK_CHARS = 16 * 1024
+
+# Höchstens so viele neue/geänderte Fragen pro Request nachindizieren
+# (Duplikaterkennung); größere Rückstände übernimmt der Auftrag dedupe_index
+DEDUPE_REFRESH_LIMIT = 200
+DEDUPE_JOB_TITLE = "Neue Fragen auf Duplikate prüfen"
+
+JOB_STATUS_LABELS = {
+    "queued": "wartet",
+    "running": "läuft",
+    "done": "fertig",
+    "failed": "fehlgeschlagen",
+    "cancelled": "abgebrochen",
+}
+
+bp = Blueprint("main", __name__)
+
+
+def create_app(overrides=None):
+    """WSGI-App erzeugen (Einstiegspunkt für gunicorn: ``app:create_app()``).
+
+    Einstellungen kommen aus Umgebungsvariablen (siehe ``config.py``),
+    ``overrides`` ersetzt einzelne Werte (z.B. für Skripte). Mit
+    ``TENANT_MODE`` kommt ein Verteiler zurück, der pro Mandant eine eigene
+    App mit eigener Datenbank anlegt (siehe ``tenants.py``).
+    """
+    settings = config.from_env(overrides)
+    if settings["TENANT_MODE"]:
+        return tenants.TenantDispatcher(settings, create_app)
+
+    app = Flask(__name__)
+    app.config.update(settings)
+    configure_templates(app)
+
+    # Optional: Routen und SQL messen (sonst normale sqlite3-Verbindungen)
+    connection_class = None
+    if app.config["INSTRUMENTATION"]:
+        connection_class = instrumentation.init_app(app)
+
+    # Beim ersten Start fehlt evtl. der Ordner der Datenbank (leeres Volume)
+    os.makedirs(os.path.dirname(os.path.abspath(app.config["DB_PATH"])), exist_ok=True)
+
+    # Langlebige Verbindungen statt connect/close pro Request; alte Tests
+    # (history.db) hängen als Schema "history" an jeder Verbindung
+    history_path = app.config["HISTORY_DB_PATH"]
+    app.db_pool = ConnectionPool(
+        app.config["DB_PATH"],
+        max_size=app.config["DB_POOL_SIZE"],
+        timeout=app.config["DB_POOL_TIMEOUT"],
+        factory=connection_class,
+        init=lambda conn: history.attach(conn, history_path),
+    )
 
-BASE_DIR = os.path.dirname(__file__)
-DB_PATH = os.environ.get(
-    "DB_PATH",  # wenn gesetzt, diesen Pfad nehmen
-    os.path.join(BASE_DIR, "data", "questions.db")  # sonst Standard
-)
+    # Vorschau und Katalog lesen auf Wunsch aus einer schreibgeschützten
+    # Momentaufnahme (snapshots.py), erneuert im Hintergrund
+    app.snapshot_reader = None
+    app.snapshot_scheduler = None
+    if app.config["READ_SNAPSHOTS"]:
+        app.snapshot_reader = snapshots.SnapshotReader(
+            app.config["SNAPSHOT_DIR"],
+            max_size=app.config["DB_POOL_SIZE"],
+            timeout=app.config["DB_POOL_TIMEOUT"],
+            mmap_size=app.config["SNAPSHOT_MMAP_SIZE"],
+            factory=connection_class,
+        )
+        app.snapshot_scheduler = snapshots.SnapshotScheduler(
+            app.config["DB_PATH"], app.config["SNAPSHOT_DIR"], app.config["SNAPSHOT_INTERVAL"])
+        app.snapshot_scheduler.start()
+
+    # Gerenderte Testvorschauen, invalidiert über tests.version
+    app.preview_cache = RenderCache(
+        max_entries=app.config["PREVIEW_CACHE_ENTRIES"],
+        max_bytes=app.config["PREVIEW_CACHE_BYTES"],
+    )
+
+    # PDF-Export: begrenzter Prozesspool, fertige PDFs als Dateien neben der DB
+    app.pdf_exporter = pdf_export.PdfExporter(
+        app.config["PDF_CACHE_DIR"],
+        max_workers=app.config["PDF_WORKERS"],
+        max_files=app.config["PDF_CACHE_FILES"],
+        timeout=app.config["PDF_TIMEOUT"],
+    )
 
-app = Flask(__name__)
+    # Schema beim Start anlegen bzw. auf den aktuellen Stand bringen
+    # (PRAGMA user_version; ist es aktuell, nur eine Abfrage)
+    with app.db_pool.connection() as conn:
+        database.migrate(conn)
+
+    # Hintergrundaufträge (Importe, Exporte, ...), siehe jobs.py
+    app.job_runner = jobs.JobRunner(
+        app.config["DB_PATH"],
+        app.config["JOBS_DB_PATH"],
+        workers=app.config["JOB_WORKERS"],
+        processes=app.config["JOB_PROCESSES"],
+    )
+    app.job_runner.start()
+
+    app.teardown_appcontext(release_db_connection)
+    app.register_blueprint(bp)
+    app.register_blueprint(api.bp)
+    return app
+
+
+def configure_templates(app):
+    """Kompilierte Templates als Bytecode auf der Platte zwischenspeichern.
+
+    Der Schlüssel enthält eine Prüfsumme des Quelltexts, geänderte Templates
+    werden also neu kompiliert.
+    """
+    cache_dir = app.config["TEMPLATE_CACHE_DIR"]
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
+def prepare(overrides=None):
+    """Einmal vor dem Start der Worker (gunicorn ``on_starting``).
+
+    Legt die Datenbank an bzw. migriert sie und kompiliert alle Templates in
+    den Bytecode-Cache. Die Worker finden danach ein fertiges Schema vor und
+    laden Templates ohne Kompilieren. Gibt die angewendeten Migrationen zurück,
+    mit ``TENANT_MODE`` als {Mandant: Migrationen} über alle Mandanten.
+    """
+    app = Flask(__name__)
+    app.config.update(config.from_env(overrides))
+    configure_templates(app)
+    if app.config["TENANT_MODE"]:
+        applied = tenants.migrate_all(app.config["TENANTS_DIR"])
+    else:
+        applied = database.init_db(app.config["DB_PATH"])
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    return applied
+
+
+def requeue_jobs(wsgi_app):
+    """Beim Beenden eines Workers (gunicorn ``worker_exit``): Aufträge zurückstellen.
+
+    gunicorn ersetzt Worker nach ``max_requests``; laufende Aufträge brechen
+    beim nächsten Fortschrittsschritt ab und warten wieder, statt mit dem
+    Prozess zu sterben. Gibt die Anzahl zurückgestellter Aufträge zurück.
+    """
+    if isinstance(wsgi_app, tenants.TenantDispatcher):
+        apps = list(wsgi_app.apps.values())
+    else:
+        apps = [wsgi_app]
+    return sum(app.job_runner.shutdown(requeue=True) for app in apps)
 
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # erlaubt Zugriff per Spaltennamen
-    return conn
+    """Verbindung für den aktuellen Request (einmal pro App-Kontext aus dem Pool)."""
+    if "db" not in g:
+        g.db = current_app.db_pool.acquire()
+    return g.db
+
+
+def get_snapshot():
+    """(Verbindung, Momentaufnahme) für den aktuellen Request oder None.
+
+    None, wenn ``READ_SNAPSHOTS`` aus ist, noch keine Momentaufnahme
+    veröffentlicht wurde oder sie von einem älteren Schemastand stammt.
+    """
+    if "snapshot_db" not in g:
+        reader = current_app.snapshot_reader
+        g.snapshot_db = reader.acquire() if reader is not None else None
+    return g.snapshot_db
 
 
-@app.route("/")
+def take_connections():
+    """Verbindungen des Requests aus ``g`` übernehmen, als Liste (Pool, Verbindung).
+
+    Für gestreamte Antworten: der Teardown läuft schon, wenn die View
+    zurückkehrt, also vor dem ersten Block. Wer die Verbindungen übernimmt,
+    gibt sie selbst zurück, wenn die Antwort fertig ist.
+    """
+    held = []
+    conn = g.pop("db", None)
+    if conn is not None:
+        held.append((current_app.db_pool, conn))
+    snapshot_db = g.pop("snapshot_db", None)
+    if snapshot_db is not None:
+        conn, snapshot = snapshot_db
+        held.append((snapshot.pool, conn))
+    return held
+
+
+def release_db_connection(exc):
+    for pool, conn in take_connections():
+        pool.release(conn)
+    jobs_conn = g.pop("jobs_db", None)
+    if jobs_conn is not None:
+        jobs_conn.close()
+
+
+def get_jobs_connection():
+    """Verbindung zur Auftragsdatei (jobs.db) für den aktuellen Request."""
+    if "jobs_db" not in g:
+        g.jobs_db = jobs.connect(current_app.config["JOBS_DB_PATH"])
+    return g.jobs_db
+
+
+def update_duplicate_index(conn, limit=DEDUPE_REFRESH_LIMIT):
+    """Nach dem Schreiben von Fragen den Duplikat-Index nachziehen.
+
+    Bis ``limit`` Fragen sofort (Formular: eine Frage), ein größerer
+    Rückstand als Hintergrundauftrag. ``/duplicates`` liest dann nur.
+    """
+    if limit:
+        duplicates.refresh(conn, limit=limit)
+    if duplicates.pending(conn):
+        jobs.enqueue_once(get_jobs_connection(), "dedupe_index", DEDUPE_JOB_TITLE)
+        current_app.job_runner.wake()
+
+
+def start_job(kind, title, params=None):
+    """Hintergrundauftrag anlegen und auf die Auftragsseite umleiten."""
+    job_id = jobs.enqueue(get_jobs_connection(), kind, title, params)
+    current_app.job_runner.wake()
+    flash(f"Auftrag #{job_id} gestartet: {title}")
+    return redirect(url_for("main.jobs_page"))
+
+
+def save_upload(upload, suffix):
+    """Hochgeladene Datei in den Auftragsordner schreiben, gibt den Pfad zurück."""
+    files_dir = jobs.files_dir_for(current_app.config["JOBS_DB_PATH"])
+    os.makedirs(files_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=files_dir)
+    os.close(fd)
+    upload.save(path)
+    return path
+
+
+@bp.route("/stats/db-pool")
+def db_pool_stats():
+    """Zähler des Verbindungspools (Treffer, Neuverbindungen, Wartezeit)."""
+    return jsonify(current_app.db_pool.stats())
+
+
+@bp.route("/stats/preview-cache")
+def preview_cache_stats():
+    """Trefferquote und Größe des Vorschau-Caches."""
+    return jsonify(current_app.preview_cache.stats())
+
+
+@bp.route("/stats/jobs")
+def job_stats():
+    """Hintergrundaufträge dieses Prozesses."""
+    return jsonify(current_app.job_runner.stats())
+
+
+@bp.route("/stats/pdf")
+def pdf_stats():
+    """Zähler des PDF-Exports (gerendert, aus dem Cache, offene Aufträge)."""
+    return jsonify(current_app.pdf_exporter.stats())
+
+
+class LazyRows:
+    """Cursor als Iterator für gestreamte Templates, ohne ``fetchall()``.
+
+    Die erste Zeile wird vorab gelesen, damit ``{% if rows %}`` funktioniert.
+    Nur einmal iterierbar. ``limit`` begrenzt die Ausgabe; folgt danach noch
+    eine Zeile, ist ``has_more`` gesetzt. ``count`` und ``last`` gelten nach
+    der Schleife (für den Link zur nächsten Seite).
+    """
+
+    def __init__(self, cursor, limit=None):
+        self.cursor = cursor
+        self.limit = limit
+        self.count = 0
+        self.last = None
+        self.has_more = False
+        self._first = cursor.fetchone()
+
+    def __bool__(self):
+        return self._first is not None
+
+    def __iter__(self):
+        row = self._first
+        try:
+            while row is not None:
+                if self.limit is not None and self.count >= self.limit:
+                    self.has_more = True
+                    break
+                self.count += 1
+                self.last = row
+                yield row
+                row = self.cursor.fetchone()
+        finally:
+            self.cursor.close()
+
+
+def stream_page(template_name, **context):
+    """Template gestreamt rendern, in Blöcken von etwa STREAM_CHUNK_CHARS Zeichen.
+
+    Der erste Block geht raus, bevor alle Zeilen gelesen sind; Zeilen und
+    fertiges HTML liegen nie komplett im Speicher. Die Verbindungen des
+    Requests übernimmt der Stream (``take_connections``) und gibt sie zurück,
+    wenn die Antwort fertig gesendet oder abgebrochen ist.
+    """
+    chunks = _join_chunks(stream_template(template_name, **context), take_connections())
+    next(chunks)  # bis in den try-Block: auch ungelesen gibt close() die Verbindungen zurück
+    return chunks
+
+
+def _join_chunks(parts, held):
+    try:
+        yield None
+        buffer, size = [], 0
+        for part in parts:
+            buffer.append(part)
+            size += len(part)
+            if size >= STREAM_CHUNK_CHARS:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # Erst das Template beenden (schließt offene Cursor), dann zurückgeben
+        parts.close()
+        for pool, conn in held:
+            pool.release(conn)
+
+
+def get_page_size(default=DEFAULT_PAGE_SIZE):
+    """Seitengröße aus ``?page_size=…``, begrenzt auf MAX_PAGE_SIZE."""
+    size = request.args.get("page_size", default, type=int)
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def load_topic_stats(conn, topic_id):
+    """Fragen und Punkte eines Themas, gesamt und pro Schwierigkeit.
+
+    Liest die von Triggern gepflegte Tabelle topic_stats (höchstens eine
+    Zeile pro Schwierigkeit) statt über alle Fragen des Themas zu zählen.
+    """
+    rows = conn.execute(
+        """
+        SELECT difficulty, question_count, total_points
+        FROM topic_stats
+        WHERE topic_id = ? AND question_count > 0
+        ORDER BY difficulty
+        """,
+        (topic_id,)
+    ).fetchall()
+    return {
+        "questions": sum(row["question_count"] for row in rows),
+        "points": sum(row["total_points"] for row in rows),
+        "by_difficulty": rows,
+    }
+
+
+@bp.route("/")
 def index():
     """Startseite: zeigt alle Themen."""
     conn = get_db_connection()
     topics = conn.execute(
         "SELECT id, name, description FROM topics ORDER BY name"
     ).fetchall()
-    conn.close()
     return render_template("index.html", topics=topics)
 
 
-@app.route("/topic/<int:topic_id>")
+@bp.route("/topic/<int:topic_id>")
 def topic_questions(topic_id):
     """Zeigt alle Fragen zu einem bestimmten Thema."""
     conn = get_db_connection()
@@ -38,22 +406,51 @@ def topic_questions(topic_id):
         (topic_id,),
     ).fetchone()
 
+    if topic is None:
+        return "Thema nicht gefunden", 404
+
+    difficulty = request.args.get("difficulty", type=int)
+    after_id = request.args.get("after_id", type=int)
+    archived = request.args.get("archived") == "1"
+    page_size = get_page_size()
+
+    # is_active als Literal, nicht als Parameter: nur dann nutzt SQLite den
+    # Teilindex idx_questions_live (archivierte: idx_questions_topic)
     questions = conn.execute(
-        """
-        SELECT q.id, q.text, q.difficulty, q.points
+        f"""
+        SELECT q.id, q.text, q.difficulty, q.points,
+               IFNULL(u.use_count, 0) AS use_count, u.last_used
         FROM questions q
+        LEFT JOIN question_usage u ON u.question_id = q.id
         WHERE q.topic_id = ?
+          AND q.is_active = {0 if archived else 1}
+          AND (? IS NULL OR q.difficulty = ?)
+          AND q.id > ?
         ORDER BY q.id
+        LIMIT ?
         """,
-        (topic_id,),
+        (topic_id, difficulty, difficulty, after_id or 0, page_size + 1),
     ).fetchall()
 
-    conn.close()
+    next_after_id = None
+    if len(questions) > page_size:
+        questions = questions[:page_size]
+        next_after_id = questions[-1]["id"]
 
-    return render_template("questions.html", topic=topic, questions=questions)
+    return render_template(
+        "questions.html",
+        topic=topic,
+        stats=load_topic_stats(conn, topic_id),
+        questions=questions,
+        difficulty=difficulty,
+        archived=archived,
+        page_size=page_size,
+        next_after_id=next_after_id,
+        is_first_page=after_id is None,
+    )
 
 
-@app.route("/question/new", methods=["GET", "POST"])
+@bp.route("/question/new", methods=["GET", "POST"])
 def new_question():
     conn = get_db_connection()
 
@@ -66,6 +463,18 @@ def new_question():
         solution = request.form["solution"].strip()
 
         if text and topic_id:
+            # Ähnliche Fragen anzeigen und erst nach Bestätigung speichern
+            if not request.form.get("confirm_duplicate"):
+                duplicates.refresh(conn, limit=DEDUPE_REFRESH_LIMIT)
+                similar = duplicates.find_similar(conn, text, limit=5)
+                if similar:
+                    topics = conn.execute(
+                        "SELECT id, name FROM topics ORDER BY name"
+                    ).fetchall()
+                    return render_template(
+                        "new_question.html", topics=topics, form=request.form, similar=similar
+                    )
+
             conn.execute(
                 """
                 INSERT INTO questions (text, topic_id, difficulty, points, solution)
@@ -74,19 +483,18 @@ def new_question():
                 (text, topic_id, difficulty, points, solution),
             )
             conn.commit()
-            conn.close()
+            update_duplicate_index(conn)
             # Nach dem Speichern: Zur Themenliste zurück
-            return redirect(url_for("index"))
+            return redirect(url_for("main.index"))
 
     # 2. Bei GET: Formular anzeigen, Themen brauchen wir für Dropdown
     topics = conn.execute(
         "SELECT id, name FROM topics ORDER BY name"
     ).fetchall()
-    conn.close()
 
-    return render_template("new_question.html", topics=topics)
+    return render_template("new_question.html", topics=topics, form={}, similar=[])
 
-@app.route("/question/<int:question_id>/edit", methods=["GET", "POST"])
+@bp.route("/question/<int:question_id>/edit", methods=["GET", "POST"])
 def edit_question(question_id):
     conn = get_db_connection()
 
@@ -97,7 +505,6 @@ def edit_question(question_id):
     ).fetchone()
 
     if question is None:
-        conn.close()
         return "Frage nicht gefunden", 404
 
     # POST: Änderungen speichern
@@ -117,20 +524,33 @@ def edit_question(question_id):
             (text, topic_id, difficulty, points, solution, question_id)
         )
         conn.commit()
-        conn.close()
+        update_duplicate_index(conn)
 
-        return redirect(url_for("topic_questions", topic_id=topic_id))
+        return redirect(url_for("main.topic_questions", topic_id=topic_id))
 
     # GET: Themenliste laden für Dropdown
     topics = conn.execute(
         "SELECT id, name FROM topics ORDER BY name"
     ).fetchall()
 
-    conn.close()
+    # Verwendung in Tests, neueste zuerst (über idx_test_questions_question)
+    used_in = conn.execute(
+        """
+        SELECT t.id, t.name, t.date
+        FROM test_questions tq
+        JOIN tests t ON t.id = tq.test_id
+        WHERE tq.question_id = ?
+        ORDER BY t.date DESC, t.id DESC
+        """,
+        (question_id,)
+    ).fetchall()
 
-    return render_template("edit_question.html", question=question, topics=topics)
+    return render_template(
+        "edit_question.html", question=question, topics=topics, used_in=used_in,
+        old_tests=history.tests_with_question(conn, question_id),
+    )
 
-@app.route("/question/<int:question_id>/delete", methods=["POST"])
+@bp.route("/question/<int:question_id>/delete", methods=["POST"])
 def delete_question(question_id):
     conn = get_db_connection()
 
@@ -141,32 +561,150 @@ def delete_question(question_id):
     ).fetchone()
 
     if question is None:
-        conn.close()
         return "Frage nicht gefunden", 404
 
-    # Hier später evtl. prüfen, ob die Frage in test_questions verwendet wird
+    # Zuordnungen zu Tests entfernt ON DELETE CASCADE
     conn.execute(
         "DELETE FROM questions WHERE id = ?",
         (question_id,)
     )
     conn.commit()
     topic_id = question["topic_id"]
-    conn.close()
 
-    return redirect(url_for("topic_questions", topic_id=topic_id))
+    return redirect(url_for("main.topic_questions", topic_id=topic_id))
+
+
+def set_questions_active(conn, ids, active):
+    """Fragen archivieren (``active`` 0) oder wiederherstellen (1), eine Transaktion.
+
+    Gibt die Anzahl tatsächlich geänderter Fragen zurück.
+    """
+    with conn:
+        return conn.execute(
+            """
+            UPDATE questions SET is_active = ?, updated_at = datetime('now')
+            WHERE id IN (SELECT value FROM json_each(?)) AND is_active <> ?
+            """,
+            (active, json.dumps(ids), active)
+        ).rowcount
+
+
+@bp.route("/question/<int:question_id>/archive", methods=["POST"])
+def archive_question(question_id):
+    """Frage archivieren (``restore=1``: wiederherstellen).
+
+    Archivierte Fragen bleiben in ihren Tests, erscheinen aber nicht mehr in
+    Fragenlisten, Katalog, Fragenauswahl und automatischer Testerstellung.
+    """
+    conn = get_db_connection()
+    question = conn.execute(
+        "SELECT id, topic_id FROM questions WHERE id = ?",
+        (question_id,)
+    ).fetchone()
 
-@app.route("/tests")
+    if question is None:
+        return "Frage nicht gefunden", 404
+
+    restore = request.form.get("restore") == "1"
+    set_questions_active(conn, [question_id], 1 if restore else 0)
+    flash(f"Frage {question_id} {'wiederhergestellt' if restore else 'archiviert'}.")
+
+    target = request.form.get("next", "")
+    if not target.startswith("/") or target.startswith("//"):
+        target = url_for("main.topic_questions", topic_id=question["topic_id"])
+    return redirect(target)
+
+
+@bp.route("/bulk-archive", methods=["POST"])
+def bulk_archive():
+    """Mehrere Fragen archivieren bzw. mit ``restore=1`` wiederherstellen.
+
+    Formularfelder wie bei ``/bulk-delete``: ``ids`` (mehrfach), optional ``next``.
+    """
+    restore = request.form.get("restore") == "1"
+    ids = sorted(set(request.form.getlist("ids", type=int)))
+
+    if ids:
+        count = set_questions_active(get_db_connection(), ids, 1 if restore else 0)
+        flash(f"{count} Fragen {'wiederhergestellt' if restore else 'archiviert'}.")
+
+    target = request.form.get("next", "")
+    if not target.startswith("/") or target.startswith("//"):
+        target = url_for("main.index")
+    return redirect(target)
+
+@bp.route("/tests")
 def list_tests():
     """Liste aller Tests."""
     conn = get_db_connection()
     tests = conn.execute(
         "SELECT id, name, date, notes FROM tests ORDER BY date DESC, id DESC"
     ).fetchall()
-    conn.close()
     return render_template("tests.html", tests=tests)
 
 
-@app.route("/tests/new", methods=["GET", "POST"])
+@bp.route("/tests/history")
+def history_tests():
+    """Alte Tests (history.db) suchen: Name/Notizen, Wörter einer Frage oder Fragen-ID."""
+    conn = get_db_connection()
+
+    name = request.args.get("name", "").strip()
+    text = request.args.get("text", "").strip()
+    question_id = request.args.get("question_id", type=int)
+    page = max(request.args.get("page", 1, type=int), 1)
+    page_size = get_page_size(default=HISTORY_PAGE_SIZE)
+
+    tests = history.find_tests(
+        conn, name=name or None, text=text or None, question_id=question_id,
+        limit=page_size + 1, offset=(page - 1) * page_size,
+    )
+
+    return render_template(
+        "history.html",
+        tests=tests[:page_size],
+        has_next=len(tests) > page_size,
+        name=name,
+        text=text,
+        question_id=question_id,
+        page=page,
+        page_size=page_size,
+    )
+
+
+@bp.route("/tests/history/move", methods=["POST"])
+def move_tests_job():
+    """Tests vor dem Stichtag im Hintergrund nach history.db verschieben."""
+    before = request.form.get("before", "").strip()
+    try:
+        datetime.date.fromisoformat(before)
+    except ValueError:
+        flash("Bitte einen Stichtag (JJJJ-MM-TT) angeben.")
+        return redirect(url_for("main.history_tests"))
+
+    return start_job("history_move", f"Tests vor {before} auslagern",
+                     {"before": before, "history_db": current_app.config["HISTORY_DB_PATH"]})
+
+
+@bp.route("/tests/history/<int:test_id>")
+def history_test(test_id):
+    """Alter Test mit seinen Fragen (nur lesen)."""
+    test, questions = history.load_test(get_db_connection(), test_id)
+    if test is None:
+        return "Test nicht gefunden", 404
+    return render_template("history_test.html", test=test, questions=questions)
+
+
+@bp.route("/tests/history/<int:test_id>/restore", methods=["POST"])
+def restore_history_test(test_id):
+    """Alten Test zurück in die laufende Testliste holen."""
+    count = history.restore_test(get_db_connection(), test_id)
+    if count is None:
+        return "Test nicht gefunden", 404
+    flash(f"Test {test_id} mit {count} Fragen zurückgeholt.")
+    return redirect(url_for("main.list_tests"))
+
+
+@bp.route("/tests/new", methods=["GET", "POST"])
 def new_test():
     """Neuen Test anlegen."""
     conn = get_db_connection()
@@ -182,13 +720,11 @@ def new_test():
                 (name, date, notes),
             )
             conn.commit()
-            conn.close()
-            return redirect(url_for("list_tests"))
+            return redirect(url_for("main.list_tests"))
 
-    conn.close()
     return render_template("new_test.html")
 
-@app.route("/tests/<int:test_id>/questions", methods=["GET", "POST"])
+@bp.route("/tests/<int:test_id>/questions", methods=["GET", "POST"])
 def edit_test_questions(test_id):
     conn = get_db_connection()
 
@@ -199,81 +735,218 @@ def edit_test_questions(test_id):
     ).fetchone()
 
     if test is None:
-        conn.close()
         return "Test nicht gefunden", 404
 
     if request.method == "POST":
-        # Liste der ausgewählten Fragen (als Strings)
-        selected_ids = request.form.getlist("question_ids")
-        # In Integers umwandeln
-        selected_ids = [int(qid) for qid in selected_ids]
-
-        # Alte Zuordnungen löschen
-        conn.execute(
-            "DELETE FROM test_questions WHERE test_id = ?",
-            (test_id,)
+        # Liste der ausgewählten Fragen
+        selected_ids = assignments.parse_id_list(request.form.getlist("question_ids"))
+        # Alle Fragen, die auf der (paginierten) Seite angezeigt wurden
+        page_ids = assignments.parse_id_list(request.form.getlist("page_ids"))
+        # Optionale explizite Reihenfolge, z.B. "12,5,7"
+        order = assignments.parse_id_list(request.form.getlist("order"))
+
+        def desired(existing):
+            if page_ids:
+                # Nur die Änderungen dieser Seite übernehmen
+                result = assignments.apply_page_delta(existing, page_ids, selected_ids)
+            elif order and "question_ids" not in request.form:
+                # Nur umsortieren
+                result = existing
+            else:
+                # Vollständige Auswahl, Position = Reihenfolge der Auswahl
+                result = selected_ids
+            if order:
+                result = assignments.apply_order(result, order)
+            return result
+
+        try:
+            changes = assignments.save_assignment(conn, test_id, desired)
+        except sqlite3.IntegrityError:
+            # Fremdschlüssel: eine ausgewählte Frage wurde inzwischen gelöscht
+            flash("Nicht gespeichert: eine ausgewählte Frage existiert nicht mehr.")
+            return redirect(url_for(
+                "main.edit_test_questions", test_id=test_id, **request.args.to_dict()
+            ))
+        current_app.logger.info("Test %s: Zuordnung gespeichert %s", test_id, changes)
+        flash(
+            f"Gespeichert: {changes['inserted']} hinzugefügt, "
+            f"{changes['deleted']} entfernt, {changes['moved']} verschoben."
         )
 
-        # Neue Zuordnungen einfügen, Position = Reihenfolge der Auswahl
-        position = 1
-        for qid in selected_ids:
-            conn.execute(
-                """
-                INSERT INTO test_questions (test_id, question_id, position)
-                VALUES (?, ?, ?)
-                """,
-                (test_id, qid, position)
-            )
-            position += 1
-
-        conn.commit()
-        conn.close()
-        # Zur Testliste zurück – oder wieder auf diese Seite -->
-        return redirect(url_for("list_tests"))
+        if page_ids or order:
+            # Wieder auf dieselbe Seite (Filter und Position bleiben erhalten)
+            return redirect(url_for(
+                "main.edit_test_questions", test_id=test_id, **request.args.to_dict()
+            ))
+        # Zur Testliste zurück
+        return redirect(url_for("main.list_tests"))
+
+    # GET: eine Seite Fragen + markieren, welche schon im Test sind
+    topic_filter = request.args.get("topic_id", type=int)
+    difficulty = request.args.get("difficulty", type=int)
+    after_topic = request.args.get("after_topic")
+    after_id = request.args.get("after_id", type=int)
+    page_size = get_page_size()
+
+    # Nur aktive Fragen (Teilindex idx_questions_live)
+    conditions = ["q.is_active = 1"]
+    params = [test_id]
+    if topic_filter is not None:
+        conditions.append("q.topic_id = ?")
+        params.append(topic_filter)
+    if difficulty is not None:
+        conditions.append("q.difficulty = ?")
+        params.append(difficulty)
+    if after_topic is not None and after_id is not None:
+        # Keyset-Paginierung: weiter nach dem letzten Eintrag der Vorseite
+        conditions.append("(t.name, q.id) > (?, ?)")
+        params.extend([after_topic, after_id])
+    where = "WHERE " + " AND ".join(conditions)
 
-    # GET: alle Fragen + markieren, welche schon im Test sind
     questions = conn.execute(
-        """
+        f"""
         SELECT
             q.id,
             q.text,
             q.difficulty,
             q.points,
             t.name AS topic_name,
-            CASE WHEN tq.test_id IS NULL THEN 0 ELSE 1 END AS is_selected
-        FROM questions q
-        JOIN topics t ON q.topic_id = t.id
+            CASE WHEN tq.test_id IS NULL THEN 0 ELSE 1 END AS is_selected,
+            IFNULL(u.use_count, 0) AS use_count,
+            u.last_used
+        FROM topics t
+        -- CROSS JOIN erzwingt die Reihenfolge: Themen nach Name, dann Fragen
+        -- über idx_questions_live – so bricht LIMIT früh ab, ohne zu sortieren
+        CROSS JOIN questions q ON q.topic_id = t.id
         LEFT JOIN test_questions tq
             ON tq.test_id = ? AND tq.question_id = q.id
+        LEFT JOIN question_usage u ON u.question_id = q.id
+        {where}
         ORDER BY t.name, q.id
+        LIMIT ?
         """,
-        (test_id,)
+        params + [page_size + 1]
+    ).fetchall()
+
+    # Eine Zeile mehr geladen, um zu wissen, ob es eine nächste Seite gibt
+    next_page = None
+    if len(questions) > page_size:
+        questions = questions[:page_size]
+        last = questions[-1]
+        next_page = {"after_topic": last["topic_name"], "after_id": last["id"]}
+
+    topics = conn.execute(
+        "SELECT id, name FROM topics ORDER BY name"
     ).fetchall()
 
-    conn.close()
+    current_order = assignments.load_assignment(conn, test_id)
 
     return render_template(
         "test_questions.html",
         test=test,
-        questions=questions
+        questions=questions,
+        topics=topics,
+        topic_filter=topic_filter,
+        topic_stats=load_topic_stats(conn, topic_filter) if topic_filter else None,
+        difficulty=difficulty,
+        page_size=page_size,
+        next_page=next_page,
+        is_first_page=after_id is None,
+        selected_count=len(current_order),
+        current_order=current_order,
     )
 
-@app.route("/tests/<int:test_id>/preview")
+@bp.route("/tests/<int:test_id>/preview")
 def test_preview(test_id):
     conn = get_db_connection()
 
-    # Test laden
+    # Test laden (inkl. Versionsstempel für den Cache)
     test = conn.execute(
-        "SELECT id, name, date, notes FROM tests WHERE id = ?",
+        "SELECT id, name, date, notes, version FROM tests WHERE id = ?",
         (test_id,)
     ).fetchone()
 
     if test is None:
-        conn.close()
         return "Test nicht gefunden", 404
 
+    # URLs im HTML hängen vom Präfix (SCRIPT_NAME) ab
+    cache_key = (request.script_root, test_id)
+    cached = current_app.preview_cache.get(cache_key, test["version"])
+    if cached is None:
+        # Erster Abruf dieser Version: gestreamt und dabei für die nächsten
+        # gecacht; ein ETag gibt es erst ab dann (Prüfsumme des ganzen HTML)
+        chunks = render_test_preview(preview_connection(test), test)
+        response = current_app.response_class(
+            cache_stream(chunks, current_app.preview_cache, cache_key, test["version"]),
+            mimetype="text/html")
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    body, etag = cached
+    response = current_app.response_class(body, mimetype="text/html")
+    response.set_etag(etag)
+    # Browser soll jedes Mal nachfragen, bekommt bei gleicher Version aber nur 304
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+@bp.route("/tests/<int:test_id>/pdf")
+def test_pdf(test_id):
+    """Test als PDF (``?solutions=1`` hängt ein Lösungsblatt an)."""
+    conn = get_db_connection()
+
+    solutions = request.args.get("solutions") == "1"
+    data = pdf_export.load_test_data(conn, test_id, solutions=solutions)
+    if data is None:
+        return "Test nicht gefunden", 404
+
+    try:
+        pdf, digest = current_app.pdf_exporter.open_pdf(data)
+    except pdf_export.PdfUnavailable:
+        return ("Das PDF kann gerade nicht erzeugt werden, bitte gleich noch einmal versuchen.",
+                503, {"Retry-After": "10"})
+    suffix = "-loesungen" if solutions else ""
+    return send_file(
+        pdf,
+        mimetype="application/pdf",
+        download_name=f"test-{test_id}{suffix}.pdf",
+        etag=digest,
+        conditional=True,
+        max_age=0,
+    )
+
+
+def preview_connection(test):
+    """Momentaufnahme, wenn sie den Test in derselben Version enthält, sonst die Datenbank.
+
+    ``tests.version`` steigt bei jeder Änderung, die die Vorschau betrifft
+    (Fragen, Punkte, Themenname, Notenschlüssel); gleiche Version heißt
+    also gleicher Inhalt.
+    """
+    snapshot_db = get_snapshot()
+    if snapshot_db is not None:
+        conn = snapshot_db[0]
+        row = conn.execute("SELECT version FROM tests WHERE id = ?", (test["id"],)).fetchone()
+        if row is not None and row["version"] == test["version"]:
+            return conn
+    return get_db_connection()
+
+
+def render_test_preview(conn, test):
+    """Vorschau gestreamt rendern (Textblöcke), Fragen Zeile für Zeile aus dem Cursor."""
+    # Summe vorab: sie steht im Bewertungsfeld unter den Fragen
+    total_points = conn.execute(
+        """
+        SELECT COALESCE(SUM(COALESCE(q.points, 1)), 0)
+        FROM test_questions tq
+        JOIN questions q ON q.id = tq.question_id
+        WHERE tq.test_id = ?
+        """,
+        (test["id"],)
+    ).fetchone()[0]
+
     # Fragen zum Test in der richtigen Reihenfolge laden
-    questions = conn.execute(
+    questions = LazyRows(conn.execute(
         """
         SELECT
             q.id,
@@ -287,14 +960,124 @@ def test_preview(test_id):
         WHERE tq.test_id = ?
         ORDER BY tq.position
         """,
+        (test["id"],)
+    ))
+
+    _, steps = results.scale_for_test(conn, test["id"])
+    return stream_page("test_preview.html", test=test, questions=questions,
+                       grading_key=results.format_scale(steps), total_points=total_points)
+
+
+def cache_stream(chunks, cache, key, version):
+    """Gestreamte Seite als UTF-8 durchreichen und danach in ``cache`` ablegen.
+
+    Gesammelt wird nur, solange die Seite in den Cache passt; größere Seiten
+    gehen ungecacht durch. Bricht der Client ab, wird nichts gespeichert.
+    """
+    parts = [] if cache.max_entries > 0 else None
+    size = 0
+    try:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if parts is not None:
+                size += len(data)
+                if size > cache.max_bytes:
+                    parts = None
+                else:
+                    parts.append(data)
+            yield data
+    finally:
+        chunks.close()
+    if parts is not None:
+        cache.put(key, version, b"".join(parts))
+
+@bp.route("/tests/<int:test_id>/generate", methods=["GET", "POST"])
+def generate_test_questions(test_id):
+    """Fragen automatisch nach Punkten, Themen- und Schwierigkeitsanteilen auswählen."""
+    conn = get_db_connection()
+
+    test = conn.execute(
+        "SELECT id, name, date, notes FROM tests WHERE id = ?",
         (test_id,)
+    ).fetchone()
+
+    if test is None:
+        return "Test nicht gefunden", 404
+
+    topics = conn.execute(
+        "SELECT id, name FROM topics ORDER BY name"
     ).fetchall()
 
-    conn.close()
+    if request.method == "POST":
+        total_points = request.form.get("total_points", 0, type=float)
+        # Anteile werden im Formular in Prozent eingegeben
+        topic_shares = {
+            t["id"]: request.form.get(f"topic_share_{t['id']}", 0, type=float) / 100
+            for t in topics
+        }
+        difficulty_shares = {
+            d: request.form.get(f"difficulty_share_{d}", 0, type=float)
+            for d in range(1, 6)
+        }
+        exclude_recent = request.form.get("exclude_recent_tests", 0, type=int)
+        seed = request.form.get("seed", type=int)
+
+        try:
+            result = generator.generate_test(
+                conn,
+                test_id,
+                total_points,
+                topic_shares=topic_shares,
+                difficulty_shares=difficulty_shares,
+                exclude_recent_tests=exclude_recent,
+                seed=seed,
+            )
+        except ValueError as e:
+            flash(str(e))
+            return render_template("generate_test.html", test=test, topics=topics,
+                                   form=request.form)
+
+        flash(
+            f"{len(result['question_ids'])} Fragen mit {result['points']:g} von "
+            f"{result['target_points']:g} Punkten ausgewählt."
+        )
+        return redirect(url_for("main.edit_test_questions", test_id=test_id))
+
+    return render_template("generate_test.html", test=test, topics=topics, form={})
+
+@bp.route("/tests/<int:test_id>/variants", methods=["GET", "POST"])
+def test_variants(test_id):
+    """Gruppen-Varianten (A/B/C …) mit gemischter Reihenfolge anlegen."""
+    conn = get_db_connection()
+
+    test = conn.execute(
+        "SELECT id, name, date, notes FROM tests WHERE id = ?",
+        (test_id,)
+    ).fetchone()
+
+    if test is None:
+        return "Test nicht gefunden", 404
+
+    if request.method == "POST":
+        count = request.form.get("count", 0, type=int)
+        seed = request.form.get("seed", type=int)
+        substitute = request.form.get("substitute") == "1"
 
-    return render_template("test_preview.html", test=test, questions=questions)
+        try:
+            created = variants.create_variants(conn, test_id, count, seed=seed,
+                                               substitute=substitute)
+        except ValueError as e:
+            flash(str(e))
+            return render_template("test_variants.html", test=test, form=request.form,
+                                   max_variants=variants.MAX_VARIANTS)
 
-@app.route("/tests/<int:test_id>/edit", methods=["GET", "POST"])
+        flash(f"{len(created)} Varianten angelegt.")
+        return redirect(url_for("main.list_tests"))
+
+    return render_template("test_variants.html", test=test, form={},
+                           max_variants=variants.MAX_VARIANTS)
+
+@bp.route("/tests/<int:test_id>/edit", methods=["GET", "POST"])
 def edit_test(test_id):
     conn = get_db_connection()
 
@@ -304,7 +1087,6 @@ def edit_test(test_id):
     ).fetchone()
 
     if test is None:
-        conn.close()
         return "Test nicht gefunden", 404
 
     if request.method == "POST":
@@ -322,13 +1104,11 @@ def edit_test(test_id):
                 (name, date, notes, test_id),
             )
             conn.commit()
-            conn.close()
-            return redirect(url_for("list_tests"))
+            return redirect(url_for("main.list_tests"))
 
-    conn.close()
     return render_template("edit_test.html", test=test)
 
-@app.route("/topic/new", methods=["GET", "POST"])
+@bp.route("/topic/new", methods=["GET", "POST"])
 def new_topic():
     conn = get_db_connection()
 
@@ -342,13 +1122,11 @@ def new_topic():
                 (name, description),
             )
             conn.commit()
-            conn.close()
-            return redirect(url_for("index"))
+            return redirect(url_for("main.index"))
 
-    conn.close()
     return render_template("new_topic.html")
 
-@app.route("/topic/<int:topic_id>/edit", methods=["GET", "POST"])
+@bp.route("/topic/<int:topic_id>/edit", methods=["GET", "POST"])
 def edit_topic(topic_id):
     conn = get_db_connection()
 
@@ -359,7 +1137,6 @@ def edit_topic(topic_id):
     ).fetchone()
 
     if topic is None:
-        conn.close()
         return "Thema nicht gefunden", 404
 
     if request.method == "POST":
@@ -376,25 +1153,22 @@ def edit_topic(topic_id):
                 (name, description, topic_id)
             )
             conn.commit()
-            conn.close()
             # Nach dem Bearbeiten z.B. zurück zur Themenliste
-            return redirect(url_for("index"))
+            return redirect(url_for("main.index"))
 
-    conn.close()
     return render_template("edit_topic.html", topic=topic)
 
-@app.route("/tests/<int:test_id>/duplicate", methods=["POST"])
+@bp.route("/tests/<int:test_id>/duplicate", methods=["POST"])
 def duplicate_test(test_id):
     conn = get_db_connection()
 
     # Original-Test laden
     original = conn.execute(
-        "SELECT id, name, date, notes FROM tests WHERE id = ?",
+        "SELECT id, name, date, notes, grading_scale_id FROM tests WHERE id = ?",
         (test_id,)
     ).fetchone()
 
     if original is None:
-        conn.close()
         return "Test nicht gefunden", 404
 
     # Neuen Namen erzeugen, z.B. "Alter Name (Kopie)"
@@ -404,8 +1178,8 @@ def duplicate_test(test_id):
 
     # Neuen Test eintragen
     cursor = conn.execute(
-        "INSERT INTO tests (name, date, notes) VALUES (?, ?, ?)",
-        (new_name, new_date, new_notes)
+        "INSERT INTO tests (name, date, notes, grading_scale_id) VALUES (?, ?, ?, ?)",
+        (new_name, new_date, new_notes, original["grading_scale_id"])
     )
     new_test_id = cursor.lastrowid
 
@@ -421,14 +1195,13 @@ def duplicate_test(test_id):
     )
 
     conn.commit()
-    conn.close()
 
     # Entweder zurück zur Übersicht...
-    return redirect(url_for("list_tests"))
+    return redirect(url_for("main.list_tests"))
     # ...oder direkt in den neuen Test:
-    # return redirect(url_for("edit_test", test_id=new_test_id))
+    # return redirect(url_for("main.edit_test", test_id=new_test_id))
 
-@app.route("/tests/<int:test_id>/delete", methods=["POST"])
+@bp.route("/tests/<int:test_id>/delete", methods=["POST"])
 def delete_test(test_id):
     conn = get_db_connection()
 
@@ -439,56 +1212,234 @@ def delete_test(test_id):
     ).fetchone()
 
     if test is None:
-        conn.close()
         return "Test nicht gefunden", 404
 
-    # Zugeordnete Fragen löschen
+    # Zuordnungen entfernt ON DELETE CASCADE
     conn.execute(
-        "DELETE FROM test_questions WHERE test_id = ?",
+        "DELETE FROM tests WHERE id = ?",
         (test_id,)
     )
+    conn.commit()
 
-    # Selbst den Test löschen
-    conn.execute(
-        "DELETE FROM tests WHERE id = ?",
+    return redirect(url_for("main.list_tests"))
+
+@bp.route("/tests/<int:test_id>/results", methods=["GET", "POST"])
+def test_results(test_id):
+    """Punkte einer Klasse erfassen (einfügen oder CSV) und Noten/Lösungsquoten anzeigen."""
+    conn = get_db_connection()
+
+    test = conn.execute(
+        "SELECT id, name, date, grading_scale_id FROM tests WHERE id = ?",
         (test_id,)
+    ).fetchone()
+
+    if test is None:
+        return "Test nicht gefunden", 404
+
+    form = {}
+    if request.method == "POST":
+        # Eigenes Formular: Notenschlüssel des Tests wechseln ("" = Standard)
+        if "grading_scale_id" in request.form:
+            scale_id = request.form.get("grading_scale_id", type=int)
+            if scale_id is not None and conn.execute(
+                "SELECT 1 FROM grading_scales WHERE id = ?", (scale_id,)
+            ).fetchone() is None:
+                flash("Diesen Notenschlüssel gibt es nicht (mehr).")
+                return redirect(url_for("main.test_results", test_id=test_id))
+            conn.execute(
+                "UPDATE tests SET grading_scale_id = ? WHERE id = ?",
+                (scale_id, test_id)
+            )
+            conn.commit()
+            flash("Notenschlüssel geändert.")
+            return redirect(url_for("main.test_results", test_id=test_id))
+
+        form = request.form
+        class_name = request.form.get("class_name", "").strip()
+        text = request.form.get("scores", "")
+        upload = request.files.get("file")
+        if upload is not None and upload.filename:
+            text = upload.read().decode("utf-8-sig", errors="replace")
+
+        questions = conn.execute(
+            """
+            SELECT tq.question_id, COALESCE(tq.points_override, q.points, 1) AS max_points
+            FROM test_questions tq
+            JOIN questions q ON q.id = tq.question_id
+            WHERE tq.test_id = ?
+            ORDER BY tq.position
+            """,
+            (test_id,)
+        ).fetchall()
+
+        try:
+            if not class_name:
+                raise results.ScoreError("Bitte die Klasse angeben.")
+            if not questions:
+                raise results.ScoreError("Diesem Test sind noch keine Fragen zugeordnet.")
+            rows = results.parse_scores(text, [q["max_points"] for q in questions])
+            if not rows:
+                raise results.ScoreError("Keine Punkte eingefügt.")
+        except results.ScoreError as e:
+            flash(str(e))
+        else:
+            count = results.save_scores(conn, test_id, class_name, rows,
+                                        [q["question_id"] for q in questions])
+            flash(f"{len(rows)} Schüler mit {count} Punktewerten gespeichert.")
+            return redirect(url_for("main.test_results", test_id=test_id))
+
+    classes = [row[0] for row in conn.execute(
+        "SELECT DISTINCT class_name FROM students ORDER BY class_name"
+    )]
+    return render_template(
+        "test_results.html",
+        test=test,
+        report=results.test_report(conn, test_id),
+        scales=results.load_scales(conn),
+        classes=classes,
+        form=form,
     )
 
-    conn.commit()
-    conn.close()
 
-    return redirect(url_for("list_tests"))
+@bp.route("/tests/<int:test_id>/results/delete", methods=["POST"])
+def delete_test_results(test_id):
+    """Punkte der ausgewählten Schüler in diesem Test löschen."""
+    ids = request.form.getlist("student_ids", type=int)
+    if ids:
+        count = results.delete_scores(get_db_connection(), test_id, ids)
+        flash(f"{count} Punktewerte gelöscht.")
+    return redirect(url_for("main.test_results", test_id=test_id))
 
-@app.route("/topic/<int:topic_id>/catalog")
-def topic_catalog(topic_id):
+
+@bp.route("/grading-scales", methods=["GET", "POST"])
+def grading_scales():
+    """Notenschlüssel anlegen und ändern (gleicher Name ersetzt die Stufen)."""
     conn = get_db_connection()
 
+    form = {}
+    if request.method == "POST":
+        form = request.form
+        name = request.form.get("name", "").strip()
+        try:
+            if not name:
+                raise results.ScoreError("Bitte einen Namen angeben.")
+            steps = results.parse_scale(request.form.get("steps", ""))
+        except results.ScoreError as e:
+            flash(str(e))
+        else:
+            results.save_scale(conn, name, steps, is_default=request.form.get("default") == "1")
+            flash(f"Notenschlüssel „{name}“ gespeichert.")
+            return redirect(url_for("main.grading_scales"))
+
+    usage = dict(conn.execute(
+        """
+        SELECT grading_scale_id, COUNT(*) FROM tests
+        WHERE grading_scale_id IS NOT NULL
+        GROUP BY grading_scale_id
+        """
+    ).fetchall())
+    return render_template("grading_scales.html", scales=results.load_scales(conn),
+                           usage=usage, form=form)
+
+
+@bp.route("/grading-scales/<int:scale_id>/delete", methods=["POST"])
+def delete_grading_scale(scale_id):
+    """Notenschlüssel löschen; Tests damit verwenden wieder den Standard."""
+    conn = get_db_connection()
+    deleted = conn.execute(
+        "DELETE FROM grading_scales WHERE id = ? AND is_default = 0", (scale_id,)
+    ).rowcount
+    conn.commit()
+    if not deleted:
+        flash("Der Standard-Notenschlüssel kann nicht gelöscht werden.")
+    return redirect(url_for("main.grading_scales"))
+
+
+@bp.route("/results")
+def results_year():
+    """Statistik eines Schuljahres: Noten pro Test, Lösungsquoten nach Schwierigkeit und Thema."""
+    default_from, default_to = results.school_year()
+    date_from = request.args.get("from", "").strip() or default_from
+    date_to = request.args.get("to", "").strip() or default_to
+    try:
+        start = datetime.date.fromisoformat(date_from)
+        datetime.date.fromisoformat(date_to)
+    except ValueError:
+        flash("Bitte Datumsangaben als JJJJ-MM-TT angeben.")
+        date_from, date_to = default_from, default_to
+        start = datetime.date.fromisoformat(date_from)
+
+    report = results.year_report(get_db_connection(), date_from, date_to)
+    grades = sorted({grade for test in report["tests"] for grade in test["grades"]},
+                    key=lambda grade: (grade is None, grade))
+    previous_from, previous_to = results.school_year(start - datetime.timedelta(days=1))
+    return render_template(
+        "results_year.html",
+        report=report,
+        grades=grades,
+        date_from=date_from,
+        date_to=date_to,
+        previous_from=previous_from,
+        previous_to=previous_to,
+    )
+
+@bp.route("/topic/<int:topic_id>/catalog")
+def topic_catalog(topic_id):
+    # Druckansicht: aus der Momentaufnahme lesen (falls eingeschaltet), ein
+    # laufender Import bremst dann nicht; ?live=1 liest die aktuellen Daten
+    live = request.args.get("live") == "1"
+    snapshot_db = None if live else get_snapshot()
+    conn, snapshot = snapshot_db if snapshot_db is not None else (get_db_connection(), None)
+
     # Thema laden
-    topic = conn.execute(
-        "SELECT id, name, description FROM topics WHERE id = ?",
-        (topic_id,)
-    ).fetchone()
+    topic_sql = "SELECT id, name, description FROM topics WHERE id = ?"
+    topic = conn.execute(topic_sql, (topic_id,)).fetchone()
+    if topic is None and snapshot is not None:
+        # Thema ist neuer als die Momentaufnahme
+        conn, snapshot = get_db_connection(), None
+        topic = conn.execute(topic_sql, (topic_id,)).fetchone()
 
     if topic is None:
-        conn.close()
         return "Thema nicht gefunden", 404
 
-    # Alle Fragen zu diesem Thema laden
-    questions = conn.execute(
+    difficulty = request.args.get("difficulty", type=int)
+    after_id = request.args.get("after_id", type=int)
+    # Nummer der ersten Frage auf dieser Seite (für die fortlaufende Nummerierung)
+    start = request.args.get("start", 1, type=int)
+    page_size = get_page_size(default=CATALOG_PAGE_SIZE)
+    # ?all=1: ganzes Thema auf einer Seite (zum Drucken), ohne Blättern
+    show_all = request.args.get("all") == "1"
+
+    # Fragen zu diesem Thema: eine Seite (plus eine zum Erkennen der nächsten)
+    # oder alle; gelesen erst beim Rendern, Zeile für Zeile
+    questions = LazyRows(conn.execute(
         """
         SELECT id, text
         FROM questions
         WHERE topic_id = ?
+          AND is_active = 1
+          AND (? IS NULL OR difficulty = ?)
+          AND id > ?
         ORDER BY id
+        LIMIT ?
         """,
-        (topic_id,)
-    ).fetchall()
-
-    conn.close()
-
-    return render_template("topic_catalog.html", topic=topic, questions=questions)
-
-@app.route("/topic/<int:topic_id>/delete", methods=["POST"])
+        (topic_id, difficulty, difficulty, after_id or 0, -1 if show_all else page_size + 1)
+    ), limit=None if show_all else page_size)
+
+    return current_app.response_class(stream_page(
+        "topic_catalog.html",
+        topic=topic,
+        questions=questions,
+        difficulty=difficulty,
+        page_size=page_size,
+        show_all=show_all,
+        start=start,
+        live=live,
+        snapshot_time=(datetime.datetime.fromtimestamp(snapshot.published)
+                       .strftime("%d.%m.%Y %H:%M") if snapshot is not None else None),
+    ), mimetype="text/html")
+
+@bp.route("/topic/<int:topic_id>/delete", methods=["POST"])
 def delete_topic(topic_id):
     conn = get_db_connection()
 
@@ -499,36 +1450,370 @@ def delete_topic(topic_id):
     ).fetchone()
 
     if topic is None:
-        conn.close()
         return "Thema nicht gefunden", 404
 
-    # Test-Zuordnungen für Fragen dieses Themas löschen
+    # Fragen und deren Test-Zuordnungen entfernt ON DELETE CASCADE
     conn.execute(
-        """
-        DELETE FROM test_questions
-        WHERE question_id IN (
-            SELECT id FROM questions WHERE topic_id = ?
-        )
-        """,
+        "DELETE FROM topics WHERE id = ?",
         (topic_id,)
     )
+    conn.commit()
 
-    # Fragen des Themas löschen
-    conn.execute(
-        "DELETE FROM questions WHERE topic_id = ?",
-        (topic_id,)
+    return redirect(url_for("main.index"))
+
+# Sammel-Löschen: Art -> (Tabelle, Bezeichnung für die Meldung)
+BULK_DELETE_KINDS = {
+    "questions": ("questions", "Fragen"),
+    "topics": ("topics", "Themen"),
+    "tests": ("tests", "Tests"),
+}
+
+
+@bp.route("/bulk-delete", methods=["POST"])
+def bulk_delete():
+    """Mehrere Fragen, Themen oder Tests in einer Transaktion löschen.
+
+    Formularfelder: ``kind`` (questions/topics/tests), ``ids`` (mehrfach),
+    optional ``next`` als Rücksprungziel. Abhängige Zeilen entfernt
+    ON DELETE CASCADE. Themen (mit allen ihren Fragen) werden als
+    Hintergrundauftrag gelöscht.
+    """
+    kind = request.form.get("kind", "")
+    if kind not in BULK_DELETE_KINDS:
+        return "Unbekannte Art", 400
+    table, label = BULK_DELETE_KINDS[kind]
+    ids = sorted(set(request.form.getlist("ids", type=int)))
+
+    if ids and kind == "topics":
+        return start_job("bulk_delete", f"{len(ids)} {label} löschen",
+                         {"table": table, "ids": ids})
+
+    conn = get_db_connection()
+    if ids:
+        with conn:
+            cur = conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in ids])
+        flash(f"{cur.rowcount} {label} gelöscht.")
+
+    target = request.form.get("next", "")
+    if not target.startswith("/") or target.startswith("//"):
+        target = url_for("main.list_tests" if kind == "tests" else "main.index")
+    return redirect(target)
+
+@bp.route("/duplicates")
+def duplicates_report():
+    """Ähnliche Fragenpaare, die ähnlichsten zuerst.
+
+    Liest nur: den Index pflegen die Schreibwege (``update_duplicate_index``)
+    und der Auftrag ``dedupe_index``.
+    """
+    conn = get_db_connection()
+
+    threshold = request.args.get("min", duplicates.DEFAULT_THRESHOLD, type=float)
+    threshold = min(max(threshold, duplicates.STORE_THRESHOLD), 1.0)
+    page = max(request.args.get("page", 1, type=int), 1)
+    page_size = get_page_size(default=DUPLICATES_PAGE_SIZE)
+
+    pairs = duplicates.list_pairs(
+        conn, threshold, limit=page_size + 1, offset=(page - 1) * page_size
     )
 
-    # Thema löschen
-    conn.execute(
-        "DELETE FROM topics WHERE id = ?",
-        (topic_id,)
+    return render_template(
+        "duplicates.html",
+        pairs=pairs[:page_size],
+        has_next=len(pairs) > page_size,
+        threshold=threshold,
+        page=page,
+        page_size=page_size,
+        pending=duplicates.pending(conn),
     )
 
-    conn.commit()
-    conn.close()
+@bp.route("/duplicates/index", methods=["POST"])
+def duplicates_index():
+    """Rückstand der Duplikaterkennung im Hintergrund abarbeiten (``rebuild``: alle)."""
+    rebuild = request.form.get("rebuild") == "1"
+    title = "Duplikat-Index neu aufbauen" if rebuild else DEDUPE_JOB_TITLE
+    return start_job("dedupe_index", title, {"rebuild": rebuild})
 
-    return redirect(url_for("index"))
+
+@bp.route("/duplicates/merge", methods=["POST"])
+def merge_duplicates():
+    """Frage ``drop`` in ``keep`` aufgehen lassen (Testzuordnungen wandern mit)."""
+    keep = request.form.get("keep", type=int)
+    drop = request.form.get("drop", type=int)
+    if keep is None or drop is None or keep == drop:
+        return "keep und drop erforderlich", 400
+
+    conn = get_db_connection()
+    with conn:
+        moved = duplicates.merge_questions(conn, keep, drop)
+    if moved is None:
+        flash("Frage nicht gefunden.")
+    else:
+        flash(f"Frage {drop} in Frage {keep} zusammengeführt ({moved} Testzuordnungen übernommen).")
+
+    target = request.form.get("next", "")
+    if not target.startswith("/") or target.startswith("//"):
+        target = url_for("main.duplicates_report")
+    return redirect(target)
+
+@bp.route("/archive")
+def archive_page():
+    """Export, Import und Sicherung der ganzen Fragenbank."""
+    snapshot = None
+    if current_app.config["READ_SNAPSHOTS"]:
+        current_app.snapshot_reader.current()  # neueste Fassung übernehmen
+        snapshot = current_app.snapshot_reader.stats()
+        if snapshot["published"] is not None:
+            snapshot["published"] = (datetime.datetime.fromtimestamp(snapshot["published"])
+                                     .strftime("%d.%m.%Y %H:%M"))
+    return render_template("archive.html", snapshot=snapshot)
+
+
+@bp.route("/archive/read-snapshot", methods=["POST"])
+def publish_snapshot():
+    """Momentaufnahme für Vorschau und Katalog jetzt erneuern (Hintergrundauftrag)."""
+    if not current_app.config["READ_SNAPSHOTS"]:
+        return "Momentaufnahmen sind nicht eingeschaltet (READ_SNAPSHOTS=1)", 404
+    return start_job("snapshot_publish", "Lese-Kopie erneuern",
+                     {"snapshot_dir": current_app.config["SNAPSHOT_DIR"]})
+
+
+@bp.route("/archive/export")
+def archive_export():
+    """Archiv (.ndjson.gz) gestreamt herunterladen, Speicherbedarf konstant."""
+    pool = current_app.db_pool
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M")
+
+    def generate():
+        # Eigene Verbindung für die ganze Dauer des Downloads: der Teardown
+        # des Requests läuft schon vor dem ersten Block
+        conn = pool.acquire()
+        lines = archive.iter_lines(conn)
+        try:
+            yield from archive.iter_gzip(lines)
+        finally:
+            lines.close()  # Lesetransaktion beenden, bevor die Verbindung zurückgeht
+            pool.release(conn)
+
+    response = current_app.response_class(
+        stream_with_context(generate()),
+        mimetype="application/gzip",
+    )
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="testgenerator-{stamp}.ndjson.gz"'
+    )
+    return response
+
+
+@bp.route("/archive/export-job", methods=["POST"])
+def archive_export_job():
+    """Archiv im Hintergrund als Datei erstellen (Download danach unter /jobs)."""
+    return start_job("archive_export", "Archiv exportieren")
+
+
+@bp.route("/archive/import", methods=["POST"])
+def archive_import():
+    """Hochgeladenes Archiv im Hintergrund einlesen (neue IDs, Themen zusammengeführt)."""
+    upload = request.files.get("archive")
+    if upload is None or not upload.filename:
+        flash("Bitte eine Archivdatei auswählen.")
+        return redirect(url_for("main.archive_page"))
+
+    return start_job("archive_import", f"Archiv {upload.filename} importieren",
+                     {"upload": save_upload(upload, ".ndjson.gz")})
+
+
+@bp.route("/archive/catalog", methods=["POST"])
+def catalog_import():
+    """Fragenkatalog (ID;Frage;Thema;Punkte) im Hintergrund importieren."""
+    upload = request.files.get("catalog")
+    if upload is None or not upload.filename:
+        flash("Bitte eine Katalogdatei auswählen.")
+        return redirect(url_for("main.archive_page"))
+
+    on_duplicate = request.form.get("duplicates", "")
+    if on_duplicate not in ("", "skip", "merge"):
+        return "Unbekannte Duplikat-Behandlung", 400
+    return start_job("catalog_import", f"Katalog {upload.filename} importieren",
+                     {"upload": save_upload(upload, ".txt"), "duplicates": on_duplicate})
+
+
+@bp.route("/archive/snapshot")
+def archive_snapshot():
+    """Sicherung der laufenden Datenbank (SQLite-Backup-API) herunterladen."""
+    db_path = current_app.config["DB_PATH"]
+    fd, path = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(os.path.abspath(db_path)))
+    os.close(fd)
+    try:
+        archive.snapshot(db_path, path)
+        f = open(path, "rb")
+    finally:
+        # Unter Linux bleibt die geöffnete Datei lesbar, bis send_file fertig ist
+        os.remove(path)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M")
+    return send_file(f, mimetype="application/vnd.sqlite3", as_attachment=True,
+                     download_name=f"questions-{stamp}.db")
+
+@bp.route("/common")
+def common_bank():
+    """Gemeinsame Fragenbank: Themen mit Anzahl aktiver Fragen (nur lesen)."""
+    conn = get_db_connection()
+    with tenants.common_bank(conn, current_app.config["COMMON_DB_PATH"]) as attached:
+        if not attached:
+            return "Keine gemeinsame Fragenbank veröffentlicht", 404
+        topics = conn.execute(
+            """
+            SELECT t.id, t.name, t.description,
+                   (SELECT TOTAL(s.question_count) FROM common.topic_stats s
+                    WHERE s.topic_id = t.id) AS question_count
+            FROM common.topics t
+            ORDER BY t.name
+            """
+        ).fetchall()
+    return render_template("common.html", topics=topics)
+
+
+@bp.route("/common/topic/<int:topic_id>")
+def common_topic(topic_id):
+    """Fragen eines Themas der gemeinsamen Bank, zum Übernehmen auswählbar."""
+    conn = get_db_connection()
+    with tenants.common_bank(conn, current_app.config["COMMON_DB_PATH"]) as attached:
+        if not attached:
+            return "Keine gemeinsame Fragenbank veröffentlicht", 404
+        topic = conn.execute(
+            "SELECT id, name, description FROM common.topics WHERE id = ?",
+            (topic_id,)
+        ).fetchone()
+        if topic is None:
+            return "Thema nicht gefunden", 404
+
+        after_id = request.args.get("after_id", type=int)
+        page_size = get_page_size()
+        questions = conn.execute(
+            """
+            SELECT id, text, difficulty, points
+            FROM common.questions
+            WHERE topic_id = ?
+              AND is_active = 1
+              AND id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (topic_id, after_id or 0, page_size + 1)
+        ).fetchall()
+
+    next_after_id = None
+    if len(questions) > page_size:
+        questions = questions[:page_size]
+        next_after_id = questions[-1]["id"]
+
+    return render_template(
+        "common_topic.html",
+        topic=topic,
+        questions=questions,
+        page_size=page_size,
+        next_after_id=next_after_id,
+    )
+
+
+@bp.route("/common/copy", methods=["POST"])
+def common_copy():
+    """Ausgewählte Fragen der gemeinsamen Bank in die eigene übernehmen.
+
+    Formularfelder: ``ids`` (mehrfach), optional ``next``.
+    """
+    ids = sorted(set(request.form.getlist("ids", type=int)))
+    conn = get_db_connection()
+    with tenants.common_bank(conn, current_app.config["COMMON_DB_PATH"]) as attached:
+        if not attached:
+            return "Keine gemeinsame Fragenbank veröffentlicht", 404
+        copied = tenants.copy_from_common(conn, ids) if ids else 0
+    if copied:
+        update_duplicate_index(conn)
+
+    skipped = len(ids) - copied
+    flash(f"{copied} Fragen übernommen"
+          + (f", {skipped} schon vorhanden." if skipped else "."))
+
+    target = request.form.get("next", "")
+    if not target.startswith("/") or target.startswith("//"):
+        target = url_for("main.common_bank")
+    return redirect(target)
+
+
+@bp.route("/jobs")
+def jobs_page():
+    """Hintergrundaufträge mit Fortschritt; laufende werden per JavaScript abgefragt."""
+    return render_template("jobs.html", jobs=jobs.list_jobs(get_jobs_connection()),
+                           status_labels=JOB_STATUS_LABELS)
+
+
+@bp.route("/jobs/<int:job_id>")
+def job_status(job_id):
+    """Stand eines Auftrags als JSON (für die Abfrage von /jobs)."""
+    job = jobs.get_job(get_jobs_connection(), job_id)
+    if job is None:
+        return jsonify({"error": "Auftrag nicht gefunden"}), 404
+    job.pop("params")
+    return jsonify(job)
+
+
+@bp.route("/jobs/<int:job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    if jobs.cancel(get_jobs_connection(), job_id):
+        flash(f"Auftrag #{job_id} wird abgebrochen.")
+    else:
+        flash(f"Auftrag #{job_id} ist schon beendet.")
+    return redirect(url_for("main.jobs_page"))
+
+
+@bp.route("/jobs/<int:job_id>/download")
+def job_download(job_id):
+    """Ergebnisdatei eines fertigen Auftrags (z.B. Archiv-Export)."""
+    job = jobs.get_job(get_jobs_connection(), job_id)
+    path = (job["result"] or {}).get("file") if job and job["status"] == "done" else None
+    if not path or not os.path.exists(path):
+        return "Keine Datei zu diesem Auftrag", 404
+    stamp = job["finished_at"].replace("-", "").replace(":", "")[:13].replace(" ", "-")
+    return send_file(path, mimetype="application/gzip", as_attachment=True,
+                     download_name=f"testgenerator-{stamp}.ndjson.gz")
+
+
+@bp.route("/search")
+def search():
+    """Volltextsuche über Fragetext und Lösung, nach Relevanz sortiert."""
+    conn = get_db_connection()
+
+    query = request.args.get("q", "").strip()
+    topic_id = request.args.get("topic_id", type=int)
+    page = max(request.args.get("page", 1, type=int), 1)
+    page_size = get_page_size(default=SEARCH_PAGE_SIZE)
+
+    hits, has_next = [], False
+    if query:
+        hits, has_next = search_index.search_questions(
+            conn, query, topic_id=topic_id, page=page, page_size=page_size
+        )
+
+    topics = conn.execute(
+        "SELECT id, name FROM topics ORDER BY name"
+    ).fetchall()
+
+    return render_template(
+        "search.html",
+        query=query,
+        topic_id=topic_id,
+        topics=topics,
+        results=hits,
+        page=page,
+        page_size=page_size,
+        has_next=has_next,
+    )
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Nur zum Entwickeln. Im Betrieb: gunicorn -c gunicorn.conf.py "app:create_app()"
+    create_app().run(
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", 5000)),
+        debug=os.environ.get("FLASK_DEBUG") == "1",
+    )
@@ -0,0 +1,435 @@
+"""Export und Import der ganzen Fragenbank als komprimiertes Archiv.
+
+Format: gzip-komprimiertes NDJSON, eine JSON-Zeile pro Datensatz. Spalten-
+namen stehen nur einmal pro Tabelle, die Zeilen sind Arrays:
+
+    {"format": "testgenerator-archive", "version": 1, "schema_version": 6, ...}
+    {"table": "topics", "columns": ["id", "name", "description"]}
+    [1, "Elektrik", "Elektrische Grundlagen"]
+    ...
+    {"table": "questions", "columns": [...]}
+    ...
+    {"end": {"topics": 3, "questions": 1200, "tests": 40, "test_questions": 900}}
+
+Export und Import lesen und schreiben blockweise über Generatoren; der
+Speicherbedarf hängt nicht von der Größe der Fragenbank ab. Die Endzeile
+mit den Zeilenzahlen erkennt abgeschnittene Archive.
+
+Beim Import bekommen alle Zeilen neue IDs, die Verweise werden über
+Zuordnungstabellen (old -> new, temporär in SQLite) umgeschrieben. Themen
+mit gleichem Namen werden zusammengeführt. ``keep_ids=True`` übernimmt die
+IDs unverändert (nur in eine leere Datenbank, z.B. beim Wiederherstellen).
+
+    python archive.py export --db data/questions.db --out bank.ndjson.gz
+    python archive.py import --db data/questions.db --file bank.ndjson.gz --snapshot vorher.db
+    python archive.py snapshot --db data/questions.db --out /volume1/backup/questions.db
+"""
+import argparse
+import datetime
+import gzip
+import io
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+import database
+
+FORMAT = "testgenerator-archive"
+FORMAT_VERSION = 1
+
+# Zeilen pro fetchmany beim Export und pro executemany beim Import
+BATCH_SIZE = 2000
+
+# Tabellen in Export-Reihenfolge (Verweise zeigen immer auf frühere Tabellen):
+# (tabelle, spalten, sortierung)
+ARCHIVE_TABLES = [
+    ("topics", ["id", "name", "description"], "id"),
+    ("questions", ["id", "text", "topic_id", "difficulty", "points", "solution",
+                   "is_active", "created_at", "updated_at"], "id"),
+    ("tests", ["id", "name", "date", "notes"], "id"),
+    ("test_questions", ["test_id", "question_id", "position", "points_override"],
+     "test_id, position"),
+]
+
+# Spalten, ohne die eine Tabelle nicht importiert werden kann
+REQUIRED_COLUMNS = {
+    "topics": {"id", "name"},
+    "questions": {"id", "text", "topic_id"},
+    "tests": {"id", "name"},
+    "test_questions": {"test_id", "question_id", "position"},
+}
+
+# Zuordnung alte -> neue ID pro Tabelle (temporäre Tabellen der Verbindung)
+MAP_TABLES = {
+    "topics": "archive_map_topics",
+    "questions": "archive_map_questions",
+    "tests": "archive_map_tests",
+}
+
+
+class ArchiveError(Exception):
+    """Archiv unlesbar, unvollständig oder passt nicht zur Datenbank."""
+
+
+def _dump(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+# --- Export ---------------------------------------------------------------
+
+def iter_lines(conn, counts=None, batch_size=BATCH_SIZE):
+    """Archivinhalt als Textblöcke (je ein oder mehrere Zeilen).
+
+    Alles wird in einer Lesetransaktion gelesen, das Archiv zeigt also einen
+    Stand – auch wenn parallel geschrieben wird (WAL). ``counts`` wird mit
+    den Zeilenzahlen pro Tabelle gefüllt.
+    """
+    counts = {} if counts is None else counts
+    conn.execute("BEGIN")
+    try:
+        yield _dump({
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "schema_version": database.get_schema_version(conn),
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        })
+        for table, columns, order in ARCHIVE_TABLES:
+            yield _dump({"table": table, "columns": columns})
+            cursor = conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} ORDER BY {order}"
+            )
+            counts[table] = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                counts[table] += len(rows)
+                yield "".join(_dump(list(row)) for row in rows)
+        yield _dump({"end": counts})
+    finally:
+        conn.rollback()
+
+
+def iter_gzip(chunks, level=6):
+    """Textblöcke als gzip-Datenstrom (für gestreamte HTTP-Antworten)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip-Header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_archive(conn, path, progress=None):
+    """Archiv nach ``path`` schreiben (erst Temp-Datei, dann umbenennen).
+
+    ``progress(zeilen)`` wird nach jedem Block aufgerufen. Gibt die
+    Zeilenzahlen pro Tabelle zurück.
+    """
+    counts = {}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            for chunk in iter_lines(conn, counts):
+                f.write(chunk)
+                if progress:
+                    progress(sum(counts.values()))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return counts
+
+
+# --- Import ---------------------------------------------------------------
+
+def read_archive(fileobj):
+    """JSON-Objekte aus einem (gzip-komprimierten) Binärstrom, zeilenweise."""
+    text = io.TextIOWrapper(gzip.GzipFile(fileobj=fileobj), encoding="utf-8")
+    try:
+        for number, line in enumerate(text, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    raise ArchiveError(f"Zeile {number}: kein gültiges JSON")
+    except (OSError, EOFError, zlib.error) as e:
+        raise ArchiveError(f"Archiv nicht lesbar: {e}")
+
+
+def _mapped(table):
+    """SQL-Ausdruck: neue ID zur alten ID (Parameter) aus der Zuordnungstabelle."""
+    return f"(SELECT new FROM temp.{MAP_TABLES[table]} WHERE old = ?)"
+
+
+class _Importer:
+    """Liest die Archivzeilen und schreibt sie blockweise in die Datenbank."""
+
+    def __init__(self, conn, keep_ids, batch_size):
+        self.conn = conn
+        self.keep_ids = keep_ids
+        self.batch_size = batch_size
+        self.table = None
+        self.index = {}
+        self.width = 0
+        self.buffer = []
+        self.read = {}
+        self.stats = {"topics": 0, "topics_merged": 0, "questions": 0, "tests": 0,
+                      "test_questions": 0}
+
+    def run(self, records):
+        for record in records:
+            if isinstance(record, list):
+                self.add_row(record)
+            elif isinstance(record, dict) and "table" in record:
+                self.flush()
+                self.start_table(record["table"], record.get("columns") or [])
+            elif isinstance(record, dict) and "end" in record:
+                self.flush()
+                if record["end"] != self.read:
+                    raise ArchiveError(
+                        f"Zeilenzahlen stimmen nicht: erwartet {record['end']}, gelesen {self.read}")
+                return self.stats
+            else:
+                raise ArchiveError("Unbekannte Zeile im Archiv")
+        raise ArchiveError("Archiv unvollständig (Endzeile fehlt)")
+
+    def start_table(self, table, columns):
+        known = [name for name, _, _ in ARCHIVE_TABLES]
+        if table not in known:
+            raise ArchiveError(f"Unbekannte Tabelle '{table}' im Archiv")
+        # Verweise zeigen auf frühere Tabellen: Reihenfolge wie in ARCHIVE_TABLES
+        if self.read and known.index(table) <= known.index(self.table):
+            raise ArchiveError(f"Tabelle '{table}' steht an falscher Stelle im Archiv")
+        missing = REQUIRED_COLUMNS[table] - set(columns)
+        if missing:
+            raise ArchiveError(f"{table}: Spalten fehlen: {', '.join(sorted(missing))}")
+        self.table = table
+        self.width = len(columns)
+        self.index = {name: i for i, name in enumerate(columns)}
+        self.read[table] = 0
+
+    def add_row(self, row):
+        if self.table is None:
+            raise ArchiveError("Datenzeile vor der ersten Tabelle")
+        if len(row) != self.width:
+            raise ArchiveError(f"{self.table}: Zeile mit {len(row)} statt {self.width} Werten")
+        self.buffer.append(row)
+        self.read[self.table] += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        if self.table == "test_questions":
+            self.insert_assignments(rows)
+            return
+        if self.table == "topics":
+            mapping = self.insert_topics(rows)
+        else:
+            mapping = self.insert_rows(rows)
+        self.conn.executemany(
+            f"INSERT INTO temp.{MAP_TABLES[self.table]} (old, new) VALUES (?, ?)", mapping
+        )
+
+    def columns(self, exclude):
+        """Spalten der Zieltabelle, die das Archiv enthält (ohne ``exclude``)."""
+        for name, columns, _ in ARCHIVE_TABLES:
+            if name == self.table:
+                return [c for c in columns if c in self.index and c not in exclude]
+        return []
+
+    def insert_topics(self, rows):
+        """Themen einfügen; gleichnamige vorhandene Themen weiterverwenden."""
+        index = self.index
+        names = [row[index["name"]] for row in rows]
+        existing = dict(self.conn.execute(
+            "SELECT name, id FROM topics WHERE name IN (SELECT value FROM json_each(?))",
+            (json.dumps(names),)
+        ).fetchall())
+        next_id = database.next_id(self.conn, "topics")
+        columns = self.columns(exclude={"id"})
+        mapping, inserts = [], []
+        for row in rows:
+            old, name = row[index["id"]], row[index["name"]]
+            new = existing.get(name)
+            if new is None:
+                if self.keep_ids:
+                    new = old
+                else:
+                    new, next_id = next_id, next_id + 1
+                existing[name] = new
+                inserts.append([new] + [row[index[c]] for c in columns])
+            else:
+                self.stats["topics_merged"] += 1
+            mapping.append((old, new))
+        self.conn.executemany(
+            f"INSERT INTO topics (id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)})",
+            inserts
+        )
+        self.stats["topics"] += len(inserts)
+        return mapping
+
+    def insert_rows(self, rows):
+        """Fragen oder Tests mit neuen IDs einfügen (ein executemany pro Block)."""
+        index = self.index
+        first = database.next_id(self.conn, self.table)
+        mapping = [
+            (row[index["id"]], row[index["id"]] if self.keep_ids else first + offset)
+            for offset, row in enumerate(rows)
+        ]
+        columns = self.columns(exclude={"id"})
+        # Fragen: Thema über die Zuordnungstabelle umschreiben
+        placeholders = "".join(
+            ", " + (_mapped("topics") if c == "topic_id" else "?") for c in columns
+        )
+        self.conn.executemany(
+            f"INSERT INTO {self.table} (id, {', '.join(columns)}) VALUES (?{placeholders})",
+            [[new] + [row[index[c]] for c in columns] for (_, new), row in zip(mapping, rows)]
+        )
+        self.stats[self.table] += len(rows)
+        return mapping
+
+    def insert_assignments(self, rows):
+        index = self.index
+        columns = self.columns(exclude={"test_id", "question_id"})
+        self.conn.executemany(
+            f"""
+            INSERT INTO test_questions (test_id, question_id, {', '.join(columns)})
+            VALUES ({_mapped('tests')}, {_mapped('questions')}{', ?' * len(columns)})
+            """,
+            [
+                [row[index["test_id"]], row[index["question_id"]]]
+                + [row[index[c]] for c in columns]
+                for row in rows
+            ]
+        )
+        self.stats["test_questions"] += len(rows)
+
+
+def import_archive(conn, records, keep_ids=False, batch_size=BATCH_SIZE):
+    """Archiv importieren (``records`` z.B. aus ``read_archive``).
+
+    Alles läuft in einer Transaktion: ist das Archiv fehlerhaft oder
+    abgeschnitten, bleibt die Datenbank unverändert. Gibt die Anzahl
+    eingefügter Zeilen pro Tabelle zurück (``topics_merged``: Themen, die es
+    schon gab).
+    """
+    records = iter(records)
+    header = next(records, None)
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise ArchiveError("Keine Archivdatei des Testgenerators")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ArchiveError(f"Archivversion {header['version']} ist neuer als dieses Programm")
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if keep_ids and conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM topics) OR EXISTS (SELECT 1 FROM tests)"
+        ).fetchone()[0]:
+            raise ArchiveError("IDs übernehmen geht nur in eine leere Datenbank")
+        for name in MAP_TABLES.values():
+            conn.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {name} "
+                f"(old INTEGER PRIMARY KEY, new INTEGER NOT NULL)"
+            )
+            conn.execute(f"DELETE FROM temp.{name}")
+
+        stats = _Importer(conn, keep_ids, batch_size).run(records)
+        conn.commit()
+    except sqlite3.IntegrityError as e:
+        # z.B. Frage mit einem Thema, das nicht im Archiv steht
+        conn.rollback()
+        raise ArchiveError(f"Archiv passt nicht zusammen: {e}")
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        for name in MAP_TABLES.values():
+            conn.execute(f"DROP TABLE IF EXISTS temp.{name}")
+    return stats
+
+
+# --- Sicherung ------------------------------------------------------------
+
+def snapshot(db_path, target):
+    """Konsistente Kopie der (laufenden) Datenbank über die Backup-API von SQLite.
+
+    Anders als ``cp`` ist die Kopie nie halb geschrieben und enthält auch
+    Änderungen, die noch in ``questions.db-wal`` stehen. Kopiert wird in
+    einem Schritt: im WAL-Modus blockiert das keine Schreiber. Die Kopie ist
+    eine einzelne Datei (journal_mode DELETE) und wird erst am Ende an ihren
+    Platz umbenannt.
+    """
+    tmp = f"{target}.{os.getpid()}.tmp"
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst)
+        dst.execute("PRAGMA journal_mode = DELETE")
+        dst.close()
+        os.replace(tmp, target)
+    finally:
+        dst.close()
+        src.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fragenbank exportieren, importieren, sichern.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Archiv (.ndjson.gz) schreiben")
+    export.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    export.add_argument("--out", required=True, help="Zieldatei")
+
+    restore = commands.add_parser("import", help="Archiv einlesen")
+    restore.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    restore.add_argument("--file", required=True, help="Archivdatei")
+    restore.add_argument("--keep-ids", action="store_true",
+                         help="IDs unverändert übernehmen (nur in eine leere Datenbank)")
+    restore.add_argument("--snapshot", help="vorher eine Sicherung hierhin schreiben")
+    restore.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    backup = commands.add_parser("snapshot", help="Sicherung per SQLite-Backup-API")
+    backup.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    backup.add_argument("--out", required=True, help="Zieldatei")
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+
+    if args.command == "snapshot":
+        snapshot(args.db, args.out)
+        print(f"Sicherung {args.out} geschrieben ({time.perf_counter() - start:.1f} s).")
+        return
+
+    database.init_db(args.db)
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        if args.command == "export":
+            counts = export_archive(conn, args.out)
+        else:
+            if args.snapshot:
+                snapshot(args.db, args.snapshot)
+                print(f"Sicherung {args.snapshot} geschrieben.")
+            with open(args.file, "rb") as f:
+                counts = import_archive(conn, read_archive(f), keep_ids=args.keep_ids,
+                                        batch_size=args.batch_size)
+    except ArchiveError as e:
+        raise SystemExit(f"Fehler: {e}")
+    finally:
+        conn.close()
+
+    summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+    print(f"{args.command}: {summary} ({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Zuordnung von Fragen zu Tests (Tabelle ``test_questions``) speichern.
+
+Statt alle Zeilen eines Tests zu löschen und neu einzufügen, wird die
+gewünschte Reihenfolge mit dem Ist-Stand verglichen. Geschrieben werden nur
+die Unterschiede: neue Fragen, entfernte Fragen und geänderte Positionen.
+"""
+
+
+def load_assignment(conn, test_id):
+    """Fragen-IDs eines Tests in Positionsreihenfolge."""
+    return [qid for qid, _ in load_positions(conn, test_id)]
+
+
+def load_positions(conn, test_id):
+    """[(question_id, position)] eines Tests in Positionsreihenfolge.
+
+    Die gespeicherten Positionen können Lücken haben: Wird eine Frage
+    gelöscht, entfernt ON DELETE CASCADE ihre Zeile, ohne die übrigen
+    nachzurücken.
+    """
+    return [
+        (row[0], row[1]) for row in conn.execute(
+            """
+            SELECT question_id, position
+            FROM test_questions
+            WHERE test_id = ?
+            ORDER BY position, question_id
+            """,
+            (test_id,)
+        )
+    ]
+
+
+def parse_id_list(values):
+    """IDs aus Formularwerten lesen – einzeln oder komma-separiert ("5,3,9")."""
+    ids = []
+    for value in values:
+        for part in str(value).replace(";", ",").split(","):
+            part = part.strip()
+            if part:
+                ids.append(int(part))
+    return ids
+
+
+def apply_page_delta(existing, page_ids, selected_ids):
+    """Neue Reihenfolge nach Auswahl auf einer paginierten Seite.
+
+    Auf der Seite abgewählte Fragen fallen weg, neu angehakte werden hinten
+    angefügt. Fragen anderer Seiten bleiben unverändert.
+    """
+    selected = set(selected_ids)
+    removed = {qid for qid in page_ids if qid not in selected}
+    kept = [qid for qid in existing if qid not in removed]
+    known = set(kept)
+    return kept + [qid for qid in dict.fromkeys(selected_ids) if qid not in known]
+
+
+def apply_order(question_ids, order):
+    """Fragen nach ``order`` sortieren; nicht genannte behalten ihre Reihenfolge dahinter."""
+    present = set(question_ids)
+    ordered = [qid for qid in dict.fromkeys(order) if qid in present]
+    placed = set(ordered)
+    return ordered + [qid for qid in question_ids if qid not in placed]
+
+
+def diff_assignment(existing, desired, positions=None):
+    """Unterschied zwischen Ist- und Soll-Reihenfolge.
+
+    ``positions`` sind die gespeicherten Positionen ({question_id: position});
+    ohne Angabe gilt 1, 2, 3 … in der Reihenfolge von ``existing``.
+
+    Gibt (inserts, deletes, moves) zurück:
+    - inserts: [(question_id, position)] für neue Fragen
+    - deletes: [question_id] für entfernte Fragen
+    - moves:   [(position, question_id)] für Fragen mit neuer Position
+    Positionen beginnen bei 1.
+    """
+    desired = list(dict.fromkeys(desired))  # Duplikate entfernen
+    if positions is None:
+        positions = {qid: pos for pos, qid in enumerate(existing, start=1)}
+    wanted = set(desired)
+
+    deletes = [qid for qid in existing if qid not in wanted]
+    inserts = []
+    moves = []
+    for pos, qid in enumerate(desired, start=1):
+        old = positions.get(qid)
+        if old is None:
+            inserts.append((qid, pos))
+        elif old != pos:
+            moves.append((pos, qid))
+
+    return inserts, deletes, moves
+
+
+def apply_assignment(conn, test_id, desired):
+    """Soll-Reihenfolge schreiben, ohne die Transaktion zu steuern.
+
+    Für Aufrufer, die mehrere Tests in einer Transaktion ändern (z.B. die
+    JSON-API). Rückgabe wie ``save_assignment``.
+    """
+    stored = load_positions(conn, test_id)
+    existing = [qid for qid, _ in stored]
+    if callable(desired):
+        desired = desired(existing)
+
+    # Gegen die gespeicherten Positionen vergleichen, nicht gegen den
+    # Listenindex: nach einer gelöschten Frage stimmen beide nicht überein
+    inserts, deletes, moves = diff_assignment(existing, desired, dict(stored))
+
+    conn.executemany(
+        "DELETE FROM test_questions WHERE test_id = ? AND question_id = ?",
+        [(test_id, qid) for qid in deletes]
+    )
+    conn.executemany(
+        "UPDATE test_questions SET position = ? WHERE test_id = ? AND question_id = ?",
+        [(pos, test_id, qid) for pos, qid in moves]
+    )
+    conn.executemany(
+        """
+        INSERT INTO test_questions (test_id, question_id, position)
+        VALUES (?, ?, ?)
+        """,
+        [(test_id, qid, pos) for qid, pos in inserts]
+    )
+    return {"inserted": len(inserts), "deleted": len(deletes), "moved": len(moves)}
+
+
+def save_assignment(conn, test_id, desired):
+    """Soll-Reihenfolge speichern und nur geänderte Zeilen schreiben.
+
+    ``desired`` ist die Liste der Fragen-IDs oder eine Funktion, die sie aus
+    der Ist-Liste berechnet (dann wird der Ist-Stand innerhalb derselben
+    Transaktion gelesen). Läuft in einer kurzen Transaktion
+    (BEGIN IMMEDIATE … COMMIT).
+
+    Gibt die Anzahl betroffener Zeilen zurück:
+    ``{"inserted": …, "deleted": …, "moved": …}``.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        changes = apply_assignment(conn, test_id, desired)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    return changes
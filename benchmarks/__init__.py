@@ -0,0 +1,7 @@
+"""Benchmarks für den Testgenerator.
+
+Aufruf aus dem Projektordner, z.B.:
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.suite --size medium
+"""
@@ -0,0 +1,117 @@
+"""Benchmark: automatische Testerstellung bei großem Fragenpool.
+
+    python -m benchmarks.bench_generator --questions 50000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import database
+import generator
+
+TOPIC_COUNT = 40
+
+
+def build_database(db_path, questions, seed=42):
+    rnd = random.Random(seed)
+    database.init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO topics (name, description) VALUES (?, '')",
+        [(f"Thema {i:03d}",) for i in range(1, TOPIC_COUNT + 1)]
+    )
+    conn.executemany(
+        """
+        INSERT INTO questions (text, topic_id, difficulty, points, solution)
+        VALUES (?, ?, ?, ?, '')
+        """,
+        (
+            (
+                f"Frage {i} " + "Lorem ipsum dolor sit amet " * rnd.randint(2, 10),
+                rnd.randint(1, TOPIC_COUNT),
+                rnd.choice((1, 1, 2, 2, 3, 4, 5)),
+                rnd.choice((1.0, 1.5, 2.0, 3.0, 4.0, 5.0)),
+            )
+            for i in range(questions)
+        )
+    )
+    # Ein paar ältere Tests, deren Fragen ausgeschlossen werden
+    for t in range(1, 11):
+        cur = conn.execute(
+            "INSERT INTO tests (name, date) VALUES (?, ?)",
+            (f"Test {t}", f"2025-01-{t:02d}")
+        )
+        conn.executemany(
+            "INSERT INTO test_questions (test_id, question_id, position) VALUES (?, ?, ?)",
+            [(cur.lastrowid, qid, pos)
+             for pos, qid in enumerate(rnd.sample(range(1, questions + 1), 30), start=1)]
+        )
+    conn.commit()
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "questions.db")
+        build_database(db_path, args.questions)
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        target_test = conn.execute(
+            "INSERT INTO tests (name, date) VALUES ('Neu', '2025-02-01')"
+        ).lastrowid
+        conn.commit()
+
+        scenarios = {
+            "40 P, ohne Vorgaben": {},
+            "40 P, 30 % Thema 1, Schwierigkeit 5/3/2": {
+                "topic_shares": {1: 0.3},
+                "difficulty_shares": {1: 5, 2: 3, 3: 2},
+            },
+            "60 P, 4 Themen, 3 Stufen, ohne letzte 5 Tests": {
+                "total_points": 60,
+                "topic_shares": {1: 0.25, 2: 0.25, 3: 0.25, 4: 0.25},
+                "difficulty_shares": {1: 1, 2: 1, 3: 1},
+                "exclude_recent_tests": 5,
+            },
+        }
+
+        t0 = time.perf_counter()
+        generator.QuestionPool.load(conn)
+        print(f"Fragenpool ohne Cache laden: {(time.perf_counter() - t0) * 1000:.1f} ms\n")
+
+        print(f"{'Szenario':<48} {'Lade ms':>8} {'Auswahl ms':>11} {'gesamt ms':>10} {'Punkte':>7}")
+        for label, options in scenarios.items():
+            options = dict(options)
+            total_points = options.pop("total_points", 40)
+            exclude = options.pop("exclude_recent_tests", 0)
+            load_times, select_times, totals = [], [], []
+            for i in range(args.repeat):
+                t0 = time.perf_counter()
+                excluded = generator.recently_used_questions(conn, exclude, target_test)
+                pool = generator.get_pool(conn)
+                t1 = time.perf_counter()
+                result = generator.select_questions(pool, total_points, seed=i,
+                                                    exclude=excluded, **options)
+                t2 = time.perf_counter()
+                generator.assignments.save_assignment(conn, target_test, result["question_ids"])
+                t3 = time.perf_counter()
+                load_times.append((t1 - t0) * 1000)
+                select_times.append((t2 - t1) * 1000)
+                totals.append((t3 - t0) * 1000)
+            print(f"{label:<48} {statistics.median(load_times):8.1f} "
+                  f"{statistics.median(select_times):11.1f} {statistics.median(totals):10.1f} "
+                  f"{result['points']:7g}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark: Katalog-Import mit generiertem Fragenkatalog.
+
+Erzeugt einen Fragenkatalog im Access-Exportformat (ID;Frage;Thema;Punkte)
+und importiert ihn in eine frische Datenbank – einmal mit dem Bulk-Import
+(normal und mit ``--fast``) und optional mit dem alten Zeile-für-Zeile-Import.
+
+    python -m benchmarks.bench_import --rows 1000000
+    python -m benchmarks.bench_import --rows 50000 --legacy
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import database
+import import_access_catalog
+
+TOPICS = [
+    "Elektrik", "Hydraulik", "Motor", "Pneumatik", "Getriebe", "Bremsanlage",
+    "Fahrwerk", "Lenkung", "Klimaanlage", "Abgasnachbehandlung", "Sensorik",
+    "Werkstoffkunde", "Fertigungstechnik", "Messtechnik", "Sicherheit",
+]
+
+WORDS = (
+    "Erklären Sie Beschreiben Nennen Aufbau Funktion Wirkungsweise Unterschied "
+    "zwischen Druck Ventil Steuergerät Leitung Pumpe Zylinder Kolben Sensor "
+    "Signal Spannung Widerstand Strom Kennlinie Drehmoment Leistung Verbrauch "
+    "Wartung Prüfung Fehlerdiagnose Sicherheitshinweise Bauteil System"
+).split()
+
+
+def generate_catalog(path, rows, seed=42):
+    """Katalogdatei mit ``rows`` Zeilen schreiben."""
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i in range(1, rows + 1):
+            text = " ".join(rnd.choices(WORDS, k=rnd.randint(8, 20))) + "?"
+            topic = rnd.choice(TOPICS)
+            points = rnd.choice(("1", "2", "3", "4", "1,5"))
+            f.write(f'{i};"{text}";"{topic}";{points}\n')
+
+
+def run(label, func, db_path, rows):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    database.init_db(db_path)
+
+    start = time.perf_counter()
+    imported = func(db_path)
+    elapsed = time.perf_counter() - start
+
+    rate = rows / elapsed if elapsed else 0
+    print(f"{label:<28} {imported:>9} Fragen  {elapsed:8.2f} s  {rate:>12,.0f} Zeilen/s")
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int,
+                        default=import_access_catalog.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--legacy", action="store_true",
+                        help="zusätzlich den alten Zeile-für-Zeile-Import messen")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        txt_path = os.path.join(tmp, "Fragenkatalog.txt")
+        db_path = os.path.join(tmp, "questions.db")
+
+        print(f"Erzeuge {args.rows} Zeilen …")
+        generate_catalog(txt_path, args.rows)
+
+        def bulk(path, fast=False):
+            return import_access_catalog.import_questions_bulk(
+                txt_path, path, chunk_size=args.chunk_size, fast=fast, quiet=True
+            )
+
+        def legacy(path):
+            import_access_catalog.import_questions(txt_path, path)
+            return args.rows
+
+        run("bulk", bulk, db_path, args.rows)
+        run("bulk --fast", lambda p: bulk(p, fast=True), db_path, args.rows)
+        if args.legacy:
+            run("zeilenweise (alt)", legacy, db_path, args.rows)
+
+
+if __name__ == "__main__":
+    main()
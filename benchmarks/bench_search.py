@@ -0,0 +1,106 @@
+"""Benchmark: Latenz der Volltextsuche (FTS5) bei großem Fragenpool.
+
+    python -m benchmarks.bench_search --questions 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import database
+import search
+from benchmarks.bench_import import TOPICS, WORDS
+
+QUERIES = [
+    "Druckventil", "Ventil Pumpe", "Steuergerät", "Kennlinie Drehmoment", "Oel",
+    "Fehlerdiagnose Sensor", "Wartungsprüfung", "Widerstand Spannung Strom", "zyl",
+    "Sicherheitshinweise Prüfung", "Druck",
+]
+
+
+def build_vocabulary(rnd):
+    """Wortschatz mit Komposita (Druck + Ventil -> Druckventil), Zipf-verteilt.
+
+    Reale Fragen haben einen großen Wortschatz; mit nur wenigen Wörtern würde
+    jede Suche einen Großteil des Pools treffen.
+    """
+    words = list(WORDS)
+    words += [a + b.lower() for a in WORDS for b in WORDS if a != b]
+    rnd.shuffle(words)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+
+def build_database(db_path, questions, seed=42):
+    rnd = random.Random(seed)
+    words, weights = build_vocabulary(rnd)
+    database.init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO topics (name, description) VALUES (?, '')",
+        [(name,) for name in TOPICS]
+    )
+    conn.executemany(
+        """
+        INSERT INTO questions (text, topic_id, difficulty, points, solution)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (
+            (
+                " ".join(rnd.choices(words, weights, k=rnd.randint(8, 25))) + "?",
+                rnd.randint(1, len(TOPICS)),
+                rnd.randint(1, 5),
+                float(rnd.randint(1, 4)),
+                " ".join(rnd.choices(words, weights, k=rnd.randint(3, 12))),
+            )
+            for _ in range(questions)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "questions.db")
+
+        start = time.perf_counter()
+        build_database(db_path, args.questions)
+        print(f"{args.questions} Fragen inkl. FTS-Index angelegt "
+              f"in {time.perf_counter() - start:.1f} s")
+
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+
+        print(f"\n{'Suche':<30} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        all_timings = []
+        for query in QUERIES:
+            timings = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                search.search_questions(conn, query, page=1, page_size=20)
+                timings.append((time.perf_counter() - t0) * 1000)
+            all_timings.extend(timings)
+            print(f"{query:<30} {statistics.median(timings):8.2f} "
+                  f"{percentile(timings, 95):8.2f} {max(timings):8.2f}")
+
+        print(f"{'gesamt':<30} {statistics.median(all_timings):8.2f} "
+              f"{percentile(all_timings, 95):8.2f} {max(all_timings):8.2f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
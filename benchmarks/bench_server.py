@@ -0,0 +1,180 @@
+"""Lasttest: Entwicklungsserver (python app.py) gegen gunicorn.
+
+Startet beide Varianten nacheinander auf einer Testdatenbank und schickt mit
+mehreren parallelen Clients Requests an ``/``, ``/tests`` und
+``/tests/<id>/preview``. Ausgegeben werden Requests/s sowie p50/p99 der
+Antwortzeit pro Pfad.
+
+    python -m benchmarks.bench_server
+    python -m benchmarks.bench_server --clients 16 --duration 10 --modes gunicorn
+"""
+import argparse
+import http.client
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import database  # noqa: E402
+
+PATHS = ["/", "/tests", "/tests/{test_id}/preview"]
+
+
+def build_database(db_path, topics=40, questions=20000, tests=200, per_test=25):
+    database.init_db(db_path)
+    rnd = random.Random(1)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO topics (name, description) VALUES (?, ?)",
+        [(f"Thema {i:03d}", "Beschreibung") for i in range(topics)]
+    )
+    conn.executemany(
+        "INSERT INTO questions (text, topic_id, difficulty, points) VALUES (?, ?, ?, ?)",
+        [
+            (f"Frage {i}: Erklären Sie die Funktion des Druckbegrenzungsventils. " * 2,
+             rnd.randint(1, topics), rnd.randint(1, 3), rnd.choice([1, 2, 3]))
+            for i in range(questions)
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO tests (name, date, notes) VALUES (?, ?, ?)",
+        [(f"Schularbeit {i}", f"2025-{i % 12 + 1:02d}-10", "") for i in range(tests)]
+    )
+    conn.executemany(
+        "INSERT INTO test_questions (test_id, question_id, position) VALUES (?, ?, ?)",
+        [
+            (test_id, qid, pos)
+            for test_id in range(1, tests + 1)
+            for pos, qid in enumerate(rnd.sample(range(1, questions + 1), per_test), start=1)
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def server_command(mode):
+    if mode == "dev":
+        return [sys.executable, "app.py"], {"FLASK_DEBUG": "1"}
+    return (
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:create_app()"],
+        {"WEB_ACCESS_LOG": ""},
+    )
+
+
+def wait_for_server(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server wurde beendet (Exit-Code {process.returncode}).")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("Server antwortet nicht.")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_load(port, path_template, clients, duration, test_count):
+    """Parallele Clients mit Keep-Alive. Gibt (latenzen_ms, fehler, dauer) zurück."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(seed):
+        rnd = random.Random(seed)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local = []
+        local_errors = 0
+        while time.perf_counter() < stop_at:
+            path = path_template.format(test_id=rnd.randint(1, test_count))
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["dev", "gunicorn"],
+                        choices=["dev", "gunicorn"])
+    parser.add_argument("--clients", type=int, default=8, help="parallele Clients")
+    parser.add_argument("--duration", type=float, default=5, help="Sekunden pro Pfad")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--tests", type=int, default=200, help="Anzahl Tests in der DB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "questions.db")
+        build_database(db_path, tests=args.tests)
+
+        rows = []
+        for mode in args.modes:
+            command, extra_env = server_command(mode)
+            env = dict(os.environ, DB_PATH=db_path, PORT=str(args.port),
+                       SECRET_KEY="bench", **extra_env)
+            process = subprocess.Popen(command, cwd=ROOT, env=env,
+                                       stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.DEVNULL)
+            try:
+                wait_for_server(args.port, process)
+                for path in PATHS:
+                    latencies, errors, elapsed = run_load(
+                        args.port, path, args.clients, args.duration, args.tests)
+                    rows.append((mode, path, len(latencies), errors,
+                                 len(latencies) / elapsed,
+                                 percentile(latencies, 50), percentile(latencies, 99)))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    print(f"\n{args.clients} Clients, {args.duration:g} s pro Pfad\n")
+    print(f"{'Modus':<10} {'Pfad':<24} {'Requests':>9} {'Fehler':>7} "
+          f"{'Req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, path, count, errors, rps, p50, p99 in rows:
+        print(f"{mode:<10} {path:<24} {count:>9} {errors:>7} "
+              f"{rps:>9.1f} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
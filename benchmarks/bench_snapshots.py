@@ -0,0 +1,119 @@
+"""Lese-Kopie: Vorschau und Katalog während eines großen Imports.
+
+Ein Thread importiert ununterbrochen große Stapel über die API, währenddessen
+werden Fragenkatalog (500 Fragen pro Seite) und Testvorschau (ohne
+Vorschau-Cache) abgerufen: einmal aus ``questions.db`` (``READ_SNAPSHOTS``
+aus bzw. ``?live=1``), einmal aus der Momentaufnahme. Zum Vergleich
+dieselben Messungen ohne Import.
+
+    python -m benchmarks.bench_snapshots --size medium --data-dir /tmp/bench
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import snapshots
+from benchmarks import datagen
+from benchmarks.suite import copy_database
+
+
+def import_loop(client, batch, stop, topic_id):
+    """Fragenstapel über die API schreiben, bis ``stop`` gesetzt ist."""
+    items = [{"text": f"Importierte Frage {i}", "topic_id": topic_id, "difficulty": 1 + i % 5,
+              "points": 1} for i in range(batch)]
+    while not stop.is_set():
+        response = client.post("/api/v1/questions", json={"items": items})
+        if response.status_code >= 400:
+            raise SystemExit(f"Import: HTTP {response.status_code}")
+
+
+def measure(client, urls, rounds):
+    times = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        response = client.get(urls[i % len(urls)])
+        response.get_data()
+        times.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise SystemExit(f"{urls[i % len(urls)]}: HTTP {response.status_code}")
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(datagen.SIZES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", help="Testbank hier ablegen und wiederverwenden")
+    parser.add_argument("--rounds", type=int, default=100, help="Requests pro Messung")
+    parser.add_argument("--batch", type=int, default=10_000, help="Fragen pro Importstapel")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    sizes = datagen.SIZES[args.size]
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        template = os.path.join(data_dir, f"bench-{args.size}-{args.seed}.db")
+        if not os.path.exists(template):
+            print(f"Erzeuge Testbank {args.size} …")
+            datagen.generate_bank(template, seed=args.seed, **sizes)
+
+        db_path = os.path.join(tmp, "run", "questions.db")
+        os.makedirs(os.path.dirname(db_path))
+        copy_database(template, db_path)
+
+        settings = {"DB_PATH": db_path, "JOB_WORKERS": 0, "PREVIEW_CACHE_ENTRIES": 0,
+                    "API_MAX_BATCH": args.batch, "SNAPSHOT_INTERVAL": 0,
+                    "SECRET_KEY": "bench"}
+        live_app = create_app(dict(settings, READ_SNAPSHOTS=False))
+        snapshot_app = create_app(dict(settings, READ_SNAPSHOTS=True))
+        start = time.perf_counter()
+        snapshots.publish(db_path, snapshot_app.config["SNAPSHOT_DIR"])
+        print(f"Momentaufnahme: {time.perf_counter() - start:.2f} s\n")
+
+        # Themen und Tests aus der ersten Hälfte (die Schreibszenarien der
+        # Suite arbeiten von hinten, hier wird nur gelesen)
+        topics = range(1, sizes["topics"] // 2, max(1, sizes["topics"] // 40))
+        tests = range(1, sizes["tests"] // 2, max(1, sizes["tests"] // 40))
+        pages = {
+            "Katalog": [f"/topic/{t}/catalog?page_size=500" for t in topics],
+            "Vorschau": [f"/tests/{t}/preview" for t in tests],
+        }
+
+        print(f"{'Seite':<10} {'Import':<6} {'Quelle':<14} {'Median':>8} {'p95':>8} {'Max':>8}")
+        for importing in (False, True):
+            stop = threading.Event()
+            thread = None
+            if importing:
+                thread = threading.Thread(target=import_loop, args=(
+                    live_app.test_client(), args.batch, stop, sizes["topics"]))
+                thread.start()
+                time.sleep(0.5)
+            try:
+                for page, urls in pages.items():
+                    for label, app in (("Datenbank", live_app), ("Momentaufnahme", snapshot_app)):
+                        times = sorted(measure(app.test_client(), urls, args.rounds))
+                        p95 = times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))]
+                        print(f"{page:<10} {'ja' if importing else 'nein':<6} {label:<14} "
+                              f"{statistics.median(times) * 1000:>8.2f} {p95 * 1000:>8.2f} "
+                              f"{times[-1] * 1000:>8.2f}")
+            finally:
+                stop.set()
+                if thread:
+                    thread.join()
+
+        for app in (live_app, snapshot_app):
+            app.db_pool.close()
+            app.pdf_exporter.shutdown()
+        snapshot_app.snapshot_reader.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Startzeit: wie schnell beantwortet die App nach dem Start den ersten Request?
+
+Jede Messung startet einen frischen Python-Prozess. "kalt" heißt: leerer
+Datenordner (Datenbank wird angelegt, Templates werden kompiliert), "warm":
+zweiter Start mit derselben Datenbank und gefülltem Template-Cache.
+
+- ``import``: nur ``import app``
+- ``create_app``: Import, ``create_app()`` und erster Request ``/``
+  über den Testclient (ohne Server)
+- ``gunicorn``: Start von gunicorn bis zur ersten Antwort auf ``/``
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --rounds 10 --modes create_app
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ziel: Container antwortet deutlich unter einer Sekunde nach dem Start
+TARGET = 1.0
+
+IMPORT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+print(json.dumps({"import": time.perf_counter() - start}))
+"""
+
+CREATE_APP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+flask_app = app.create_app()
+created = time.perf_counter()
+response = flask_app.test_client().get("/")
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+flask_app.job_runner.shutdown()
+print(json.dumps({"import": imported - start, "create_app": created - imported,
+                  "first_request": done - created}))
+"""
+
+
+def run_script(script, env):
+    """Python-Prozess starten; Gesamtzeit und die Teilzeiten aus seiner Ausgabe."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    parts = json.loads(result.stdout.strip().splitlines()[-1])
+    return dict(parts, total=total)
+
+
+def run_gunicorn(env, port, timeout=30):
+    """gunicorn starten und die Zeit bis zur ersten erfolgreichen Antwort messen."""
+    env = dict(env, PORT=str(port), WEB_ACCESS_LOG="", WEB_WORKERS="2")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:create_app()"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise SystemExit(f"gunicorn wurde beendet (Exit-Code {process.returncode}).")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+                conn.request("GET", "/")
+                status = conn.getresponse().status
+                conn.close()
+                if status == 200:
+                    return {"total": time.perf_counter() - start}
+            except OSError:
+                pass
+            time.sleep(0.01)
+        raise SystemExit("gunicorn antwortet nicht.")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def measure(mode, rounds, port):
+    """Pro Runde ein kalter und ein warmer Start in einem neuen Datenordner."""
+    results = {"kalt": [], "warm": []}
+    for _ in range(rounds):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DB_PATH=os.path.join(tmp, "data", "questions.db"),
+                       SECRET_KEY="bench")
+            for phase in ("kalt", "warm"):
+                if mode == "import":
+                    results[phase].append(run_script(IMPORT_SCRIPT, env))
+                elif mode == "create_app":
+                    results[phase].append(run_script(CREATE_APP_SCRIPT, env))
+                else:
+                    results[phase].append(run_gunicorn(env, port))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["import", "create_app", "gunicorn"],
+                        choices=["import", "create_app", "gunicorn"])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--port", type=int, default=5098)
+    args = parser.parse_args()
+
+    print(f"Median aus {args.rounds} Runden, Millisekunden (Gesamt = inkl. Python-Start)\n")
+    print(f"{'Modus':<12} {'Start':<6} {'Gesamt':>8} {'Import':>8} "
+          f"{'create_app':>11} {'1. Request':>11}")
+    slow = False
+    for mode in args.modes:
+        for phase, runs in measure(mode, args.rounds, args.port).items():
+            def median(key):
+                values = [run[key] for run in runs if key in run]
+                return f"{statistics.median(values) * 1000:.0f}" if values else "–"
+
+            total = statistics.median(run["total"] for run in runs)
+            slow = slow or (mode == "gunicorn" and total > TARGET)
+            print(f"{mode:<12} {phase:<6} {median('total'):>8} {median('import'):>8} "
+                  f"{median('create_app'):>11} {median('first_request'):>11}")
+
+    if slow:
+        print(f"\nWARNUNG: gunicorn braucht länger als {TARGET:g} s bis zur ersten Antwort.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Gestreamte Seiten: Zeit bis zum ersten Byte und Spitzenspeicher.
+
+Fragenkatalog eines Themas (``?all=1``, alle Fragen auf einer Seite) und
+Testvorschau (ohne Vorschau-Cache) für wachsende Fragenzahlen, einmal wie
+die Routen jetzt arbeiten (Cursor Zeile für Zeile, ``stream_template``),
+einmal wie vorher (``fetchall()`` und ``render_template()``, hier
+nachgebaut). Die Antwort wird wie von einem Server blockweise gelesen und
+verworfen; gemessen werden die Zeit bis zum ersten Block, die Gesamtzeit
+und der Spitzenspeicher (tracemalloc) während des Requests.
+
+    python -m benchmarks.bench_streaming
+    python -m benchmarks.bench_streaming --sizes 1000,20000,100000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flask import render_template
+from werkzeug.test import EnvironBuilder
+
+import database
+import results
+
+TEXT = ("Beschreiben Sie Aufbau und Wirkungsweise eines Drehstrom-Asynchronmotors "
+        "und nennen Sie zwei typische Anwendungen im Maschinenbau. ")
+
+
+def fill(db_path, sizes):
+    """Pro Größe ein Thema und einen Test mit so vielen Fragen. Gibt {Größe: (Thema, Test)}."""
+    conn = sqlite3.connect(db_path)
+    ids = {}
+    with conn:
+        for size in sizes:
+            topic_id = conn.execute("INSERT INTO topics (name) VALUES (?)",
+                                    (f"Streaming {size}",)).lastrowid
+            conn.executemany(
+                "INSERT INTO questions (text, topic_id, difficulty, points) VALUES (?, ?, ?, ?)",
+                ((f"{i}. {TEXT}", topic_id, 1 + i % 5, 1 + i % 3) for i in range(size)))
+            test_id = conn.execute("INSERT INTO tests (name) VALUES (?)",
+                                   (f"Streaming {size}",)).lastrowid
+            conn.execute(
+                """
+                INSERT INTO test_questions (test_id, question_id, position)
+                SELECT ?, id, ROW_NUMBER() OVER (ORDER BY id) FROM questions WHERE topic_id = ?
+                """, (test_id, topic_id))
+            ids[size] = (topic_id, test_id)
+    conn.close()
+    return ids
+
+
+def streamed(app, url):
+    """Route aufrufen; liefert den Antwort-Iterator (noch nicht gelesen)."""
+    environ = EnvironBuilder(path=url.split("?")[0],
+                             query_string=url.partition("?")[2]).get_environ()
+    status = []
+    body = app(environ, lambda s, headers, exc_info=None: status.append(s))
+    if not status[0].startswith("200"):
+        raise SystemExit(f"{url}: {status[0]}")
+    return body
+
+
+def buffered(app, url, render):
+    """Wie die Routen vorher: alle Zeilen holen, dann das ganze HTML bauen."""
+    with app.test_request_context(url):
+        with app.db_pool.connection() as conn:
+            return iter([render(conn).encode("utf-8")])
+
+
+def old_catalog(topic_id):
+    def render(conn):
+        topic = conn.execute("SELECT id, name, description FROM topics WHERE id = ?",
+                             (topic_id,)).fetchone()
+        questions = conn.execute(
+            "SELECT id, text FROM questions WHERE topic_id = ? AND is_active = 1 ORDER BY id",
+            (topic_id,)).fetchall()
+        return render_template("topic_catalog.html", topic=topic, questions=questions,
+                               difficulty=None, page_size=None, show_all=True, start=1,
+                               live=False, snapshot_time=None)
+    return render
+
+
+def old_preview(test_id):
+    def render(conn):
+        test = conn.execute("SELECT id, name, date, notes, version FROM tests WHERE id = ?",
+                            (test_id,)).fetchone()
+        questions = conn.execute(
+            """
+            SELECT q.id, q.text, q.points, t.name AS topic_name, tq.position
+            FROM test_questions tq
+            JOIN questions q ON q.id = tq.question_id
+            JOIN topics t ON t.id = q.topic_id
+            WHERE tq.test_id = ?
+            ORDER BY tq.position
+            """, (test_id,)).fetchall()
+        _, steps = results.scale_for_test(conn, test_id)
+        total_points = sum(q["points"] if q["points"] is not None else 1 for q in questions)
+        return render_template("test_preview.html", test=test, questions=questions,
+                               grading_key=results.format_scale(steps),
+                               total_points=total_points)
+    return render
+
+
+def measure(make_body):
+    """(erstes Byte s, gesamt s, Spitze MB, Bytes) beim blockweisen Lesen der Antwort."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    body = make_body()
+    first = None
+    total = 0
+    for chunk in body:
+        if first is None:
+            first = time.perf_counter() - start
+        total += len(chunk)
+    if hasattr(body, "close"):
+        body.close()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, elapsed, peak / 1e6, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,5000,20000",
+                        help="Fragenzahlen, durch Komma getrennt")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    from app import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "questions.db")
+        database.init_db(db_path)
+        ids = fill(db_path, sizes)
+        app = create_app({"DB_PATH": db_path, "JOB_WORKERS": 0, "PREVIEW_CACHE_ENTRIES": 0,
+                          "READ_SNAPSHOTS": False, "SECRET_KEY": "bench"})
+        try:
+            print(f"{'Seite':<9} {'Fragen':>7} {'Art':<10} {'1. Byte ms':>10} "
+                  f"{'gesamt ms':>10} {'Spitze MB':>10} {'HTML MB':>8}")
+            for size in sizes:
+                topic_id, test_id = ids[size]
+                pages = [
+                    ("Katalog", f"/topic/{topic_id}/catalog?all=1", old_catalog(topic_id)),
+                    ("Vorschau", f"/tests/{test_id}/preview", old_preview(test_id)),
+                ]
+                for page, url, render in pages:
+                    # einmal vorab: Templates kompiliert, Seiten im Page-Cache
+                    measure(lambda: streamed(app, url))
+                    variants = [
+                        ("gestreamt", lambda: streamed(app, url)),
+                        ("komplett", lambda: buffered(app, url, render)),
+                    ]
+                    for label, make_body in variants:
+                        first, elapsed, peak, total = measure(make_body)
+                        print(f"{page:<9} {size:>7} {label:<10} {first * 1000:>10.1f} "
+                              f"{elapsed * 1000:>10.1f} {peak:>10.2f} {total / 1e6:>8.2f}")
+        finally:
+            app.pdf_exporter.shutdown()
+            app.db_pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
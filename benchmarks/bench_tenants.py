@@ -0,0 +1,125 @@
+"""Mandanten: bremst ein großer Import einer Fachgruppe die anderen aus?
+
+Ein Thread schreibt ununterbrochen große Stapel über die API
+(``POST /<mandant>/api/v1/questions``, eine Transaktion pro Stapel), ein
+zweiter legt währenddessen einzelne Fragen über das Formular an und misst
+die Antwortzeiten. Verglichen werden:
+
+- ``ohne Last``: kein Import läuft
+- ``gleicher Mandant``: Import und Formular in derselben Datenbank, das
+  Formular wartet auf die Schreibsperre (so verhielt sich die Instanz mit
+  einer Datenbank für alle)
+- ``anderer Mandant``: Import in ``a``, Formular in ``b``
+
+    python -m benchmarks.bench_tenants
+    python -m benchmarks.bench_tenants --batch 20000 --requests 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.test import Client
+
+import database
+import tenants
+
+SCENARIOS = [
+    ("ohne Last", None, "b"),
+    ("gleicher Mandant", "a", "a"),
+    ("anderer Mandant", "a", "b"),
+]
+
+
+def question_form():
+    return {"text": "Wozu dient ein Druckbegrenzungsventil?", "topic_id": "1",
+            "difficulty": "2", "points": "2", "solution": "", "confirm_duplicate": "1"}
+
+
+def import_loop(client, tenant, batch, stop):
+    """Stapel über die API schreiben, bis ``stop`` gesetzt ist. Gibt die Stapelzeiten zurück."""
+    items = [{"text": f"Importierte Frage {i}", "topic_id": 1, "difficulty": 1 + i % 5,
+              "points": 1} for i in range(batch)]
+    times = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = client.post(f"/{tenant}/api/v1/questions", json={"items": items})
+        if response.status_code >= 400:
+            raise SystemExit(f"Import: HTTP {response.status_code}")
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def measure(dispatcher, writer, target, batch, requests, pause):
+    """Antwortzeiten von ``requests`` Formular-Requests an ``target``, optional mit Import."""
+    stop = threading.Event()
+    import_times = []
+    thread = None
+    if writer:
+        def run():
+            import_times.extend(import_loop(Client(dispatcher), writer, batch, stop))
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        time.sleep(0.2)  # Import läuft, bevor gemessen wird
+
+    client = Client(dispatcher)
+    times = []
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.post(f"/{target}/question/new", data=question_form())
+            times.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise SystemExit(f"Formular: HTTP {response.status_code}")
+            time.sleep(pause)
+    finally:
+        stop.set()
+        if thread:
+            thread.join()
+    return times, import_times
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(share * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=10_000, help="Fragen pro Importstapel")
+    parser.add_argument("--requests", type=int, default=30, help="Formular-Requests pro Szenario")
+    parser.add_argument("--pause", type=float, default=0.02, help="Sekunden zwischen Requests")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tenants_dir = os.path.join(tmp, "tenants")
+        for name in ("a", "b"):
+            database.seed_demo_data(tenants.create_tenant(tenants_dir, name))
+        dispatcher = create_app({"TENANT_MODE": "path", "TENANTS_DIR": tenants_dir,
+                                 "DB_PATH": os.path.join(tmp, "questions.db"),
+                                 "API_MAX_BATCH": args.batch, "JOB_WORKERS": 0,
+                                 "SECRET_KEY": "bench"})
+        try:
+            print(f"Formular-Requests, Millisekunden (Importstapel: {args.batch} Fragen)\n")
+            print(f"{'Szenario':<18} {'Median':>8} {'p95':>8} {'Max':>8} {'Stapel':>8}")
+            for label, writer, target in SCENARIOS:
+                times, import_times = measure(dispatcher, writer, target, args.batch,
+                                              args.requests, args.pause)
+                batch = f"{statistics.median(import_times) * 1000:.0f}" if import_times else "–"
+                print(f"{label:<18} {statistics.median(times) * 1000:>8.1f} "
+                      f"{percentile(times, 0.95) * 1000:>8.1f} {max(times) * 1000:>8.1f} "
+                      f"{batch:>8}")
+        finally:
+            dispatcher.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
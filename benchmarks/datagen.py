@@ -0,0 +1,192 @@
+"""Synthetische Fragenbank für Benchmarks.
+
+Erzeugt reproduzierbar (fester Seed) Themen, Fragen mit Lösungen in
+realistischer Länge, Tests und Zuordnungen, für die Tests des letzten
+Schuljahres auch Schüler und Punkte. Größen:
+
+    small     1.000 Fragen,    50 Themen,    100 Tests
+    medium  100.000 Fragen, 2.000 Themen,  2.000 Tests
+    large 1.000.000 Fragen, 5.000 Themen, 10.000 Tests
+
+    python -m benchmarks.datagen --size medium --db /tmp/bench-medium.db
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import time
+
+import database
+import duplicates
+from benchmarks.bench_import import TOPICS
+from benchmarks.bench_search import build_vocabulary
+
+SIZES = {
+    "small": {"questions": 1_000, "topics": 50, "tests": 100},
+    "medium": {"questions": 100_000, "topics": 2_000, "tests": 2_000},
+    "large": {"questions": 1_000_000, "topics": 5_000, "tests": 10_000},
+}
+
+# Zeilen pro Transaktion
+CHUNK_SIZE = 50_000
+
+# Wortanzahl: Fragen ca. 150–350 Zeichen, Lösungen ca. 200–600 Zeichen
+QUESTION_WORDS = (8, 22)
+SOLUTION_WORDS = (12, 40)
+QUESTIONS_PER_TEST = (15, 30)
+
+# Ergebnisse: Tests ab diesem Datum, je Test eine Klasse
+RESULTS_FROM = "2024-09-01"
+CLASSES = 8
+STUDENTS_PER_CLASS = 25
+
+STARTERS = [
+    "Erklären Sie", "Beschreiben Sie", "Nennen Sie", "Begründen Sie",
+    "Vergleichen Sie", "Skizzieren Sie", "Berechnen Sie", "Welche Aufgabe hat",
+]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _sentence(rnd, words, weights, bounds):
+    return " ".join(rnd.choices(words, weights, k=rnd.randint(*bounds)))
+
+
+def generate_bank(db_path, questions, topics, tests, seed=42, quiet=False):
+    """Datenbank unter ``db_path`` anlegen und füllen. Gibt die Laufzeit in s zurück."""
+    start = time.perf_counter()
+    rnd = random.Random(seed)
+    words, weights = build_vocabulary(rnd)
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    database.init_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    # Nur für das Befüllen: ein Absturz hier kostet nur die Testdaten
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -200000")
+
+    conn.executemany(
+        "INSERT INTO topics (name, description) VALUES (?, ?)",
+        [
+            (f"{TOPICS[i % len(TOPICS)]} {i // len(TOPICS) + 1:04d}",
+             _sentence(rnd, words, weights, (5, 15)))
+            for i in range(topics)
+        ]
+    )
+    conn.commit()
+
+    def question_rows():
+        for _ in range(questions):
+            yield (
+                f"{rnd.choice(STARTERS)} {_sentence(rnd, words, weights, QUESTION_WORDS)}?",
+                rnd.randint(1, topics),
+                rnd.choices((1, 2, 3, 4, 5), (30, 30, 20, 12, 8))[0],
+                rnd.choice((1.0, 1.0, 2.0, 2.0, 3.0, 4.0, 1.5)),
+                _sentence(rnd, words, weights, SOLUTION_WORDS) + ".",
+            )
+
+    done = 0
+    for chunk in _chunks(question_rows(), CHUNK_SIZE):
+        conn.executemany(
+            """
+            INSERT INTO questions (text, topic_id, difficulty, points, solution)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            chunk
+        )
+        conn.commit()
+        done += len(chunk)
+        if not quiet:
+            print(f"  {done:,} / {questions:,} Fragen", end="\r", flush=True)
+    if not quiet:
+        print()
+
+    first_date = datetime.date(2020, 9, 1)
+    conn.executemany(
+        "INSERT INTO tests (name, date, notes) VALUES (?, ?, ?)",
+        [
+            (f"Schularbeit {i + 1} – {TOPICS[i % len(TOPICS)]}",
+             (first_date + datetime.timedelta(days=rnd.randint(0, 5 * 365))).isoformat(),
+             "Hilfsmittel: Taschenrechner" if i % 3 == 0 else "")
+            for i in range(tests)
+        ]
+    )
+
+    def assignment_rows():
+        for test_id in range(1, tests + 1):
+            count = min(questions, rnd.randint(*QUESTIONS_PER_TEST))
+            for pos, qid in enumerate(rnd.sample(range(1, questions + 1), count), start=1):
+                yield test_id, qid, pos
+
+    for chunk in _chunks(assignment_rows(), CHUNK_SIZE):
+        conn.executemany(
+            "INSERT INTO test_questions (test_id, question_id, position) VALUES (?, ?, ?)",
+            chunk
+        )
+    conn.commit()
+
+    # Punkte nach "Können" des Schülers und Schwierigkeit der Frage gestreut,
+    # auf halbe Punkte gerundet
+    conn.executemany(
+        "INSERT INTO students (class_name, name) VALUES (?, ?)",
+        [(f"{c + 1}AHET", f"Schüler {s + 1:02d}")
+         for c in range(CLASSES) for s in range(STUDENTS_PER_CLASS)]
+    )
+    ability = [rnd.uniform(0.35, 1.0) for _ in range(CLASSES * STUDENTS_PER_CLASS)]
+    scored = conn.execute(
+        """
+        SELECT tq.test_id, tq.question_id, q.points, q.difficulty
+        FROM tests t
+        JOIN test_questions tq ON tq.test_id = t.id
+        JOIN questions q ON q.id = tq.question_id
+        WHERE t.date >= ?
+        ORDER BY tq.test_id
+        """,
+        (RESULTS_FROM,)
+    ).fetchall()
+
+    def result_rows():
+        for test_id, qid, points, difficulty in scored:
+            first = (test_id % CLASSES) * STUDENTS_PER_CLASS
+            for student in range(first, first + STUDENTS_PER_CLASS):
+                share = rnd.gauss(ability[student] - 0.07 * (difficulty - 1), 0.25)
+                yield test_id, student + 1, qid, round(points * min(max(share, 0), 1) * 2) / 2
+
+    for chunk in _chunks(result_rows(), CHUNK_SIZE):
+        conn.executemany(
+            "INSERT INTO results (test_id, student_id, question_id, score) VALUES (?, ?, ?, ?)",
+            chunk
+        )
+    conn.commit()
+
+    # Duplikat-Index aufbauen wie nach "python duplicates.py index" im Betrieb
+    duplicates.refresh(conn, batch_size=5000)
+    conn.close()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--db", required=True, help="Zieldatei (wird überschrieben)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    elapsed = generate_bank(args.db, seed=args.seed, **SIZES[args.size])
+    print(f"{args.size}: {args.db} in {elapsed:.1f} s erzeugt")
+
+
+if __name__ == "__main__":
+    main()
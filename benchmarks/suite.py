@@ -0,0 +1,545 @@
+"""Benchmark-Suite: alle Routen, Katalog-Import, Archiv und init_db auf einer Testbank.
+
+Jedes Szenario läuft nach einer Aufwärmrunde mehrfach; gespeichert werden
+min/max/Mittel/Median/Standardabweichung/p95 in einer JSON-Datei. Zwei
+Ergebnisdateien (z.B. von zwei Commits) lassen sich vergleichen.
+
+    python -m benchmarks.suite --size medium --output results-neu.json
+    python -m benchmarks.suite --compare results-alt.json results-neu.json
+
+Die Testbank wird einmal erzeugt (``--data-dir`` hält sie zwischen Läufen
+vor) und für jeden Lauf kopiert, damit löschende Szenarien die Vorlage nicht
+verändern. Fehlt für eine Route in app.py ein Szenario, bricht die Suite ab.
+"""
+import argparse
+import datetime
+import gzip
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import archive
+import database
+import duplicates
+import import_access_catalog
+import jobs
+from benchmarks import datagen
+from benchmarks.bench_import import generate_catalog
+
+# Abweichung, ab der --compare eine Verschlechterung meldet
+REGRESSION_THRESHOLD = 0.10
+
+
+class Context:
+    """Zustand eines Laufs: Größen der Testbank und laufende Zähler."""
+
+    def __init__(self, sizes, seed):
+        self.questions = sizes["questions"]
+        self.topics = sizes["topics"]
+        self.tests = sizes["tests"]
+        self.rnd = random.Random(seed)
+        # Löschende Szenarien arbeiten sich von hinten nach vorne durch
+        self.next_question = self.questions
+        self.next_test = self.tests
+        self.next_topic = self.topics
+        self.graded_tests = None
+
+    def question(self):
+        return self.rnd.randint(1, self.questions // 2)
+
+    def topic(self):
+        return self.rnd.randint(1, self.topics // 2)
+
+    def test(self):
+        return self.rnd.randint(1, self.tests // 2)
+
+    def take(self, name):
+        value = getattr(self, name)
+        setattr(self, name, value - 1)
+        return value
+
+    def take_many(self, name, count):
+        return [str(self.take(name)) for _ in range(count)]
+
+    def finished_job(self, kind):
+        """ID eines fertigen Auftrags der Art ``kind`` (wartende vorher ausführen)."""
+        self.app.job_runner.run_pending()
+        conn = jobs.connect(self.app.config["JOBS_DB_PATH"])
+        try:
+            return conn.execute(
+                "SELECT max(id) FROM jobs WHERE kind = ? AND status = 'done'", (kind,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def graded_test(self):
+        """Zufälliger Test mit Ergebnissen (datagen füllt das letzte Schuljahr)."""
+        if self.graded_tests is None:
+            with self.app.db_pool.connection() as conn:
+                self.graded_tests = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT test_id FROM results")]
+        return self.rnd.choice(self.graded_tests)
+
+    def grading_scale(self):
+        """Zuletzt angelegter Notenschlüssel (nicht der Standard)."""
+        with self.app.db_pool.connection() as conn:
+            return conn.execute(
+                "SELECT max(id) FROM grading_scales WHERE is_default = 0"
+            ).fetchone()[0]
+
+    def history_test(self):
+        """Kleinste ID in history.db (wartende Aufträge, z.B. das Auslagern, vorher ausführen)."""
+        self.app.job_runner.run_pending()
+        with self.app.db_pool.connection() as conn:
+            return conn.execute("SELECT min(id) FROM history.tests").fetchone()[0]
+
+
+def question_form(ctx):
+    return {"text": "Erklären Sie die Funktion eines Druckbegrenzungsventils?",
+            "topic_id": str(ctx.topic()), "difficulty": "2", "points": "2",
+            "solution": "Begrenzt den Systemdruck."}
+
+
+def class_scores(ctx, students=25, questions=15):
+    """Punkte einer Klasse zum Einfügen (Kopfzeile, ein Schüler pro Zeile)."""
+    lines = ["Name\t" + "\t".join(f"F{i + 1}" for i in range(questions))]
+    lines += [f"Bench {i + 1:02d}\t" + "\t".join(ctx.rnd.choice(("0", "0,5", "1"))
+                                                  for _ in range(questions))
+              for i in range(students)]
+    return {"class_name": "9BENCH", "scores": "\n".join(lines)}
+
+
+def api_questions(ctx, count=1000):
+    return ("json", {"items": [
+        {"text": f"Erklären Sie Bauteil {ctx.rnd.random():.6f}?", "topic_id": ctx.topic(),
+         "difficulty": 2, "points": 2}
+        for _ in range(count)
+    ]})
+
+
+def archive_upload(ctx, count=500):
+    """Kleines Archiv (ein Thema, ``count`` Fragen) als Upload für /archive/import."""
+    lines = [
+        {"format": archive.FORMAT, "version": archive.FORMAT_VERSION},
+        {"table": "topics", "columns": ["id", "name", "description"]},
+        [1, f"Archiv-Thema {ctx.rnd.random()}", ""],
+        {"table": "questions", "columns": ["id", "text", "topic_id", "points"]},
+    ]
+    lines += [[i, f"Archivfrage {i}: Erklären Sie das Bauteil?", 1, 2.0]
+              for i in range(1, count + 1)]
+    lines.append({"end": {"topics": 1, "questions": count}})
+    data = gzip.compress("".join(json.dumps(line) + "\n" for line in lines).encode())
+    return {"archive": (io.BytesIO(data), "bank.ndjson.gz")}
+
+
+def catalog_upload(ctx, count=500):
+    """Fragenkatalog (ID;Frage;Thema;Punkte) als Upload für /archive/catalog."""
+    topic = f"Katalog-Thema {ctx.rnd.random()}"
+    data = "".join(f"{i};Katalogfrage {i}: Wozu dient das Bauteil?;{topic};2\n"
+                   for i in range(1, count + 1))
+    return {"catalog": (io.BytesIO(data.encode()), "katalog.txt")}
+
+
+# (name, methode, url(ctx), formulardaten(ctx) oder None, runden oder None)
+# Formulardaten ("json", daten) werden als JSON-Body geschickt.
+# runden=None: Standardanzahl; löschende Szenarien laufen weniger oft.
+ROUTE_SCENARIOS = [
+    ("index", "GET", lambda c: "/", None, None),
+    ("db_pool_stats", "GET", lambda c: "/stats/db-pool", None, None),
+    ("preview_cache_stats", "GET", lambda c: "/stats/preview-cache", None, None),
+    ("pdf_stats", "GET", lambda c: "/stats/pdf", None, None),
+    ("job_stats", "GET", lambda c: "/stats/jobs", None, None),
+    ("topic_questions", "GET", lambda c: f"/topic/{c.topic()}", None, None),
+    ("topic_questions_page2", "GET",
+     lambda c: f"/topic/{c.topic()}?after_id={c.questions // 3}&difficulty=2", None, None),
+    ("topic_questions_archived", "GET", lambda c: f"/topic/{c.topic()}?archived=1", None, None),
+    ("topic_catalog", "GET", lambda c: f"/topic/{c.topic()}/catalog", None, None),
+    ("new_question_form", "GET", lambda c: "/question/new", None, None),
+    ("new_question", "POST", lambda c: "/question/new", question_form, None),
+    ("new_question_confirmed", "POST", lambda c: "/question/new",
+     lambda c: dict(question_form(c), confirm_duplicate="1"), None),
+    ("edit_question_form", "GET", lambda c: f"/question/{c.question()}/edit", None, None),
+    ("edit_question", "POST", lambda c: f"/question/{c.question()}/edit", question_form, None),
+    ("archive_question", "POST", lambda c: f"/question/{c.question()}/archive", None, 10),
+    ("bulk_archive", "POST", lambda c: "/bulk-archive",
+     lambda c: {"ids": [str(c.question()) for _ in range(100)]}, 10),
+    ("bulk_restore", "POST", lambda c: "/bulk-archive",
+     lambda c: {"ids": [str(c.question()) for _ in range(100)], "restore": "1"}, 10),
+    ("search", "GET", lambda c: "/search?q=Druckventil", None, None),
+    ("search_prefix", "GET", lambda c: "/search?q=Steuerger", None, None),
+    ("search_topic", "GET", lambda c: f"/search?q=Pumpe&topic_id={c.topic()}", None, None),
+    ("list_tests", "GET", lambda c: "/tests", None, None),
+    ("new_test_form", "GET", lambda c: "/tests/new", None, None),
+    ("new_test", "POST", lambda c: "/tests/new",
+     lambda c: {"name": "Schularbeit", "date": "2025-06-01", "notes": ""}, None),
+    ("edit_test_form", "GET", lambda c: f"/tests/{c.test()}/edit", None, None),
+    ("edit_test", "POST", lambda c: f"/tests/{c.test()}/edit",
+     lambda c: {"name": "Schularbeit (geändert)", "date": "2025-06-02", "notes": ""}, None),
+    ("edit_test_questions_form", "GET", lambda c: f"/tests/{c.test()}/questions", None, None),
+    ("edit_test_questions_filtered", "GET",
+     lambda c: f"/tests/{c.test()}/questions?topic_id={c.topic()}&difficulty=1", None, None),
+    ("edit_test_questions", "POST", lambda c: f"/tests/{c.test()}/questions",
+     lambda c: {"question_ids": [str(c.question()) for _ in range(25)]}, None),
+    ("test_preview", "GET", lambda c: f"/tests/{c.test()}/preview", None, None),
+    ("test_pdf", "GET", lambda c: f"/tests/{c.test()}/pdf?solutions=1", None, 5),
+    ("generate_test_form", "GET", lambda c: f"/tests/{c.test()}/generate", None, None),
+    ("generate_test", "POST", lambda c: f"/tests/{c.test()}/generate",
+     lambda c: {"total_points": "40", "difficulty_share_1": "2", "difficulty_share_2": "1",
+                "exclude_recent_tests": "3"}, None),
+    ("test_variants_form", "GET", lambda c: f"/tests/{c.test()}/variants", None, None),
+    ("test_variants", "POST", lambda c: f"/tests/{c.test()}/variants",
+     lambda c: {"count": "30", "substitute": "1"}, None),
+    ("duplicate_test", "POST", lambda c: f"/tests/{c.test()}/duplicate", None, None),
+    ("test_results", "GET", lambda c: f"/tests/{c.graded_test()}/results", None, None),
+    ("save_test_results", "POST", lambda c: f"/tests/{c.graded_test()}/results",
+     class_scores, None),
+    ("set_test_grading_scale", "POST", lambda c: f"/tests/{c.graded_test()}/results",
+     lambda c: {"grading_scale_id": ""}, None),
+    ("delete_test_results", "POST", lambda c: f"/tests/{c.graded_test()}/results/delete",
+     lambda c: {"student_ids": [str(i) for i in range(1, 26)]}, 10),
+    ("grading_scales", "GET", lambda c: "/grading-scales", None, None),
+    ("save_grading_scale", "POST", lambda c: "/grading-scales",
+     lambda c: {"name": f"Schlüssel {c.rnd.random()}",
+                "steps": "1;Sehr gut;90\n2;Gut;80\n3;Befriedigend;65\n4;Genügend;50\n"
+                         "5;Nicht genügend;0"}, 10),
+    ("delete_grading_scale", "POST",
+     lambda c: f"/grading-scales/{c.grading_scale()}/delete", None, 5),
+    ("results_year", "GET", lambda c: "/results?from=2024-09-01&to=2025-08-31", None, None),
+    ("common_bank", "GET", lambda c: "/common", None, None),
+    ("common_topic", "GET", lambda c: f"/common/topic/{c.topic()}", None, None),
+    ("common_copy", "POST", lambda c: "/common/copy",
+     lambda c: {"ids": [str(c.question()) for _ in range(25)]}, 10),
+    ("new_topic_form", "GET", lambda c: "/topic/new", None, None),
+    ("new_topic", "POST", lambda c: "/topic/new",
+     lambda c: {"name": f"Neues Thema {c.rnd.random()}", "description": ""}, None),
+    ("edit_topic_form", "GET", lambda c: f"/topic/{c.topic()}/edit", None, None),
+    ("edit_topic", "POST", lambda c: f"/topic/{c.topic()}/edit",
+     lambda c: {"name": f"Thema {c.rnd.random()}", "description": "geändert"}, None),
+    ("api_list_questions", "GET",
+     lambda c: f"/api/v1/questions?topic_id={c.topic()}&limit=200", None, None),
+    ("api_list_questions_fields", "GET",
+     lambda c: f"/api/v1/questions?cursor={c.questions // 2}&limit=1000&fields=text", None, None),
+    ("api_list_tests", "GET", lambda c: "/api/v1/tests?limit=200", None, None),
+    ("api_get_question", "GET", lambda c: f"/api/v1/questions/{c.question()}", None, None),
+    ("api_export_questions", "GET", lambda c: "/api/v1/export/questions.ndjson", None, 3),
+    ("api_create_questions", "POST", lambda c: "/api/v1/questions", api_questions, 5),
+    ("api_update_questions", "POST", lambda c: "/api/v1/questions",
+     lambda c: ("json", [{"id": i, "difficulty": 3, "points": 2} for i in range(1, 1001)]), 5),
+    ("api_write_topics", "POST", lambda c: "/api/v1/topics",
+     lambda c: ("json", [{"name": f"API-Thema {c.rnd.random()}"}]), None),
+    ("api_write_tests", "POST", lambda c: "/api/v1/tests",
+     lambda c: ("json", [{"name": "API-Test", "question_ids": [c.question() for _ in range(25)]}]),
+     None),
+    ("api_put_test_questions", "PUT", lambda c: f"/api/v1/tests/{c.test()}/questions",
+     lambda c: ("json", {"question_ids": [c.question() for _ in range(25)]}), None),
+    ("duplicates_report", "GET", lambda c: "/duplicates", None, None),
+    ("duplicates_report_page", "GET", lambda c: "/duplicates?min=0.6&page=3", None, None),
+    ("archive_page", "GET", lambda c: "/archive", None, None),
+    ("archive_export", "GET", lambda c: "/archive/export", None, 3),
+    ("archive_snapshot", "GET", lambda c: "/archive/snapshot", None, 3),
+    ("publish_snapshot", "POST", lambda c: "/archive/read-snapshot", None, 3),
+    ("archive_import", "POST", lambda c: "/archive/import", archive_upload, 5),
+    ("catalog_import", "POST", lambda c: "/archive/catalog", catalog_upload, 5),
+    ("archive_export_job", "POST", lambda c: "/archive/export-job", None, 5),
+    ("duplicates_index", "POST", lambda c: "/duplicates/index", None, 5),
+    ("jobs_page", "GET", lambda c: "/jobs", None, None),
+    ("job_status", "GET", lambda c: "/jobs/1", None, None),
+    ("job_download", "GET",
+     lambda c: f"/jobs/{c.finished_job('archive_export')}/download", None, 3),
+    ("cancel_job", "POST", lambda c: "/jobs/1/cancel", None, 5),
+    ("merge_duplicates", "POST", lambda c: "/duplicates/merge",
+     lambda c: {"keep": str(c.question()), "drop": str(c.take("next_question"))}, 10),
+    ("delete_question", "POST",
+     lambda c: f"/question/{c.take('next_question')}/delete", None, 10),
+    ("delete_test", "POST", lambda c: f"/tests/{c.take('next_test')}/delete", None, 10),
+    ("delete_topic", "POST", lambda c: f"/topic/{c.take('next_topic')}/delete", None, 5),
+    ("bulk_delete_questions", "POST", lambda c: "/bulk-delete",
+     lambda c: {"kind": "questions", "ids": c.take_many("next_question", 100)}, 5),
+    ("bulk_delete_tests", "POST", lambda c: "/bulk-delete",
+     lambda c: {"kind": "tests", "ids": c.take_many("next_test", 10)}, 5),
+    ("bulk_delete_topics", "POST", lambda c: "/bulk-delete",
+     lambda c: {"kind": "topics", "ids": c.take_many("next_topic", 3)}, 5),
+    # Zuletzt: das Auslagern entfernt Tests, die oben noch gebraucht werden
+    ("move_tests_job", "POST", lambda c: "/tests/history/move",
+     lambda c: {"before": "2021-09-01"}, 1),
+    ("history_tests", "GET", lambda c: "/tests/history", None, None),
+    ("history_search", "GET", lambda c: "/tests/history?text=Druckventil", None, None),
+    ("history_test", "GET", lambda c: f"/tests/history/{c.history_test()}", None, None),
+    ("restore_history_test", "POST",
+     lambda c: f"/tests/history/{c.history_test()}/restore", None, 5),
+]
+
+
+def summarize(times):
+    times = sorted(times)
+    return {
+        "rounds": len(times),
+        "min": times[0],
+        "max": times[-1],
+        "mean": statistics.fmean(times),
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "p95": times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+    }
+
+
+def run_routes(db_path, sizes, rounds, seed, only=None, common_path=""):
+    """Alle Routen-Szenarien über den Flask-Testclient messen.
+
+    ``common_path``: gemeinsame Fragenbank (die unveränderte Vorlage).
+    """
+    from app import create_app
+
+    # Aufträge nicht nebenher ausführen (verfälscht die Zeiten), sondern am Ende
+    app = create_app({"DB_PATH": db_path,
+                      "PDF_CACHE_DIR": os.path.join(os.path.dirname(db_path), "pdf-cache"),
+                      "COMMON_DB_PATH": common_path,
+                      # Lese-Kopie nur anlegen (Auftrag läuft am Ende), die
+                      # Szenarien lesen weiterhin aus der Datenbank
+                      "READ_SNAPSHOTS": True, "SNAPSHOT_INTERVAL": 0,
+                      "JOB_WORKERS": 0})
+    client = app.test_client()
+    ctx = Context(sizes, seed)
+    ctx.app = app
+
+    results = []
+    called = set()
+    adapter = app.url_map.bind("")
+    for name, method, url_fn, data_fn, scenario_rounds in ROUTE_SCENARIOS:
+        if only and name not in only:
+            continue
+        times = []
+        total = (scenario_rounds or rounds) + 1  # erste Runde = Aufwärmen
+        for i in range(total):
+            url = url_fn(ctx)
+            data = data_fn(ctx) if data_fn else None
+            start = time.perf_counter()
+            if isinstance(data, tuple):  # ("json", daten) für /api/v1
+                response = client.open(url, method=method, json=data[1])
+            else:
+                response = client.open(url, method=method, data=data)
+            response.get_data()  # gestreamte Antworten vollständig lesen
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise SystemExit(f"{name}: {method} {url} -> HTTP {response.status_code}")
+            if i > 0:
+                times.append(elapsed)
+        called.add(adapter.match(url.split("?", 1)[0], method=method)[0])
+        results.append({"name": f"route:{name}", "group": "routes",
+                        "params": {"method": method}, "stats": summarize(times)})
+        print(f"  {name:<32} {results[-1]['stats']['median'] * 1000:9.2f} ms")
+
+    # Angelegte Hintergrundaufträge (Importe, Themen löschen, ...) abarbeiten
+    start = time.perf_counter()
+    count = app.job_runner.run_pending()
+    if count:
+        results.append({"name": "jobs:run_pending", "group": "jobs",
+                        "params": {"jobs": count},
+                        "stats": summarize([time.perf_counter() - start])})
+        print(f"  {'jobs_run_pending':<32} {results[-1]['stats']['median'] * 1000:9.2f} ms")
+
+    app.db_pool.close()
+    app.pdf_exporter.shutdown()
+
+    if not only:
+        endpoints = {rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.endpoint != "static"}
+        missing = sorted(endpoints - called)
+        if missing:
+            raise SystemExit("Kein Szenario für: " + ", ".join(missing))
+    return results
+
+
+def run_import(tmp, rows, rounds):
+    catalog = os.path.join(tmp, "katalog.txt")
+    generate_catalog(catalog, rows)
+    times = []
+    for _ in range(rounds):
+        db_path = os.path.join(tmp, "import.db")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        database.init_db(db_path)
+        start = time.perf_counter()
+        import_access_catalog.import_questions_bulk(catalog, db_path, quiet=True)
+        times.append(time.perf_counter() - start)
+    print(f"  {'import_questions_bulk':<32} {statistics.median(times) * 1000:9.2f} ms")
+
+    # Derselbe Katalog noch einmal mit Duplikatprüfung: alle Zeilen werden
+    # übersprungen. Der Index für den ersten Import entsteht vor der Messung.
+    conn = sqlite3.connect(db_path)
+    duplicates.refresh(conn)
+    conn.close()
+    skip_times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        import_access_catalog.import_questions_bulk(catalog, db_path, quiet=True,
+                                                    on_duplicate="skip")
+        skip_times.append(time.perf_counter() - start)
+    print(f"  {'import_questions_bulk_skip':<32} {statistics.median(skip_times) * 1000:9.2f} ms")
+
+    return [{"name": "import:bulk", "group": "import", "params": {"rows": rows},
+             "stats": summarize(times)},
+            {"name": "import:bulk_skip", "group": "import", "params": {"rows": rows},
+             "stats": summarize(skip_times)}]
+
+
+def run_init_db(tmp, rounds):
+    times = []
+    for i in range(rounds):
+        db_path = os.path.join(tmp, f"init-{i}.db")
+        start = time.perf_counter()
+        database.init_db(db_path)
+        times.append(time.perf_counter() - start)
+        os.remove(db_path)
+    print(f"  {'init_db':<32} {statistics.median(times) * 1000:9.2f} ms")
+    return [{"name": "init_db", "group": "database", "params": {},
+             "stats": summarize(times)}]
+
+
+def run_archive(tmp, template, rounds):
+    """Ganze Testbank exportieren und in eine leere Datenbank importieren."""
+    path = os.path.join(tmp, "bank.ndjson.gz")
+    export_times, import_times = [], []
+    for i in range(rounds):
+        conn = sqlite3.connect(template)
+        start = time.perf_counter()
+        archive.export_archive(conn, path)
+        export_times.append(time.perf_counter() - start)
+        conn.close()
+
+        db_path = os.path.join(tmp, f"archive-{i}.db")
+        database.init_db(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            archive.import_archive(conn, archive.read_archive(f))
+        import_times.append(time.perf_counter() - start)
+        conn.close()
+        os.remove(db_path)
+    print(f"  {'archive_export':<32} {statistics.median(export_times) * 1000:9.2f} ms")
+    print(f"  {'archive_import':<32} {statistics.median(import_times) * 1000:9.2f} ms")
+    size = os.path.getsize(path)
+    return [
+        {"name": "archive:export", "group": "archive", "params": {"bytes": size},
+         "stats": summarize(export_times)},
+        {"name": "archive:import", "group": "archive", "params": {"bytes": size},
+         "stats": summarize(import_times)},
+    ]
+
+
+def copy_database(source, target):
+    """Vorlage per Backup-API kopieren (konsistent, auch mit WAL)."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    with dst:
+        src.backup(dst)
+    src.close()
+    dst.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path, threshold=REGRESSION_THRESHOLD):
+    """Median zweier Ergebnisdateien vergleichen. Gibt die Anzahl Verschlechterungen zurück."""
+    with open(old_path, encoding="utf-8") as f:
+        old = {b["name"]: b for b in json.load(f)["benchmarks"]}
+    with open(new_path, encoding="utf-8") as f:
+        new_data = json.load(f)
+    regressions = 0
+    print(f"{'Szenario':<40} {'alt ms':>10} {'neu ms':>10} {'Änderung':>9}")
+    for bench in new_data["benchmarks"]:
+        before = old.get(bench["name"])
+        after_ms = bench["stats"]["median"] * 1000
+        if before is None:
+            print(f"{bench['name']:<40} {'–':>10} {after_ms:>10.2f} {'neu':>9}")
+            continue
+        before_ms = before["stats"]["median"] * 1000
+        change = (after_ms - before_ms) / before_ms if before_ms else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  ← langsamer"
+            regressions += 1
+        print(f"{bench['name']:<40} {before_ms:>10.2f} {after_ms:>10.2f} "
+              f"{change:>+8.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(datagen.SIZES), default="small")
+    parser.add_argument("--rounds", type=int, default=20, help="Messrunden pro Szenario")
+    parser.add_argument("--import-rows", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", help="Testbank hier ablegen und wiederverwenden")
+    parser.add_argument("--only", nargs="+", help="nur diese Routen-Szenarien")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("ALT", "NEU"),
+                        help="zwei Ergebnisdateien vergleichen statt zu messen")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(*args.compare)
+        return 1 if regressions else 0
+
+    sizes = datagen.SIZES[args.size]
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        template = os.path.join(data_dir, f"bench-{args.size}-{args.seed}.db")
+        if not os.path.exists(template):
+            print(f"Erzeuge Testbank {args.size} …")
+            datagen.generate_bank(template, seed=args.seed, **sizes)
+
+        db_path = os.path.join(tmp, "run", "questions.db")
+        os.makedirs(os.path.dirname(db_path))
+        copy_database(template, db_path)
+
+        print("Routen:")
+        benchmarks = run_routes(db_path, sizes, args.rounds, args.seed, args.only,
+                                common_path=template)
+        if not args.only:
+            print("Import, Archiv und Datenbank:")
+            benchmarks += run_import(tmp, args.import_rows, rounds=3)
+            benchmarks += run_archive(tmp, template, rounds=3)
+            benchmarks += run_init_db(tmp, rounds=10)
+
+    result = {
+        "datetime": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "machine": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "size": args.size,
+        "sizes": sizes,
+        "rounds": args.rounds,
+        "seed": args.seed,
+        "benchmarks": benchmarks,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Ergebnisse: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
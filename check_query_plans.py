@@ -0,0 +1,412 @@
+"""Prüft mit EXPLAIN QUERY PLAN, dass keine Route-Abfrage große Tabellen komplett scannt.
+
+Ablauf:
+1. Frische Datenbank mit Demodaten in einem Temp-Ordner anlegen
+2. Jede Route aus app.py einmal über den Flask-Testclient aufrufen
+3. Alle dabei ausgeführten SQL-Anweisungen mitschneiden (Trace-Callback)
+4. Für jede Anweisung EXPLAIN QUERY PLAN auswerten
+
+Das Skript endet mit Exit-Code 1, wenn
+- eine Abfrage eine nicht erlaubte Tabelle per SCAN liest,
+- eine Fremdschlüsselspalte keinen Index hat (ON DELETE CASCADE sucht die
+  abhängigen Zeilen darüber, diese Suchen erscheinen in keinem Query-Plan),
+- die Fragenzuordnung nach einer gelöschten Frage Positionen doppelt vergibt oder
+- eine Route in app.py hier nicht aufgerufen wird (neue Routen unten ergänzen).
+
+    python check_query_plans.py
+"""
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+# Tabellen, die als Ganzes aufgelistet werden dürfen (klein, z.B. Themenliste;
+# sqlite_sequence hat eine Zeile pro Tabelle; dedupe_queue wird von vorne
+# abgearbeitet und ist normalerweise leer; Notenschlüssel haben wenige Stufen)
+SCAN_ALLOWED = {"topics", "tests", "sqlite_sequence", "dedupe_queue",
+                "grading_scales", "grading_steps"}
+
+# Ausnahmen pro Route: {endpoint: {tabelle, ...}}
+SCAN_ALLOWED_PER_ROUTE = {
+    # Archiv-Export liest absichtlich alles (gestreamt)
+    "main.archive_export": {"questions", "test_questions"},
+    # Auswahlliste der Klassen (DISTINCT über den UNIQUE-Index)
+    "main.test_results": {"students"},
+}
+
+# Routen in der Reihenfolge des Aufrufs: (methode, url, formulardaten).
+# Statt Formulardaten ("json", daten) für einen JSON-Body (/api/v1) oder eine
+# Funktion fn(app), die die Formulardaten erst beim Aufruf erzeugt.
+# Löschende Routen stehen am Ende.
+REQUESTS = [
+    ("GET", "/", None),
+    ("GET", "/stats/db-pool", None),
+    ("GET", "/stats/preview-cache", None),
+    ("GET", "/stats/pdf", None),
+    ("GET", "/stats/jobs", None),
+    ("GET", "/metrics", None),
+    ("GET", "/debug/profile?path=/tests", None),
+    ("GET", "/topic/1", None),
+    ("GET", "/topic/1?difficulty=2&after_id=1&page_size=10", None),
+    ("GET", "/topic/1?archived=1", None),
+    ("GET", "/topic/1/catalog", None),
+    ("GET", "/topic/1/catalog?after_id=1&start=2", None),
+    ("GET", "/topic/1/catalog?all=1", None),
+    ("GET", "/question/new", None),
+    ("POST", "/question/new", {"text": "Neue Frage?", "topic_id": "1", "solution": ""}),
+    # Fast gleich wie Frage 2: erst Warnung, dann bestätigt gespeichert (ID 5)
+    ("POST", "/question/new", {"text": "Was versteht man unter hydraulischem Druck, "
+                                       "und wie wird er erzeugt", "topic_id": "2", "solution": ""}),
+    ("POST", "/question/new", {"text": "Was versteht man unter hydraulischem Druck, "
+                                       "und wie wird er erzeugt", "topic_id": "2", "solution": "",
+                               "confirm_duplicate": "1"}),
+    ("GET", "/duplicates", None),
+    ("GET", "/duplicates?min=0.6&page=2&page_size=1", None),
+    ("GET", "/question/1/edit", None),
+    ("POST", "/question/1/edit", {"text": "Geändert?", "topic_id": "1", "solution": ""}),
+    ("GET", "/search", None),
+    ("GET", "/search?q=Druck+Oel&topic_id=2&page=1", None),
+    ("GET", "/tests", None),
+    ("GET", "/tests/new", None),
+    ("POST", "/tests/new", {"name": "Schularbeit", "date": "2025-01-20", "notes": ""}),
+    ("GET", "/tests/1/edit", None),
+    ("POST", "/tests/1/edit", {"name": "Schularbeit 1", "date": "2025-01-20", "notes": ""}),
+    ("GET", "/tests/1/questions", None),
+    ("GET", "/tests/1/questions?topic_id=1&difficulty=2&page_size=1", None),
+    ("GET", "/tests/1/questions?after_topic=Elektrik&after_id=1", None),
+    ("POST", "/tests/1/questions", {"question_ids": ["1", "2", "3"]}),
+    ("POST", "/tests/1/questions", {"page_ids": ["1", "2"], "question_ids": ["2"]}),
+    ("POST", "/tests/1/questions", {"order": "3,2"}),
+    ("GET", "/tests/1/generate", None),
+    ("POST", "/tests/1/generate", {"total_points": "5", "topic_share_1": "40",
+                                   "difficulty_share_1": "1", "difficulty_share_2": "1",
+                                   "exclude_recent_tests": "2", "seed": "1"}),
+    ("POST", "/tests/1/questions", {"question_ids": ["1", "2", "3"]}),
+    ("GET", "/tests/1/preview", None),
+    ("GET", "/tests/1/pdf", None),
+    ("GET", "/tests/1/pdf?solutions=1", None),
+    ("GET", "/grading-scales", None),
+    ("POST", "/grading-scales", {"name": "Streng", "default": "",
+                                 "steps": "1;Sehr gut;95\n2;Gut;85\n3;Befriedigend;70\n"
+                                          "4;Genügend;60\n5;Nicht genügend;0"}),
+    ("GET", "/tests/1/results", None),
+    ("POST", "/tests/1/results", {"grading_scale_id": "2"}),
+    ("POST", "/tests/1/results", {"grading_scale_id": "999"}),  # unbekannt: Meldung
+    ("POST", "/tests/1/results", {"class_name": "1AHET",
+                                  "scores": "Name;1;2;3\nAnna;1;0,5;1\nBen;0;;1\nCem;1;1;0\n"}),
+    ("POST", "/tests/1/results", lambda app: {
+        "class_name": "1AHET", "file": (io.BytesIO("Ben\t1\t1\t1\n".encode()), "ben.csv")}),
+    ("GET", "/tests/1/results", None),
+    ("GET", "/tests/1/preview", None),
+    ("GET", "/results", None),
+    ("GET", "/results?from=2024-09-01&to=2025-08-31", None),
+    # Test ohne Punkte (alle Fragen 0 P): Auswertung ohne Prozent und Note
+    ("GET", "/tests/1/results", lambda app: set_points_override(app, 1, 0)),
+    ("GET", "/results?from=2024-09-01&to=2025-08-31", None),
+    ("POST", "/tests/1/results/delete",
+     lambda app: set_points_override(app, 1, None) or {"student_ids": ["3"]}),
+    ("GET", "/tests/1/variants", None),
+    ("POST", "/tests/1/variants", {"count": "3", "seed": "7", "substitute": "1"}),
+    ("POST", "/tests/1/duplicate", None),
+    ("GET", "/topic/new", None),
+    ("POST", "/topic/new", {"name": "Pneumatik", "description": ""}),
+    ("GET", "/topic/1/edit", None),
+    ("POST", "/topic/1/edit", {"name": "Elektrik", "description": "Grundlagen"}),
+    ("GET", "/common", None),
+    ("GET", "/common/topic/1?page_size=2", None),
+    ("GET", "/common/topic/1?page_size=2&after_id=2", None),
+    ("POST", "/common/copy", {"ids": ["1", "2", "5"], "next": "/common/topic/1"}),
+    ("GET", "/api/v1/questions?limit=2&fields=text,points", None),
+    ("GET", "/api/v1/questions?topic_id=1&difficulty=2&cursor=1", None),
+    ("GET", "/api/v1/topics", None),
+    ("GET", "/api/v1/tests?fields=name,question_ids", None),
+    ("GET", "/api/v1/questions/1", None),
+    ("GET", "/api/v1/tests/1", None),
+    ("GET", "/api/v1/export/questions.ndjson?topic_id=1", None),
+    ("GET", "/api/v1/export/tests.ndjson", None),
+    ("POST", "/api/v1/questions", ("json", {"items": [
+        {"text": "Was ist ein Relais?", "topic_id": 1, "difficulty": 2, "points": 2},
+        {"id": 1, "points": 3},
+    ]})),
+    ("POST", "/api/v1/topics", ("json", [{"name": "Getriebe"}, {"id": 1, "description": "neu"}])),
+    ("POST", "/api/v1/tests", ("json", [
+        {"name": "API-Test", "question_ids": [1, 2]},
+        {"id": 1, "question_ids": [2, 1, 3]},
+    ])),
+    ("PUT", "/api/v1/tests/1/questions", ("json", {"question_ids": [3, 2, 1]})),
+    ("GET", "/archive", None),
+    ("GET", "/archive/export", None),
+    ("GET", "/archive/snapshot", None),
+    # Aufträge 1–5 (1: Duplikat-Index nach dem API-Schreiben oben), ausgeführt
+    # beim folgenden Aufruf von /jobs
+    ("POST", "/duplicates/index", {"rebuild": "1"}),
+    ("POST", "/archive/export-job", None),
+    ("POST", "/archive/import", lambda app: {"archive": (archive_upload(app), "bank.ndjson.gz")}),
+    ("POST", "/archive/catalog", lambda app: {"catalog": (io.BytesIO(CATALOG), "katalog.txt"),
+                                              "duplicates": "skip"}),
+    ("GET", "/jobs", lambda app: run_jobs(app)),
+    ("GET", "/jobs/4", None),
+    ("GET", "/jobs/3/download", None),
+    ("POST", "/jobs/5/cancel", None),
+    ("POST", "/question/3/archive", None),
+    ("POST", "/question/3/archive", {"restore": "1"}),
+    ("POST", "/bulk-archive", {"ids": ["1", "2"]}),
+    ("POST", "/bulk-archive", {"ids": ["1", "2"], "restore": "1"}),
+    # Auftrag 6: Tests 1 und 2 (Kopie) nach history.db, danach zurück
+    ("POST", "/tests/history/move", {"before": "2025-02-01"}),
+    ("GET", "/tests/history", lambda app: run_jobs(app)),
+    ("GET", "/tests/history?name=Schul&text=Druck&question_id=2&page=1", None),
+    ("GET", "/tests/history/1", None),
+    ("GET", "/question/2/edit", None),
+    ("POST", "/tests/history/1/restore", None),
+    ("POST", "/tests/history/2/restore", None),
+    ("GET", "/tests/1/results", None),
+    # Auftrag 7: Lese-Kopie, danach lesen Katalog und Vorschau (neue Version) daraus
+    ("POST", "/tests/2/edit", {"name": "Schularbeit B", "date": "2025-03-01", "notes": ""}),
+    ("POST", "/archive/read-snapshot", None),
+    ("GET", "/topic/1/catalog", lambda app: run_jobs(app)),
+    ("GET", "/topic/1/catalog?live=1", None),
+    ("GET", "/tests/2/preview", None),
+    ("GET", "/archive", None),
+    ("POST", "/grading-scales/1/delete", None),
+    ("POST", "/grading-scales/2/delete", None),
+    ("POST", "/duplicates/merge", {"keep": "2", "drop": "5"}),
+    ("POST", "/question/4/delete", None),
+    ("POST", "/tests/2/delete", None),
+    ("POST", "/topic/2/delete", None),
+    ("POST", "/bulk-delete", {"kind": "questions", "ids": ["1", "2"]}),
+    ("POST", "/bulk-delete", {"kind": "tests", "ids": ["3", "4"]}),
+    ("POST", "/bulk-delete", {"kind": "topics", "ids": ["3"]}),
+    ("GET", "/jobs", lambda app: run_jobs(app)),
+]
+
+# Fragenkatalog im Format von import_access_catalog.py
+CATALOG = "1;Was ist ein Schütz?;Elektrik;2\n2;Wozu dient ein Druckbegrenzungsventil?;Hydraulik;3\n".encode()
+
+TABLE_ALIAS_RE = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+# idxStr von FTS5 enthält "M" für eine MATCH-Bedingung, z.B. "0:M2" oder "0:=M2"
+FTS_MATCH_RE = re.compile(r"VIRTUAL TABLE INDEX \d+:\S*M")
+SQL_KEYWORDS = {"WHERE", "ON", "JOIN", "LEFT", "INNER", "ORDER", "GROUP", "SET",
+                "VALUES", "SELECT", "LIMIT", "USING", "AND", "CROSS", "NATURAL"}
+
+
+def table_aliases(sql):
+    """Alias -> Tabellenname aus FROM/JOIN-Klauseln ermitteln."""
+    aliases = {}
+    for table, alias in TABLE_ALIAS_RE.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(conn, sql):
+    """Liste der Tabellen, die laut Query-Plan vollständig gelesen werden."""
+    scans = []
+    aliases = table_aliases(sql)
+    tables = {row[0] for schema in ("main", "history", "common") for row in conn.execute(
+        f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")}
+    for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        detail = row[3]
+        if not detail.startswith("SCAN ") or detail == "SCAN CONSTANT ROW":
+            continue
+        if FTS_MATCH_RE.search(detail):
+            continue  # FTS5-Abfrage mit MATCH nutzt den Volltextindex
+        name = detail.split()[1]
+        table = aliases.get(name, name)
+        if table not in tables:
+            continue  # Unterabfrage oder CTE (bereits begrenztes Zwischenergebnis)
+        scans.append((table, detail))
+    return scans
+
+
+def archive_upload(app):
+    """Archiv der aktuellen Datenbank als Upload-Datei."""
+    import archive
+
+    conn = sqlite3.connect(app.config["DB_PATH"])
+    data = b"".join(archive.iter_gzip(archive.iter_lines(conn)))
+    conn.close()
+    return io.BytesIO(data)
+
+
+def set_points_override(app, test_id, points):
+    """Punkte aller Fragen eines Tests überschreiben (None = wieder die der Frage)."""
+    with app.db_pool.connection() as conn, conn:
+        conn.execute("UPDATE test_questions SET points_override = ? WHERE test_id = ?",
+                     (points, test_id))
+
+
+def run_jobs(app):
+    """Wartende Hintergrundaufträge ausführen (die Prüf-App startet keinen Verteiler)."""
+    app.job_runner.run_pending()
+
+
+def unindexed_foreign_keys(conn):
+    """(tabelle, spalte) aller Fremdschlüssel ohne Index, der mit der Spalte beginnt.
+
+    Eine INTEGER PRIMARY KEY-Spalte ist die Rowid selbst und braucht keinen Index.
+    """
+    missing = []
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%REFERENCES%'"
+    )]
+    for table in tables:
+        leading = set()
+        for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+            columns = conn.execute(f"PRAGMA index_info({index[1]})").fetchall()
+            if columns:
+                leading.add(columns[0][2])
+        for column in conn.execute(f"PRAGMA table_info({table})"):
+            # (cid, name, type, notnull, default, pk): einzige PK-Spalte vom Typ INTEGER
+            if column[5] == 1 and column[2].upper() == "INTEGER":
+                leading.add(column[1])
+        for fk in conn.execute(f"PRAGMA foreign_key_list({table})"):
+            if fk[3] not in leading:
+                missing.append((table, fk[3]))
+    return missing
+
+
+def assignment_gap_failures(db_path):
+    """Zuordnung speichern, nachdem eine gelöschte Frage eine Lücke hinterlassen hat.
+
+    Zuordnung [a, b, c], Frage b löschen (ON DELETE CASCADE), dann [a, c, d]
+    speichern: erwartet sind die Positionen 1, 2, 3.
+    """
+    import assignments
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    try:
+        with conn:
+            test_id = conn.execute("INSERT INTO tests (name) VALUES ('Lücke')").lastrowid
+            ids = [conn.execute(
+                "INSERT INTO questions (text, topic_id) VALUES (?, 1)", (f"Lücke {i}?",)
+            ).lastrowid for i in range(4)]
+        a, b, c, d = ids
+        assignments.save_assignment(conn, test_id, [a, b, c])
+        with conn:
+            conn.execute("DELETE FROM questions WHERE id = ?", (b,))
+        assignments.save_assignment(conn, test_id, [a, c, d])
+        rows = conn.execute(
+            "SELECT question_id, position FROM test_questions WHERE test_id = ? ORDER BY position",
+            (test_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    if rows != [(a, 1), (c, 2), (d, 3)]:
+        return [f"Zuordnung nach gelöschter Frage: {rows}, erwartet {[(a, 1), (c, 2), (d, 3)]}"]
+    return []
+
+
+def capture_statements(app):
+    """Alle Routen aufrufen und (endpoint, sql) mitschneiden."""
+    from flask import has_request_context, request
+
+    statements = []
+
+    def trace(sql):
+        if has_request_context():
+            statements.append((request.endpoint, sql))
+
+    # Pool-Größe 1: alle Requests laufen über dieselbe Verbindung
+    with app.db_pool.connection() as conn:
+        conn.set_trace_callback(trace)
+
+    client = app.test_client()
+    called = set()
+    for method, url, data in REQUESTS:
+        if callable(data):
+            data = data(app)
+        if isinstance(data, tuple):
+            response = client.open(url, method=method, json=data[1])
+        else:
+            response = client.open(url, method=method, data=data)
+        response.get_data()  # gestreamte Antworten vollständig lesen
+        if response.status_code >= 400:
+            raise SystemExit(f"{method} {url} -> HTTP {response.status_code}")
+        path = url.split("?", 1)[0]
+        called.add(app.url_map.bind("").match(path, method=method)[0])
+
+    return statements, called
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "questions.db")
+
+        import archive
+        import database
+        import history
+        database.init_db(db_path)
+        database.seed_demo_data(db_path)
+        # Gemeinsame Fragenbank: Kopie der Demo-Daten
+        common_path = archive.snapshot(db_path, os.path.join(tmp, "common.db"))
+
+        from app import create_app
+        # Pool-Größe 1: alle Requests laufen über dieselbe Verbindung
+        app = create_app({"DB_PATH": db_path, "DB_POOL_SIZE": 1,
+                          "PDF_CACHE_DIR": os.path.join(tmp, "pdf-cache"),
+                          "COMMON_DB_PATH": common_path,
+                          "READ_SNAPSHOTS": True, "SNAPSHOT_INTERVAL": 0,
+                          "INSTRUMENTATION": True, "JOB_WORKERS": 0})
+
+        statements, called = capture_statements(app)
+
+        failures = []
+        endpoints = {
+            rule.endpoint for rule in app.url_map.iter_rules()
+            if rule.endpoint != "static"
+        }
+        for endpoint in sorted(endpoints - called):
+            failures.append(f"Route '{endpoint}' wird von check_query_plans.py nicht geprüft")
+
+        conn = sqlite3.connect(db_path)
+        history.attach(conn, app.config["HISTORY_DB_PATH"])
+        for table, column in unindexed_foreign_keys(conn):
+            failures.append(f"Fremdschlüssel {table}.{column} ohne Index")
+        failures.extend(assignment_gap_failures(db_path))
+        conn.execute("ATTACH DATABASE ? AS common", (common_path,))
+
+        checked = 0
+        seen = set()
+        for endpoint, sql in statements:
+            keyword = sql.lstrip().split(None, 1)[0].upper()
+            if keyword not in ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT"):
+                continue
+            if "'main'." in sql:
+                continue  # interne Anweisungen von FTS5 auf seinen Schattentabellen
+            if "temp." in sql:
+                continue  # temporäre Tabellen der Verbindung (Archiv-Import), Zugriff per Schlüssel
+            if (endpoint, sql) in seen:
+                continue
+            seen.add((endpoint, sql))
+            checked += 1
+
+            allowed = SCAN_ALLOWED | SCAN_ALLOWED_PER_ROUTE.get(endpoint, set())
+            for table, detail in full_scans(conn, sql):
+                if table not in allowed:
+                    compact = " ".join(sql.split())
+                    failures.append(f"{endpoint}: {detail}\n    {compact}")
+        conn.close()
+
+        # Pool und PDF-Worker vor dem Löschen des Temp-Ordners schließen
+        app.db_pool.close()
+        app.snapshot_reader.close()
+        app.pdf_exporter.shutdown()
+
+    print(f"{checked} Abfragen aus {len(called)} Routen geprüft.")
+    if failures:
+        print("\nFEHLER:")
+        for failure in failures:
+            print(" -", failure)
+        return 1
+    print("Keine Full-Table-Scans gefunden.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""Einstellungen der Anwendung aus Umgebungsvariablen.
+
+Alle Werte haben einen Standard, der auf der NAS ohne weitere Angaben
+funktioniert. Im Container werden sie in ``docker-compose.yml`` gesetzt.
+"""
+import os
+import secrets
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Standardpfad der Datenbank, wenn DB_PATH nicht gesetzt ist (App und Skripte)
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, "data", "questions.db")
+
+
+def from_env(overrides=None, environ=None):
+    """Konfiguration als Dict (Schlüssel wie in ``app.config``).
+
+    ``overrides`` hat Vorrang vor der Umgebung. Abgeleitete Pfade (PDF-Cache,
+    Schlüsseldatei) liegen neben der tatsächlich verwendeten Datenbank.
+    """
+    env = os.environ if environ is None else environ
+    overrides = overrides or {}
+
+    db_path = overrides.get("DB_PATH") or env.get("DB_PATH", DEFAULT_DB_PATH)
+    data_dir = os.path.dirname(os.path.abspath(db_path))
+    tenant_mode = overrides.get("TENANT_MODE", env.get("TENANT_MODE", ""))
+    if tenant_mode not in ("", "path", "subdomain"):
+        raise ValueError(f"TENANT_MODE {tenant_mode!r}: erlaubt sind '', 'path', 'subdomain'")
+    tenants_dir = overrides.get("TENANTS_DIR") or env.get("TENANTS_DIR",
+                                                          os.path.join(data_dir, "tenants"))
+
+    settings = {
+        "DB_PATH": db_path,
+        "DB_POOL_SIZE": int(env.get("DB_POOL_SIZE", 8)),
+        "DB_POOL_TIMEOUT": float(env.get("DB_POOL_TIMEOUT", 10)),
+        # Kompilierte Templates (Jinja-Bytecode) für alle Worker und Neustarts; leer = aus
+        "TEMPLATE_CACHE_DIR": env.get("TEMPLATE_CACHE_DIR",
+                                      os.path.join(data_dir, "template-cache")),
+        "PREVIEW_CACHE_ENTRIES": int(env.get("PREVIEW_CACHE_ENTRIES", 256)),
+        "PREVIEW_CACHE_BYTES": int(env.get("PREVIEW_CACHE_BYTES", 32 * 1024 * 1024)),
+        "PDF_CACHE_DIR": env.get("PDF_CACHE_DIR", os.path.join(data_dir, "pdf-cache")),
+        "PDF_WORKERS": int(env.get("PDF_WORKERS", 2)),
+        "PDF_CACHE_FILES": int(env.get("PDF_CACHE_FILES", 2000)),
+        "PDF_TIMEOUT": float(env.get("PDF_TIMEOUT", 60)),
+        # Hintergrundaufträge (jobs.py): Auftragsdatei, gleichzeitige Aufträge
+        # (0 = nur anlegen, ausführen per "python jobs.py worker"), Prozesse statt Threads
+        "JOBS_DB_PATH": env.get("JOBS_DB_PATH", os.path.join(data_dir, "jobs.db")),
+        "JOB_WORKERS": int(env.get("JOB_WORKERS", 1)),
+        "JOB_PROCESSES": env.get("JOB_PROCESSES") == "1",
+        # Alte Tests nach dem Schuljahreswechsel (history.py), an jede Verbindung angehängt
+        "HISTORY_DB_PATH": env.get("HISTORY_DB_PATH", os.path.join(data_dir, "history.db")),
+        # JSON-API /api/v1: Token (leer = ohne Anmeldung), max. Einträge pro Schreib-Request
+        "API_TOKEN": env.get("API_TOKEN", ""),
+        "API_MAX_BATCH": int(env.get("API_MAX_BATCH", 20000)),
+        # Messung von Routen und SQL, /metrics und /debug/profile (siehe instrumentation.py)
+        "INSTRUMENTATION": env.get("INSTRUMENTATION") == "1",
+        # Lesende Seiten (Vorschau, Katalog) aus einer schreibgeschützten Kopie
+        # (snapshots.py); erneuert alle SNAPSHOT_INTERVAL Sekunden (0 = nur auf Anforderung)
+        "READ_SNAPSHOTS": env.get("READ_SNAPSHOTS") == "1",
+        "SNAPSHOT_DIR": env.get("SNAPSHOT_DIR", os.path.join(data_dir, "snapshots")),
+        "SNAPSHOT_INTERVAL": float(env.get("SNAPSHOT_INTERVAL", 600)),
+        "SNAPSHOT_MMAP_SIZE": int(env.get("SNAPSHOT_MMAP_SIZE", 256 * 1024 * 1024)),
+        # Mandanten (tenants.py): "" = eine Datenbank, "path" = /<mandant>/…,
+        # "subdomain" = <mandant>.host; jeder Mandant hat TENANTS_DIR/<mandant>/questions.db
+        "TENANT_MODE": tenant_mode,
+        "TENANTS_DIR": tenants_dir,
+        "TENANT": "",
+        # Gemeinsame Fragenbank, nur lesend angehängt; leer = aus
+        "COMMON_DB_PATH": env.get("COMMON_DB_PATH",
+                                  os.path.join(tenants_dir, "common.db") if tenant_mode else ""),
+    }
+    settings.update(overrides)
+
+    # Für flash()-Meldungen; alle Worker-Prozesse brauchen denselben Schlüssel
+    if not settings.get("SECRET_KEY"):
+        settings["SECRET_KEY"] = env.get("SECRET_KEY") or load_secret_key(
+            os.path.join(data_dir, "secret_key"))
+    return settings
+
+
+def load_secret_key(path):
+    """Schlüssel aus Datei lesen, beim ersten Start zufällig erzeugen.
+
+    Mehrere gleichzeitig startende Worker legen die Datei nur einmal an:
+    os.link schlägt fehl, wenn sie schon existiert, und die Datei ist nie
+    halb geschrieben. Alle lesen danach denselben Inhalt.
+    """
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(secrets.token_hex(32))
+        os.chmod(tmp, 0o600)
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+
+    with open(path) as f:
+        return f.read().strip()
+
+
+def available_cpus():
+    """Anzahl nutzbarer CPU-Kerne (berücksichtigt Container-Limits per cpuset)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # nicht unter Linux
+        return os.cpu_count() or 1
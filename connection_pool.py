@@ -0,0 +1,177 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Pragmas, die einmal pro Verbindung gesetzt werden (nicht pro Request)
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",         # Leser blockieren Schreiber nicht mehr
+    "synchronous": "NORMAL",       # im WAL-Modus sicher und deutlich schneller
+    "busy_timeout": 5000,          # ms warten statt sofort "database is locked"
+    "cache_size": -16000,          # negativ = KiB, also ca. 16 MB Page-Cache
+    "mmap_size": 64 * 1024 * 1024, # 64 MB der DB-Datei per mmap lesen
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",          # ON DELETE CASCADE und Prüfung der Verweise
+}
+
+
+class PoolTimeout(Exception):
+    """Keine freie Verbindung innerhalb des Timeouts verfügbar."""
+
+
+class PoolClosed(RuntimeError):
+    """Der Pool wurde geschlossen (Herunterfahren, ausgetauschte Momentaufnahme)."""
+
+
+class ConnectionPool:
+    """Begrenzter Pool langlebiger SQLite-Verbindungen.
+
+    Verbindungen werden beim ersten Bedarf geöffnet (max. ``max_size``
+    Stück), danach wiederverwendet. Ist der Pool erschöpft, wartet
+    ``acquire()`` bis zu ``timeout`` Sekunden auf eine freie Verbindung.
+    """
+
+    def __init__(self, db_path, max_size=8, timeout=10.0, pragmas=None, factory=None,
+                 init=None, uri=False):
+        self.db_path = db_path
+        # db_path ist eine URI (file:…?mode=ro, z.B. für Momentaufnahmen)
+        self.uri = uri
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        # Connection-Klasse für sqlite3.connect (z.B. mit Messung, siehe instrumentation.py)
+        self.factory = factory or sqlite3.Connection
+        # fn(conn) nach den Pragmas, einmal pro neuer Verbindung (z.B. ATTACH)
+        self.init = init
+
+        # LIFO: die zuletzt benutzte Verbindung hat den wärmsten Cache
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+        # Zähler für stats()
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+
+    def _connect(self):
+        # check_same_thread=False: die Verbindung wandert zwischen den
+        # Request-Threads, wird aber immer nur von einem gleichzeitig benutzt.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=self.factory,
+                               uri=self.uri)
+        conn.row_factory = sqlite3.Row  # erlaubt Zugriff per Spaltennamen
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        if self.init is not None:
+            self.init(conn)
+        return conn
+
+    def acquire(self):
+        """Eine Verbindung aus dem Pool holen (oder neu öffnen)."""
+        if self._closed:
+            raise PoolClosed("Pool ist geschlossen")
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            with self._lock:
+                self._hits += 1
+            return conn
+
+        # Keine freie Verbindung: neu öffnen, solange das Limit es erlaubt
+        with self._lock:
+            may_create = self._created < self.max_size
+            if may_create:
+                self._created += 1
+                self._misses += 1
+
+        if may_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # Pool erschöpft: auf Rückgabe einer Verbindung warten
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(
+                f"Keine freie DB-Verbindung nach {self.timeout} s"
+            )
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._waits += 1
+            self._wait_time += waited
+        return conn
+
+    def release(self, conn):
+        """Verbindung zurückgeben. Offene Transaktionen werden verworfen."""
+        if conn.in_transaction:
+            conn.rollback()
+        # Unter der Sperre: close() darf nicht zwischen Prüfung und put() laufen
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Verbindung außerhalb eines Requests benutzen (``with pool.connection() as conn``)."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        conn.close()
+
+    def close(self):
+        """Alle freien Verbindungen schließen (z.B. beim Herunterfahren).
+
+        Benutzte Verbindungen werden erst bei ihrer Rückgabe geschlossen.
+        """
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        """Zähler für Monitoring: Treffer, Neuverbindungen, Wartezeiten."""
+        with self._lock:
+            requests = self._hits + self._misses + self._waits
+            return {
+                "size": self._created,
+                "max_size": self.max_size,
+                "idle": self._idle.qsize(),
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "wait_time_total": round(self._wait_time, 6),
+                "wait_time_avg": (
+                    round(self._wait_time / self._waits, 6) if self._waits else 0.0
+                ),
+                "timeouts": self._timeouts,
+                "hit_rate": (
+                    round((self._hits + self._waits) / requests, 4) if requests else 0.0
+                ),
+            }
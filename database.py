@@ -1,16 +1,413 @@
+import os
 import sqlite3
 
+import config
 
-DB_PATH = "questions.db"
+# Wie in der App: DB_PATH aus der Umgebung, sonst data/questions.db im Projektordner
+DB_PATH = os.environ.get("DB_PATH", config.DEFAULT_DB_PATH)
 
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+# Volltextindex über Fragetext und Lösung (FTS5, externer Inhalt = questions).
+# unicode61 mit remove_diacritics 2 faltet Umlaute und Akzente (ä -> a, é -> e).
+FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    text,
+    solution,
+    content = 'questions',
+    content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+
+# Trigger halten questions_fts synchron. Werden auch nach Tabellen-Umbauten
+# von questions erneut angelegt, deshalb als eigene Konstante.
+FTS_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts (rowid, text, solution)
+    VALUES (new.id, new.text, new.solution);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, text, solution)
+    VALUES ('delete', old.id, old.text, old.solution);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF text, solution ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, text, solution)
+    VALUES ('delete', old.id, old.text, old.solution);
+    INSERT INTO questions_fts (rowid, text, solution)
+    VALUES (new.id, new.text, new.solution);
+END;
+"""
+
+
+# Versionsstempel tests.version: wird bei jeder Änderung erhöht, die die
+# Testvorschau betrifft (Test selbst, Zuordnungen, Fragen, Themennamen).
+# Grundlage für den Vorschau-Cache und ETags.
+VERSION_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS tests_version_au AFTER UPDATE OF name, date, notes ON tests BEGIN
+    UPDATE tests SET version = version + 1 WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS test_questions_version_ai AFTER INSERT ON test_questions BEGIN
+    UPDATE tests SET version = version + 1 WHERE id = new.test_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS test_questions_version_ad AFTER DELETE ON test_questions BEGIN
+    UPDATE tests SET version = version + 1 WHERE id = old.test_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS test_questions_version_au AFTER UPDATE ON test_questions BEGIN
+    UPDATE tests SET version = version + 1 WHERE id IN (old.test_id, new.test_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_version_au AFTER UPDATE OF text, points, topic_id ON questions BEGIN
+    UPDATE tests SET version = version + 1
+    WHERE id IN (SELECT test_id FROM test_questions WHERE question_id = new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_version_ad AFTER DELETE ON questions BEGIN
+    UPDATE tests SET version = version + 1
+    WHERE id IN (SELECT test_id FROM test_questions WHERE question_id = old.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS topics_version_au AFTER UPDATE OF name ON topics BEGIN
+    UPDATE tests SET version = version + 1
+    WHERE id IN (
+        SELECT tq.test_id
+        FROM questions q
+        JOIN test_questions tq ON tq.question_id = q.id
+        WHERE q.topic_id = new.id
+    );
+END;
+"""
+
+
+# Änderungszähler für Fragen (table_versions). Der Generator hält den
+# Fragenpool im Speicher und lädt ihn nur neu, wenn sich der Zähler ändert.
+POOL_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS questions_pool_ai AFTER INSERT ON questions BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'questions';
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_pool_ad AFTER DELETE ON questions BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'questions';
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_pool_au
+AFTER UPDATE OF topic_id, difficulty, points, is_active ON questions BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE name = 'questions';
+END;
+"""
+
+
+# Tabellen mit ON DELETE CASCADE (Migration 6). Löschen eines Themas entfernt
+# dessen Fragen, Löschen einer Frage oder eines Tests die Zuordnungen.
+CASCADE_TABLES = [
+    ("questions", """
+    CREATE TABLE questions_new (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        text        TEXT NOT NULL,
+        topic_id    INTEGER NOT NULL,
+        difficulty  INTEGER DEFAULT 1,
+        points      REAL DEFAULT 1.0,
+        solution    TEXT,
+        is_active   INTEGER NOT NULL DEFAULT 1,
+        created_at  TEXT DEFAULT (datetime('now')),
+        updated_at  TEXT,
+        FOREIGN KEY (topic_id) REFERENCES topics(id) ON DELETE CASCADE
+    )
+    """),
+    ("test_questions", """
+    CREATE TABLE test_questions_new (
+        test_id         INTEGER NOT NULL,
+        question_id     INTEGER NOT NULL,
+        position        INTEGER NOT NULL,
+        points_override REAL,
+        PRIMARY KEY (test_id, question_id),
+        FOREIGN KEY (test_id) REFERENCES tests(id) ON DELETE CASCADE,
+        FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE
+    )
+    """),
+]
+
+# Indizes der umgebauten Tabellen (Migrationen 2 und 5)
+CASCADE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_questions_topic
+    ON questions (topic_id, id);
+
+CREATE INDEX IF NOT EXISTS idx_questions_pool
+    ON questions (is_active, topic_id, difficulty, points);
+
+CREATE INDEX IF NOT EXISTS idx_test_questions_position
+    ON test_questions (test_id, position);
+
+CREATE INDEX IF NOT EXISTS idx_test_questions_question
+    ON test_questions (question_id);
+"""
+
+
+def cascade_foreign_keys(conn):
+    """questions und test_questions mit ON DELETE CASCADE neu anlegen.
+
+    SQLite kann Fremdschlüssel nicht per ALTER TABLE ändern, daher der
+    Umbau nach Anleitung (neue Tabelle, kopieren, alte löschen,
+    umbenennen). Läuft mit foreign_keys = OFF, siehe ``migrate``.
+    Trigger werden vorher entfernt (sie verweisen auf die umgebauten
+    Tabellen) und danach samt Indizes neu angelegt. Die IDs bleiben
+    erhalten, questions_fts muss daher nicht neu aufgebaut werden.
+    """
+    # Verwaiste Zeilen aus der Zeit ohne Fremdschlüsselprüfung entfernen
+    conn.execute("DELETE FROM questions WHERE topic_id NOT IN (SELECT id FROM topics)")
+    conn.execute("""
+        DELETE FROM test_questions
+        WHERE test_id NOT IN (SELECT id FROM tests)
+           OR question_id NOT IN (SELECT id FROM questions)
+    """)
+
+    triggers = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    )]
+    for name in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+
+    for table, create_sql in CASCADE_TABLES:
+        columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA table_info({table})"))
+        seq = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)
+        ).fetchone()
+
+        conn.execute(create_sql)
+        conn.execute(f"INSERT INTO {table}_new ({columns}) SELECT {columns} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+        # AUTOINCREMENT: bereits vergebene IDs nicht erneut vergeben
+        if seq is not None:
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (seq[0], table))
+
+    execute_script(conn, CASCADE_INDEXES + FTS_TRIGGERS + VERSION_TRIGGERS + POOL_TRIGGERS)
+
+    problems = conn.execute("PRAGMA foreign_key_check").fetchall()
+    if problems:
+        raise sqlite3.IntegrityError(f"Fremdschlüssel verletzt: {problems[:5]}")
+
+
+# Duplikaterkennung (duplicates.py): neue und geänderte Fragetexte landen in
+# der Warteschlange dedupe_queue, duplicates.refresh() indiziert sie.
+# LSH-Schlüssel und Paare verschwinden mit der Frage (ON DELETE CASCADE).
+DEDUPE_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS questions_dedupe_ai AFTER INSERT ON questions BEGIN
+    INSERT OR IGNORE INTO dedupe_queue (question_id) VALUES (new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_dedupe_au AFTER UPDATE OF text ON questions BEGIN
+    INSERT OR IGNORE INTO dedupe_queue (question_id) VALUES (new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_dedupe_ad AFTER DELETE ON questions BEGIN
+    DELETE FROM dedupe_queue WHERE question_id = old.id;
+END;
+"""
+
+
+# Nutzungsstatistik (Migration 8), von Triggern fortgeschrieben, damit jeder
+# Schreibweg (Formular, Generator, Varianten, API, Archiv) sie aktuell hält:
+# - question_usage: wie oft und wann zuletzt eine Frage in Tests vorkam
+#   (Zeile erst ab der ersten Verwendung, "zuletzt" = spätestes Testdatum)
+# - topic_stats: Fragen und Punktesumme pro Thema und Schwierigkeit
+#   (Schwierigkeit 0 = ohne Angabe)
+USAGE_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS test_questions_usage_ai AFTER INSERT ON test_questions BEGIN
+    INSERT INTO question_usage (question_id, use_count, last_used)
+    VALUES (new.question_id, 1, (SELECT date FROM tests WHERE id = new.test_id))
+    ON CONFLICT (question_id) DO UPDATE SET
+        use_count = use_count + 1,
+        last_used = CASE
+            WHEN last_used IS NULL OR excluded.last_used > last_used THEN excluded.last_used
+            ELSE last_used
+        END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS test_questions_usage_ad AFTER DELETE ON test_questions BEGIN
+    UPDATE question_usage SET
+        use_count = use_count - 1,
+        last_used = CASE
+            WHEN use_count = 1 THEN NULL
+            -- Test war nicht der letzte: Datum bleibt (NULL/gelöscht -> neu rechnen)
+            WHEN (SELECT date FROM tests WHERE id = old.test_id) < last_used THEN last_used
+            ELSE (
+                SELECT MAX(t.date)
+                FROM test_questions tq
+                JOIN tests t ON t.id = tq.test_id
+                WHERE tq.question_id = old.question_id
+            )
+        END
+    WHERE question_id = old.question_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS test_questions_usage_au
+AFTER UPDATE OF test_id, question_id ON test_questions BEGIN
+    UPDATE question_usage SET
+        use_count = use_count - 1,
+        last_used = CASE
+            WHEN use_count = 1 THEN NULL
+            -- Test war nicht der letzte: Datum bleibt (NULL/gelöscht -> neu rechnen)
+            WHEN (SELECT date FROM tests WHERE id = old.test_id) < last_used THEN last_used
+            ELSE (
+                SELECT MAX(t.date)
+                FROM test_questions tq
+                JOIN tests t ON t.id = tq.test_id
+                WHERE tq.question_id = old.question_id
+            )
+        END
+    WHERE question_id = old.question_id;
+
+    INSERT INTO question_usage (question_id, use_count, last_used)
+    VALUES (new.question_id, 1, (SELECT date FROM tests WHERE id = new.test_id))
+    ON CONFLICT (question_id) DO UPDATE SET
+        use_count = use_count + 1,
+        last_used = CASE
+            WHEN last_used IS NULL OR excluded.last_used > last_used THEN excluded.last_used
+            ELSE last_used
+        END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tests_usage_au AFTER UPDATE OF date ON tests
+WHEN old.date IS NOT new.date BEGIN
+    UPDATE question_usage SET
+        last_used = (
+            SELECT MAX(t.date)
+            FROM test_questions tq
+            JOIN tests t ON t.id = tq.test_id
+            WHERE tq.question_id = question_usage.question_id
+        )
+    WHERE question_id IN (SELECT question_id FROM test_questions WHERE test_id = new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_stats_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO topic_stats (topic_id, difficulty, question_count, total_points)
+    VALUES (new.topic_id, IFNULL(new.difficulty, 0), 1, IFNULL(new.points, 0))
+    ON CONFLICT (topic_id, difficulty) DO UPDATE SET
+        question_count = question_count + 1,
+        total_points = total_points + excluded.total_points;
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_stats_ad AFTER DELETE ON questions BEGIN
+    UPDATE topic_stats SET
+        question_count = question_count - 1,
+        total_points = total_points - IFNULL(old.points, 0)
+    WHERE topic_id = old.topic_id AND difficulty = IFNULL(old.difficulty, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_stats_au
+AFTER UPDATE OF topic_id, difficulty, points ON questions BEGIN
+    UPDATE topic_stats SET
+        question_count = question_count - 1,
+        total_points = total_points - IFNULL(old.points, 0)
+    WHERE topic_id = old.topic_id AND difficulty = IFNULL(old.difficulty, 0);
+
+    INSERT INTO topic_stats (topic_id, difficulty, question_count, total_points)
+    VALUES (new.topic_id, IFNULL(new.difficulty, 0), 1, IFNULL(new.points, 0))
+    ON CONFLICT (topic_id, difficulty) DO UPDATE SET
+        question_count = question_count + 1,
+        total_points = total_points + excluded.total_points;
+END;
+"""
+
+
+# Ab Migration 9 zählt topic_stats nur aktive Fragen: archivierte
+# (is_active = 0) fehlen in Listen, Katalog und Generator, also auch in den
+# Kennzahlen. Archivieren und Wiederherstellen zählt wie Löschen und Einfügen.
+ACTIVE_STATS_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS questions_stats_ai AFTER INSERT ON questions
+WHEN new.is_active = 1 BEGIN
+    INSERT INTO topic_stats (topic_id, difficulty, question_count, total_points)
+    VALUES (new.topic_id, IFNULL(new.difficulty, 0), 1, IFNULL(new.points, 0))
+    ON CONFLICT (topic_id, difficulty) DO UPDATE SET
+        question_count = question_count + 1,
+        total_points = total_points + excluded.total_points;
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_stats_ad AFTER DELETE ON questions
+WHEN old.is_active = 1 BEGIN
+    UPDATE topic_stats SET
+        question_count = question_count - 1,
+        total_points = total_points - IFNULL(old.points, 0)
+    WHERE topic_id = old.topic_id AND difficulty = IFNULL(old.difficulty, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS questions_stats_au
+AFTER UPDATE OF topic_id, difficulty, points, is_active ON questions BEGIN
+    UPDATE topic_stats SET
+        question_count = question_count - 1,
+        total_points = total_points - IFNULL(old.points, 0)
+    WHERE old.is_active = 1
+      AND topic_id = old.topic_id AND difficulty = IFNULL(old.difficulty, 0);
+
+    INSERT INTO topic_stats (topic_id, difficulty, question_count, total_points)
+    SELECT new.topic_id, IFNULL(new.difficulty, 0), 1, IFNULL(new.points, 0)
+    WHERE new.is_active = 1
+    ON CONFLICT (topic_id, difficulty) DO UPDATE SET
+        question_count = question_count + 1,
+        total_points = total_points + excluded.total_points;
+END;
+"""
+
+
+# Notenschlüssel stehen ab Migration 10 in der Datenbank und erscheinen in
+# Vorschau und PDF: Änderungen erhöhen tests.version der betroffenen Tests
+# (eigener Schlüssel oder, ohne eigenen, der Standardschlüssel).
+GRADING_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS tests_grading_version_au AFTER UPDATE OF grading_scale_id ON tests BEGIN
+    UPDATE tests SET version = version + 1 WHERE id = new.id;
+END;
 
-    c.executescript("""
-    PRAGMA foreign_keys = ON;
+CREATE TRIGGER IF NOT EXISTS grading_steps_version_ai AFTER INSERT ON grading_steps BEGIN
+    UPDATE tests SET version = version + 1
+    WHERE grading_scale_id = new.scale_id
+       OR (grading_scale_id IS NULL
+           AND new.scale_id IN (SELECT id FROM grading_scales WHERE is_default = 1));
+END;
 
+CREATE TRIGGER IF NOT EXISTS grading_steps_version_ad AFTER DELETE ON grading_steps BEGIN
+    UPDATE tests SET version = version + 1
+    WHERE grading_scale_id = old.scale_id
+       OR (grading_scale_id IS NULL
+           AND old.scale_id IN (SELECT id FROM grading_scales WHERE is_default = 1));
+END;
+
+CREATE TRIGGER IF NOT EXISTS grading_scales_version_au AFTER UPDATE OF is_default ON grading_scales
+WHEN new.is_default = 1 AND old.is_default = 0 BEGIN
+    UPDATE tests SET version = version + 1 WHERE grading_scale_id IS NULL;
+END;
+"""
+
+# Punkte gibt es nur für Fragen, die (noch) im Test stehen: Entfernen einer
+# Frage aus dem Test löscht ihre Punkte, Zusammenführen von Duplikaten
+# (question_id ändert sich) nimmt sie mit. Die Auswertung muss results
+# deshalb nicht mit test_questions abgleichen.
+RESULTS_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS test_questions_results_ad AFTER DELETE ON test_questions BEGIN
+    DELETE FROM results
+    WHERE test_id = old.test_id AND question_id = old.question_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS test_questions_results_au
+AFTER UPDATE OF test_id, question_id ON test_questions BEGIN
+    UPDATE OR IGNORE results SET test_id = new.test_id, question_id = new.question_id
+    WHERE test_id = old.test_id AND question_id = old.question_id;
+END;
+"""
+
+# Versionierte Schema-Migrationen.
+#
+# Die aktuelle Version steht in ``PRAGMA user_version`` der Datenbank.
+# Neue Migrationen nur hinten anhängen und bestehende nie nachträglich ändern.
+# Eine Migration ist entweder ein SQL-Skript oder eine Funktion fn(conn).
+MIGRATIONS = [
+    (1, "Grundschema", """
     CREATE TABLE IF NOT EXISTS topics (
         id          INTEGER PRIMARY KEY AUTOINCREMENT,
         name        TEXT NOT NULL UNIQUE,
@@ -46,15 +443,295 @@ def init_db():
         FOREIGN KEY (test_id) REFERENCES tests(id),
         FOREIGN KEY (question_id) REFERENCES questions(id)
     );
-    """)
+    """),
+
+    (2, "Indizes für Themen-, Test- und Löschabfragen", """
+    CREATE INDEX IF NOT EXISTS idx_questions_topic
+        ON questions (topic_id, id);
+
+    CREATE INDEX IF NOT EXISTS idx_test_questions_position
+        ON test_questions (test_id, position);
+
+    CREATE INDEX IF NOT EXISTS idx_test_questions_question
+        ON test_questions (question_id);
+
+    CREATE INDEX IF NOT EXISTS idx_tests_date
+        ON tests (date, id);
+    """),
+
+    (3, "Volltextsuche (FTS5) über Fragetext und Lösung",
+     FTS_TABLE + FTS_TRIGGERS + """
+    INSERT INTO questions_fts (questions_fts) VALUES ('rebuild');
+
+    -- Ranking: Treffer im Fragetext zählen doppelt so viel wie in der Lösung
+    INSERT INTO questions_fts (questions_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)');
+    """),
+
+    (4, "Versionsstempel für Tests (Vorschau-Cache)", """
+    ALTER TABLE tests ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+    """ + VERSION_TRIGGERS),
+
+    (5, "Fragenpool der Testerstellung: schmaler Index und Änderungszähler", """
+    CREATE INDEX IF NOT EXISTS idx_questions_pool
+        ON questions (is_active, topic_id, difficulty, points);
+
+    CREATE TABLE IF NOT EXISTS table_versions (
+        name    TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );
+
+    INSERT OR IGNORE INTO table_versions (name, version) VALUES ('questions', 0);
+    """ + POOL_TRIGGERS),
+
+    (6, "Fremdschlüssel mit ON DELETE CASCADE", cascade_foreign_keys),
+
+    (7, "Duplikaterkennung: LSH-Index, Paare und Warteschlange", """
+    CREATE TABLE IF NOT EXISTS question_lsh (
+        key         INTEGER NOT NULL,  -- Band << 32 | Hash der Signaturwerte
+        question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+        PRIMARY KEY (key, question_id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_question_lsh_question
+        ON question_lsh (question_id);
+
+    CREATE TABLE IF NOT EXISTS question_duplicates (
+        question_id  INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+        duplicate_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+        similarity   REAL NOT NULL,
+        PRIMARY KEY (question_id, duplicate_id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_question_duplicates_duplicate
+        ON question_duplicates (duplicate_id);
+
+    CREATE INDEX IF NOT EXISTS idx_question_duplicates_similarity
+        ON question_duplicates (similarity DESC, question_id, duplicate_id);
+
+    CREATE TABLE IF NOT EXISTS dedupe_queue (
+        question_id INTEGER PRIMARY KEY
+    );
+
+    -- Bestand: wird beim ersten refresh() bzw. mit "duplicates.py index" indiziert
+    INSERT OR IGNORE INTO dedupe_queue (question_id) SELECT id FROM questions;
+    """ + DEDUPE_TRIGGERS),
+
+    (8, "Nutzungsstatistik pro Frage und Kennzahlen pro Thema", """
+    CREATE TABLE IF NOT EXISTS question_usage (
+        question_id INTEGER PRIMARY KEY REFERENCES questions(id) ON DELETE CASCADE,
+        use_count   INTEGER NOT NULL DEFAULT 0,
+        last_used   TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS topic_stats (
+        topic_id       INTEGER NOT NULL REFERENCES topics(id) ON DELETE CASCADE,
+        difficulty     INTEGER NOT NULL,
+        question_count INTEGER NOT NULL DEFAULT 0,
+        total_points   REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (topic_id, difficulty)
+    ) WITHOUT ROWID;
+
+    -- Bestand einmalig zählen, danach halten die Trigger die Werte aktuell
+    INSERT INTO question_usage (question_id, use_count, last_used)
+    SELECT tq.question_id, COUNT(*), MAX(t.date)
+    FROM test_questions tq
+    JOIN tests t ON t.id = tq.test_id
+    GROUP BY tq.question_id;
+
+    INSERT INTO topic_stats (topic_id, difficulty, question_count, total_points)
+    SELECT topic_id, IFNULL(difficulty, 0), COUNT(*), TOTAL(points)
+    FROM questions
+    GROUP BY topic_id, IFNULL(difficulty, 0);
+    """ + USAGE_TRIGGERS),
+    (9, "Archivierte Fragen: Teilindex und Kennzahlen nur aktiver Fragen", """
+    -- Fragenlisten und Katalog lesen nur aktive Fragen; der Teilindex
+    -- enthält archivierte gar nicht erst (der Generator hat idx_questions_pool)
+    CREATE INDEX IF NOT EXISTS idx_questions_live
+        ON questions (topic_id, id) WHERE is_active = 1;
+
+    DROP TRIGGER IF EXISTS questions_stats_ai;
+    DROP TRIGGER IF EXISTS questions_stats_ad;
+    DROP TRIGGER IF EXISTS questions_stats_au;
+
+    DELETE FROM topic_stats;
+    INSERT INTO topic_stats (topic_id, difficulty, question_count, total_points)
+    SELECT topic_id, IFNULL(difficulty, 0), COUNT(*), TOTAL(points)
+    FROM questions
+    WHERE is_active = 1
+    GROUP BY topic_id, IFNULL(difficulty, 0);
+    """ + ACTIVE_STATS_TRIGGERS),
+
+    (10, "Ergebnisse: Schüler, Punkte pro Frage und Notenschlüssel", """
+    CREATE TABLE IF NOT EXISTS grading_scales (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        name       TEXT NOT NULL UNIQUE,
+        is_default INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS grading_steps (
+        scale_id    INTEGER NOT NULL REFERENCES grading_scales(id) ON DELETE CASCADE,
+        grade       INTEGER NOT NULL,
+        label       TEXT NOT NULL,
+        min_percent REAL NOT NULL,  -- Note ab diesem Prozentsatz der Höchstpunkte
+        PRIMARY KEY (scale_id, grade)
+    ) WITHOUT ROWID;
+
+    -- Bisher fest im Template und im PDF
+    INSERT INTO grading_scales (id, name, is_default) VALUES (1, 'Standard', 1);
+    INSERT INTO grading_steps (scale_id, grade, label, min_percent) VALUES
+        (1, 1, 'Sehr gut', 91),
+        (1, 2, 'Gut', 81),
+        (1, 3, 'Befriedigend', 61),
+        (1, 4, 'Genügend', 51),
+        (1, 5, 'Nicht genügend', 0);
+
+    -- NULL = Standardschlüssel
+    ALTER TABLE tests ADD COLUMN grading_scale_id INTEGER
+        REFERENCES grading_scales(id) ON DELETE SET NULL;
+
+    CREATE INDEX IF NOT EXISTS idx_tests_grading_scale
+        ON tests (grading_scale_id);
+
+    CREATE TABLE IF NOT EXISTS students (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        class_name TEXT NOT NULL,
+        name       TEXT NOT NULL,
+        UNIQUE (class_name, name)
+    );
+
+    CREATE TABLE IF NOT EXISTS results (
+        test_id     INTEGER NOT NULL REFERENCES tests(id) ON DELETE CASCADE,
+        student_id  INTEGER NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+        question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+        score       REAL NOT NULL,
+        PRIMARY KEY (test_id, student_id, question_id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_results_student
+        ON results (student_id);
+
+    CREATE INDEX IF NOT EXISTS idx_results_question
+        ON results (question_id);
+    """ + GRADING_TRIGGERS + RESULTS_TRIGGERS),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def execute_script(conn, script):
+    """SQL-Skript Anweisung für Anweisung ausführen.
+
+    Im Gegensatz zu ``executescript`` wird dabei keine offene Transaktion
+    committet, die Migration bleibt also atomar.
+    """
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n\t;"):
+                conn.execute(statement)
+            statement = ""
+
+
+def next_id(conn, table):
+    """Erste freie ID einer AUTOINCREMENT-Tabelle.
+
+    Auch IDs gelöschter Zeilen werden nicht wiederverwendet. Für Massen-
+    Einfügungen mit vorab vergebenen IDs (ein ``executemany`` statt einer
+    Anweisung pro Zeile); nur innerhalb einer Schreibtransaktion verlässlich.
+    """
+    row = conn.execute(
+        f"""
+        SELECT MAX(
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0),
+            COALESCE((SELECT MAX(id) FROM {table}), 0)
+        )
+        """,
+        (table,)
+    ).fetchone()
+    return row[0] + 1
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Alle ausstehenden Migrationen ausführen.
+
+    Jede Migration läuft in einer eigenen Transaktion (BEGIN IMMEDIATE),
+    damit mehrere gleichzeitig startende Prozesse nicht doppelt migrieren.
+    Fremdschlüssel sind dabei ausgeschaltet (Tabellenumbauten löschen und
+    benennen Tabellen um), das Pragma wirkt nur außerhalb von Transaktionen.
+    Gibt die Liste der angewendeten Versionen zurück.
+    """
+    current = get_schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Datenbank hat Schema-Version {current}, dieses Programm kennt nur "
+            f"{SCHEMA_VERSION}. Bitte den Code aktualisieren."
+        )
+    if current == SCHEMA_VERSION:
+        return []  # häufigster Fall beim Start: nichts zu tun
+
+    applied = []
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # Transaktionen selbst steuern
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+
+    try:
+        for version, description, migration in MIGRATIONS:
+            if get_schema_version(conn) >= version:
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Ein anderer Prozess könnte inzwischen migriert haben
+                if get_schema_version(conn) >= version:
+                    conn.execute("ROLLBACK")
+                    continue
+
+                if callable(migration):
+                    migration(conn)
+                else:
+                    execute_script(conn, migration)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            applied.append(version)
+            print(f"Migration {version} angewendet: {description}")
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+        conn.isolation_level = isolation_level
+
+    return applied
+
+
+def init_db(db_path=None):
+    """Datenbank (samt Ordner) anlegen bzw. migrieren. Mehrfach aufrufbar.
+
+    Gibt die Liste der angewendeten Migrationen zurück.
+    """
+    db_path = db_path or DB_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        return migrate(conn)
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
 
+def seed_demo_data(db_path=None):
+    """Ein paar Beispielthemen und -fragen zum Testen einfügen.
 
-def seed_demo_data():
-    """Ein paar Beispielthemen und -fragen zum Testen einfügen."""
-    conn = sqlite3.connect(DB_PATH)
+    Mehrfach aufrufbar: vorhandene Themen und Fragen (gleicher Text im
+    gleichen Thema) werden nicht noch einmal angelegt.
+    """
+    conn = sqlite3.connect(db_path or DB_PATH)
     c = conn.cursor()
 
     # Themen anlegen
@@ -104,9 +781,10 @@ def seed_demo_data():
         c.execute(
             """
             INSERT INTO questions (text, topic_id, difficulty, points, solution)
-            VALUES (?, ?, ?, ?, ?)
+            SELECT ?, ?, ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM questions WHERE topic_id = ? AND text = ?)
             """,
-            (text, topic_id, diff, points, solution),
+            (text, topic_id, diff, points, solution, topic_id, text),
         )
 
     conn.commit()
@@ -118,4 +796,4 @@ if __name__ == "__main__":
     init_db()
     print("Füge Demodaten ein …")
     seed_demo_data()
-    print("Fertig. Die Datei 'questions.db' wurde erstellt.")
+    print(f"Fertig: {os.path.abspath(DB_PATH)}")
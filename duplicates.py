@@ -0,0 +1,431 @@
+"""Erkennung (fast) doppelter Fragen über MinHash/LSH.
+
+Jeder Fragetext wird normalisiert (Kleinschreibung, Umlaute und Akzente
+gefaltet, Satzzeichen entfernt) und in Wörter und Wortpaare (Shingles)
+zerlegt. Ähnlichkeit zweier Fragen = Jaccard-Index dieser Mengen
+(1.0 = gleicher Text bis auf Schreibweise und Satzzeichen).
+
+Statt jede Frage mit allen anderen zu vergleichen, bekommt jede Frage eine
+MinHash-Signatur, die in ``BANDS`` Bänder zerlegt wird. Jedes Band ergibt
+einen Schlüssel in ``question_lsh``; Kandidaten sind Fragen mit mindestens
+einem gleichen Schlüssel (Index-Zugriff, unabhängig von der Größe der
+Fragenbank). Nur die Kandidaten werden exakt verglichen.
+
+Trigger (Migration 7) stellen neue und geänderte Fragen in
+``dedupe_queue``; ``refresh`` arbeitet die Warteschlange ab und pflegt
+dabei auch die gefundenen Paare in ``question_duplicates``. So bleibt der
+Index aktuell, egal über welchen Weg (Formular, API, Import) geschrieben
+wurde.
+
+    python duplicates.py --db data/questions.db index
+    python duplicates.py --db data/questions.db list --min 0.9
+"""
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import struct
+import time
+import unicodedata
+import zlib
+
+import database
+
+# Signatur: SIGNATURE_SIZE Werte, BANDS Bänder zu je ROWS Werten.
+# Wahrscheinlichkeit, ein Paar mit Ähnlichkeit s als Kandidat zu finden:
+# 1 - (1 - s^ROWS)^BANDS, bei s = 0.7 ca. 95 %, ab s = 0.8 über 99 %.
+# Fremde Fragen (s um 0.1) landen nur selten im selben Bucket.
+SIGNATURE_SIZE = 80
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+
+# Paare ab dieser Ähnlichkeit werden gespeichert, angezeigt ab DEFAULT_THRESHOLD
+STORE_THRESHOLD = 0.6
+DEFAULT_THRESHOLD = 0.7
+
+# Höchstens so viele Kandidaten pro Frage exakt vergleichen (die mit den
+# meisten gleichen Bändern). Schützt vor riesigen Buckets bei Standardtexten.
+MAX_CANDIDATES = 100
+
+# Fragen pro Transaktion in refresh()
+BATCH_SIZE = 1000
+
+_SIGNATURE = struct.Struct(f"<{SIGNATURE_SIZE}I")
+_BAND = struct.Struct(f"<{ROWS}I")
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+# Umlaute wie ae/oe/ue schreiben, damit "Oel" und "Öl" gleich sind
+_FOLD = (("ä", "ae"), ("ö", "oe"), ("ü", "ue"), ("ß", "ss"))
+
+
+def _words(text):
+    text = (text or "").casefold()
+    for char, spelled in _FOLD:
+        text = text.replace(char, spelled)
+    if not text.isascii():
+        text = "".join(
+            c for c in unicodedata.normalize("NFKD", text)
+            if not unicodedata.combining(c)
+        )
+    return _WORD_RE.findall(text)
+
+
+def normalize(text):
+    """Text für den Vergleich vereinheitlichen (Öl-Druck? -> oel druck)."""
+    return " ".join(_words(text))
+
+
+def shingles(text):
+    """Shingle-Menge eines Fragetexts: alle Wörter und Wortpaare.
+
+    Wortpaare erfassen die Reihenfolge, einzelne Wörter halten die
+    Ähnlichkeit bei einem geänderten Wort hoch (typisch um 0.8).
+    """
+    words = [w.encode("utf-8") for w in _words(text)]
+    return frozenset(words + [a + b" " + b for a, b in zip(words, words[1:])])
+
+
+def signature(shingle_set):
+    """MinHash-Signatur (SIGNATURE_SIZE Werte) einer Shingle-Menge.
+
+    Pro Shingle liefert ein SHAKE-128-Hash alle SIGNATURE_SIZE Werte auf
+    einmal (entspricht SIGNATURE_SIZE unabhängigen Hashfunktionen), das
+    Minimum pro Spalte bilden ``zip``/``min`` in C.
+    """
+    hashes = [
+        _SIGNATURE.unpack(hashlib.shake_128(s).digest(_SIGNATURE.size))
+        for s in shingle_set
+    ]
+    return list(map(min, zip(*hashes)))
+
+
+def band_keys(shingle_set):
+    """LSH-Schlüssel, einer pro Band: Bandnummer << 32 | CRC32 der Bandwerte."""
+    if not shingle_set:
+        return []
+    sig = signature(shingle_set)
+    return [
+        (band << 32) | zlib.crc32(_BAND.pack(*sig[band * ROWS:(band + 1) * ROWS]))
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a, b):
+    """Jaccard-Index zweier Shingle-Mengen."""
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+def _candidates(conn, keys):
+    """IDs der Fragen mit den meisten gleichen LSH-Schlüsseln."""
+    rows = conn.execute(
+        """
+        SELECT question_id, COUNT(*) AS hits
+        FROM question_lsh
+        WHERE key IN (SELECT value FROM json_each(?))
+        GROUP BY question_id
+        ORDER BY hits DESC
+        LIMIT ?
+        """,
+        (json.dumps(keys), MAX_CANDIDATES)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _texts(conn, ids):
+    return conn.execute(
+        "SELECT id, text FROM questions WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(ids)),)
+    ).fetchall()
+
+
+def find_similar(conn, text, threshold=DEFAULT_THRESHOLD, limit=10, exclude_id=None):
+    """Fragen, die ``text`` ähneln, absteigend nach Ähnlichkeit.
+
+    Liefert Dicts mit id, text, topic_id, topic_name und similarity.
+    Findet nur indizierte Fragen; vorher ggf. ``refresh`` aufrufen.
+    """
+    own = shingles(text)
+    keys = band_keys(own)
+    if not keys:
+        return []
+
+    ids = [qid for qid in _candidates(conn, keys) if qid != exclude_id]
+    if not ids:
+        return []
+
+    rows = conn.execute(
+        """
+        SELECT q.id, q.text, q.topic_id, t.name AS topic_name
+        FROM questions q
+        JOIN topics t ON t.id = q.topic_id
+        WHERE q.id IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(ids),)
+    ).fetchall()
+
+    matches = []
+    for row in rows:
+        score = similarity(own, shingles(row[1]))
+        if score >= threshold:
+            matches.append({
+                "id": row[0],
+                "text": row[1],
+                "topic_id": row[2],
+                "topic_name": row[3],
+                "similarity": score,
+            })
+    matches.sort(key=lambda m: (-m["similarity"], m["id"]))
+    return matches[:limit]
+
+
+# Höchstens so viele IDs pro json_each-Parameter
+_LOOKUP_CHUNK = 20000
+
+
+def _buckets(conn, keys):
+    """{LSH-Schlüssel: [question_id, …]} für viele Schlüssel auf einmal."""
+    buckets = {}
+    keys = sorted(set(keys))
+    for start in range(0, len(keys), _LOOKUP_CHUNK):
+        rows = conn.execute(
+            """
+            SELECT key, question_id FROM question_lsh
+            WHERE key IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(keys[start:start + _LOOKUP_CHUNK]),)
+        )
+        for key, qid in rows:
+            buckets.setdefault(key, []).append(qid)
+    return buckets
+
+
+def _rank(keys, buckets, exclude=None):
+    """Kandidaten-IDs, die mit den meisten gleichen Schlüsseln zuerst."""
+    hits = {}
+    for key in keys:
+        for other in buckets.get(key, ()):
+            if other != exclude:
+                hits[other] = hits.get(other, 0) + 1
+    return sorted(hits, key=lambda other: (-hits[other], other))[:MAX_CANDIDATES]
+
+
+def _load_shingles(conn, ids, sets):
+    """Shingles der Fragen ``ids`` in ``sets`` ergänzen (fehlende IDs)."""
+    missing = sorted(set(ids) - sets.keys())
+    for start in range(0, len(missing), _LOOKUP_CHUNK):
+        for qid, text in _texts(conn, missing[start:start + _LOOKUP_CHUNK]):
+            sets[qid] = shingles(text)
+
+
+def match_texts(conn, texts, threshold=DEFAULT_THRESHOLD):
+    """Neue Texte gegen die Fragenbank und untereinander prüfen (Import).
+
+    Gibt pro Text ``(question_id, index)`` zurück: die ähnlichste Frage der
+    Bank bzw. den ersten früheren ähnlichen Text der Liste, sonst None.
+    Bank-Treffer haben Vorrang. Ein Lookup für alle Texte zusammen.
+    """
+    own = [shingles(text) for text in texts]
+    keys = [band_keys(s) for s in own]
+    buckets = _buckets(conn, [key for qkeys in keys for key in qkeys])
+    candidates = [_rank(qkeys, buckets) for qkeys in keys]
+    sets = {}
+    _load_shingles(conn, {qid for best in candidates for qid in best}, sets)
+
+    results = []
+    earlier = {}  # Schlüssel -> Indizes bisher neuer (nicht doppelter) Texte
+    for i, (s, qkeys, best) in enumerate(zip(own, keys, candidates)):
+        scored = [(similarity(s, sets[qid]), qid) for qid in best if qid in sets]
+        score, match = max(scored, default=(0.0, None), key=lambda item: (item[0], -item[1]))
+        if score >= threshold:
+            results.append((match, None))
+            continue
+
+        twin = None
+        for j in sorted({j for key in qkeys for j in earlier.get(key, ())}):
+            if similarity(s, own[j]) >= threshold:
+                twin = j
+                break
+        results.append((None, twin))
+        if twin is None:
+            for key in qkeys:
+                earlier.setdefault(key, []).append(i)
+    return results
+
+
+def index_questions(conn, ids):
+    """Fragen ``ids`` (neu) indizieren und ihre Paare neu bestimmen.
+
+    Ohne eigene Transaktion; der Aufrufer committet. Gelöschte IDs werden
+    nur aus der Warteschlange entfernt.
+    """
+    ids_json = json.dumps(list(ids))
+    conn.execute(
+        "DELETE FROM question_lsh WHERE question_id IN (SELECT value FROM json_each(?))",
+        (ids_json,)
+    )
+    conn.execute(
+        "DELETE FROM question_duplicates WHERE question_id IN (SELECT value FROM json_each(?))",
+        (ids_json,)
+    )
+    conn.execute(
+        "DELETE FROM question_duplicates WHERE duplicate_id IN (SELECT value FROM json_each(?))",
+        (ids_json,)
+    )
+    conn.execute(
+        "DELETE FROM dedupe_queue WHERE question_id IN (SELECT value FROM json_each(?))",
+        (ids_json,)
+    )
+
+    sets = {qid: shingles(text) for qid, text in _texts(conn, ids)}
+    keys = {qid: band_keys(s) for qid, s in sets.items()}
+    conn.executemany(
+        "INSERT OR IGNORE INTO question_lsh (key, question_id) VALUES (?, ?)",
+        [(key, qid) for qid, qkeys in keys.items() for key in qkeys]
+    )
+
+    buckets = _buckets(conn, [key for qkeys in keys.values() for key in qkeys])
+    candidates = {qid: _rank(qkeys, buckets, exclude=qid) for qid, qkeys in keys.items()}
+    _load_shingles(conn, {other for best in candidates.values() for other in best}, sets)
+
+    pairs = {}
+    for qid, best in candidates.items():
+        for other in best:
+            if other not in sets:
+                continue
+            pair = (min(qid, other), max(qid, other))
+            if pair in pairs:
+                continue
+            score = similarity(sets[qid], sets[other])
+            if score >= STORE_THRESHOLD:
+                pairs[pair] = score
+
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO question_duplicates (question_id, duplicate_id, similarity)
+        VALUES (?, ?, ?)
+        """,
+        [(a, b, score) for (a, b), score in pairs.items()]
+    )
+    return len(sets)
+
+
+def merge_questions(conn, keep_id, drop_id):
+    """Frage ``drop_id`` löschen, ihre Testzuordnungen gehen an ``keep_id``.
+
+    Tests, die schon beide Fragen enthalten, behalten nur ``keep_id``
+    (der Rest verschwindet per ON DELETE CASCADE). Ohne eigene Transaktion.
+    Gibt die Zahl übernommener Zuordnungen zurück, None wenn eine der
+    beiden Fragen fehlt.
+    """
+    found = conn.execute(
+        "SELECT COUNT(*) FROM questions WHERE id IN (?, ?)", (keep_id, drop_id)
+    ).fetchone()[0]
+    if found < 2:
+        return None
+    moved = conn.execute(
+        "UPDATE OR IGNORE test_questions SET question_id = ? WHERE question_id = ?",
+        (keep_id, drop_id)
+    ).rowcount
+    conn.execute("DELETE FROM questions WHERE id = ?", (drop_id,))
+    return moved
+
+
+def pending(conn):
+    """Anzahl noch nicht indizierter Fragen."""
+    return conn.execute("SELECT COUNT(*) FROM dedupe_queue").fetchone()[0]
+
+
+def refresh(conn, limit=None, batch_size=BATCH_SIZE, progress=None):
+    """Warteschlange abarbeiten, höchstens ``limit`` Fragen.
+
+    Ein Block von ``batch_size`` Fragen pro Transaktion (BEGIN IMMEDIATE).
+    Gibt die Zahl der verarbeiteten Warteschlangen-Einträge zurück.
+    """
+    done = 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [row[0] for row in conn.execute(
+                "SELECT question_id FROM dedupe_queue ORDER BY question_id LIMIT ?",
+                (size,)
+            )]
+            if ids:
+                index_questions(conn, ids)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        if not ids:
+            break
+        done += len(ids)
+        if progress:
+            progress(done)
+    return done
+
+
+def rebuild(conn, progress=None):
+    """Alle Fragen neu in die Warteschlange stellen und indizieren."""
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO dedupe_queue (question_id) SELECT id FROM questions")
+    return refresh(conn, progress=progress)
+
+
+def list_pairs(conn, threshold=DEFAULT_THRESHOLD, limit=50, offset=0):
+    """Gespeicherte Paare ab ``threshold``, die ähnlichsten zuerst."""
+    return conn.execute(
+        """
+        SELECT d.similarity,
+               a.id AS a_id, a.text AS a_text, a.topic_id AS a_topic_id, ta.name AS a_topic_name,
+               b.id AS b_id, b.text AS b_text, b.topic_id AS b_topic_id, tb.name AS b_topic_name
+        FROM question_duplicates d
+        JOIN questions a ON a.id = d.question_id
+        JOIN topics ta ON ta.id = a.topic_id
+        JOIN questions b ON b.id = d.duplicate_id
+        JOIN topics tb ON tb.id = b.topic_id
+        WHERE d.similarity >= ?
+        ORDER BY d.similarity DESC, d.question_id, d.duplicate_id
+        LIMIT ? OFFSET ?
+        """,
+        (threshold, limit, offset)
+    ).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    sub = parser.add_subparsers(dest="command", required=True)
+    index = sub.add_parser("index", help="Warteschlange abarbeiten")
+    index.add_argument("--rebuild", action="store_true", help="alle Fragen neu indizieren")
+    show = sub.add_parser("list", help="Paare ausgeben")
+    show.add_argument("--min", type=float, default=DEFAULT_THRESHOLD, help="Mindestähnlichkeit")
+    show.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA busy_timeout = 5000")
+    try:
+        if args.command == "index":
+            start = time.perf_counter()
+
+            def progress(done):
+                print(f"  {done:,} Fragen indiziert", end="\r", flush=True)
+
+            count = rebuild(conn, progress) if args.rebuild else refresh(conn, progress=progress)
+            if count:
+                print()
+            print(f"{count:,} Fragen in {time.perf_counter() - start:.1f} s indiziert")
+        else:
+            for row in list_pairs(conn, args.min, args.limit):
+                print(f"{row[0]:.2f}  #{row[1]}  #{row[5]}  {row[2][:60]!r}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Automatische Testerstellung aus Vorgaben.
+
+Beispiel: 40 Punkte, davon 30 % Hydraulik, Schwierigkeit 1/2/3 im Verhältnis
+50/30/20, keine Frage aus den letzten 3 Tests.
+
+    from generator import generate_test
+    result = generate_test(conn, test_id, total_points=40,
+                           topic_shares={hydraulik_id: 0.3},
+                           difficulty_shares={1: 0.5, 2: 0.3, 3: 0.2},
+                           exclude_recent_tests=3)
+
+Vorgehen:
+1. Alle aktiven Fragen einmal laden und im Speicher nach
+   (Thema, Schwierigkeit) gruppieren – keine Abfrage pro Kandidat.
+   Der Pool bleibt im Speicher, bis sich ``table_versions`` ändert.
+2. Die Zielpunkte auf Zellen (Thema × Schwierigkeit) verteilen.
+3. Pro Zelle eine zufällige Stichprobe ziehen und per Teilsummen-DP
+   (Rucksack) genau die Zielpunkte treffen, sonst möglichst nahe darunter.
+4. Fehlende Punkte aus den übrigen erlaubten Fragen auffüllen.
+
+Punkte werden in halben Punkten gerechnet.
+"""
+import random
+import threading
+from collections import defaultdict
+
+import assignments
+
+# Punkte-Auflösung: 2 = halbe Punkte
+UNITS_PER_POINT = 2
+
+# Maximale Kandidaten pro Teilsummen-Suche (begrenzt die Laufzeit)
+SAMPLE_SIZE = 400
+
+# Alle Themen ohne eigene Vorgabe teilen sich den Rest
+OTHER_TOPICS = None
+
+
+class QuestionPool:
+    """Kandidaten im Speicher, gruppiert nach (Thema, Schwierigkeit)."""
+
+    def __init__(self, rows):
+        self.cells = defaultdict(list)
+        self.points = {}
+        self.topic_of = {}
+        self.difficulty_of = {}
+        for qid, topic_id, difficulty, points in rows:
+            units = round((points or 0) * UNITS_PER_POINT)
+            if units <= 0:
+                continue
+            difficulty = difficulty or 1
+            self.cells[(topic_id, difficulty)].append(qid)
+            self.points[qid] = units
+            self.topic_of[qid] = topic_id
+            self.difficulty_of[qid] = difficulty
+
+    @classmethod
+    def load(cls, conn):
+        cur = conn.cursor()
+        cur.row_factory = None  # Tupel statt sqlite3.Row: deutlich schneller
+        rows = cur.execute(
+            """
+            SELECT id, topic_id, difficulty, points
+            FROM questions
+            WHERE is_active = 1
+            """
+        ).fetchall()
+        return cls(rows)
+
+    def topics(self):
+        return {topic_id for topic_id, _ in self.cells}
+
+    def candidates(self, topics=None, difficulties=None, exclude=()):
+        """Fragen-IDs der passenden Zellen (None = alle), ohne ``exclude``."""
+        ids = []
+        for (topic_id, difficulty), cell in self.cells.items():
+            if topics is not None and topic_id not in topics:
+                continue
+            if difficulties is not None and difficulty not in difficulties:
+                continue
+            if exclude:
+                ids.extend(qid for qid in cell if qid not in exclude)
+            else:
+                ids.extend(cell)
+        return ids
+
+
+# Zuletzt geladener Pool je Datenbankdatei: {pfad: (version, pool)}
+_pool_cache = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(conn):
+    """Fragenpool aus dem Speicher, neu geladen nur nach Änderungen an questions."""
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    version = conn.execute(
+        "SELECT version FROM table_versions WHERE name = 'questions'"
+    ).fetchone()[0]
+
+    with _pool_lock:
+        cached = _pool_cache.get(db_file)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    pool = QuestionPool.load(conn)
+    with _pool_lock:
+        _pool_cache[db_file] = (version, pool)
+    return pool
+
+
+def recently_used_questions(conn, tests, exclude_test_id=None):
+    """Fragen-IDs aus den letzten ``tests`` Tests (nach Datum)."""
+    if tests <= 0:
+        return set()
+    rows = conn.execute(
+        """
+        SELECT DISTINCT tq.question_id
+        FROM test_questions tq
+        WHERE tq.test_id IN (
+            SELECT id FROM tests
+            WHERE id != ?
+            ORDER BY date DESC, id DESC
+            LIMIT ?
+        )
+        """,
+        (exclude_test_id or 0, tests)
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def pick_exact(candidates, points, target, rnd, sample_size=SAMPLE_SIZE):
+    """Teilmenge mit Punktesumme möglichst genau ``target`` (nicht darüber).
+
+    Teilsummen-DP über eine zufällige Stichprobe. Bricht ab, sobald das Ziel
+    exakt erreicht ist. Gibt (ids, erreichte_punkte) zurück.
+    """
+    if target <= 0 or not candidates:
+        return [], 0
+    sample = rnd.sample(candidates, min(len(candidates), sample_size))
+
+    # reachable[summe] = (vorherige_summe, frage_id)
+    reachable = {0: None}
+    for qid in sample:
+        units = points[qid]
+        for total in list(reachable):
+            new_total = total + units
+            if new_total <= target and new_total not in reachable:
+                reachable[new_total] = (total, qid)
+        if target in reachable:
+            break
+
+    best = max(reachable)
+    chosen = []
+    while reachable[best] is not None:
+        best, qid = reachable[best]
+        chosen.append(qid)
+    return chosen, sum(points[qid] for qid in chosen)
+
+
+def _split(total, shares):
+    """Ganzzahligen Gesamtwert nach Anteilen verteilen (Summe bleibt exakt)."""
+    weight = sum(shares.values())
+    if weight <= 0:
+        return {key: 0 for key in shares}
+    raw = {key: total * share / weight for key, share in shares.items()}
+    result = {key: int(value) for key, value in raw.items()}
+    rest = total - sum(result.values())
+    # Reste an die Schlüssel mit dem größten Nachkommaanteil
+    for key in sorted(raw, key=lambda k: raw[k] - result[k], reverse=True)[:rest]:
+        result[key] += 1
+    return result
+
+
+def select_questions(pool, total_points, topic_shares=None, difficulty_shares=None,
+                     seed=None, exclude=()):
+    """Fragen aus dem Pool nach Vorgaben auswählen (ohne Datenbankzugriff).
+
+    - ``topic_shares``: {topic_id: Anteil} an den Punkten, z.B. {3: 0.3}.
+      Themen ohne Vorgabe teilen sich den Rest. Summe höchstens 1.
+    - ``difficulty_shares``: {Schwierigkeit: Gewicht}, z.B. {1: 5, 2: 3, 3: 2}.
+      Ohne Vorgabe sind alle Schwierigkeiten erlaubt.
+    - ``exclude``: Fragen-IDs, die nicht verwendet werden dürfen.
+
+    Gibt ein Dict mit ``question_ids``, ``points`` und ``target_points`` zurück.
+    """
+    rnd = random.Random(seed)
+    target = round(total_points * UNITS_PER_POINT)
+    if target <= 0:
+        raise ValueError("Die Gesamtpunktezahl muss größer als 0 sein.")
+
+    topic_shares = {k: v for k, v in (topic_shares or {}).items() if v > 0}
+    share_sum = sum(topic_shares.values())
+    if share_sum > 1 + 1e-9:
+        raise ValueError("Die Themenanteile ergeben zusammen mehr als 100 %.")
+    if share_sum < 1 - 1e-9:
+        other = pool.topics() - set(topic_shares)
+        if not other and topic_shares:
+            raise ValueError("Die Themenanteile müssen zusammen 100 % ergeben.")
+        topic_shares[OTHER_TOPICS] = 1 - share_sum
+
+    difficulty_shares = {k: v for k, v in (difficulty_shares or {}).items() if v > 0}
+    if not difficulty_shares:
+        # Keine Vorgabe: Schwierigkeit egal, eine gemeinsame Zelle
+        difficulty_shares = {None: 1}
+
+    all_topics = pool.topics()
+    chosen = []
+    used = set(exclude)
+
+    def topics_for(topic_key):
+        if topic_key is OTHER_TOPICS:
+            return all_topics - set(k for k in topic_shares if k is not OTHER_TOPICS)
+        return {topic_key}
+
+    def difficulties_for(difficulty_key):
+        return None if difficulty_key is None else {difficulty_key}
+
+    # 1. Zellen (Thema × Schwierigkeit) einzeln füllen
+    topic_targets = _split(target, topic_shares)
+    deficits = {}
+    for topic_key, topic_target in topic_targets.items():
+        cell_targets = _split(topic_target, difficulty_shares)
+        for difficulty_key, cell_target in cell_targets.items():
+            candidates = pool.candidates(topics_for(topic_key),
+                                         difficulties_for(difficulty_key), exclude=used)
+            ids, reached = pick_exact(candidates, pool.points, cell_target, rnd)
+            chosen.extend(ids)
+            used.update(ids)
+            deficits[topic_key] = deficits.get(topic_key, 0) + cell_target - reached
+
+    # 2. Fehlende Punkte pro Thema mit beliebiger Schwierigkeit auffüllen
+    for topic_key, missing in deficits.items():
+        if missing <= 0:
+            continue
+        candidates = pool.candidates(topics_for(topic_key), exclude=used)
+        ids, _ = pick_exact(candidates, pool.points, missing, rnd)
+        chosen.extend(ids)
+        used.update(ids)
+
+    # 3. Notfalls aus allen übrigen Fragen auffüllen
+    reached = sum(pool.points[qid] for qid in chosen)
+    if reached < target:
+        candidates = pool.candidates(exclude=used)
+        ids, _ = pick_exact(candidates, pool.points, target - reached, rnd)
+        chosen.extend(ids)
+
+    # Leichte Fragen zuerst, innerhalb gleicher Schwierigkeit nach Thema
+    chosen.sort(key=lambda qid: (pool.difficulty_of[qid], pool.topic_of[qid], qid))
+    reached = sum(pool.points[qid] for qid in chosen)
+    return {
+        "question_ids": chosen,
+        "points": reached / UNITS_PER_POINT,
+        "target_points": target / UNITS_PER_POINT,
+    }
+
+
+def generate_test(conn, test_id, total_points, topic_shares=None,
+                  difficulty_shares=None, exclude_recent_tests=0, seed=None):
+    """Fragen auswählen und als Zuordnung des Tests speichern (ein Batch).
+
+    Bestehende Zuordnungen des Tests werden ersetzt. Gibt das Ergebnis von
+    ``select_questions`` plus die geschriebenen Zeilen (``changes``) zurück.
+    """
+    excluded = recently_used_questions(conn, exclude_recent_tests, exclude_test_id=test_id)
+    pool = get_pool(conn)
+    result = select_questions(pool, total_points, topic_shares, difficulty_shares, seed,
+                              exclude=excluded)
+    result["changes"] = assignments.save_assignment(conn, test_id, result["question_ids"])
+    return result
@@ -0,0 +1,65 @@
+"""gunicorn-Konfiguration für den Betrieb (Docker auf der NAS).
+
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+
+Mehrere Worker-Prozesse mit je mehreren Threads (gthread). Alle Werte lassen
+sich per Umgebungsvariable überschreiben.
+"""
+import os
+
+from config import available_cpus
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Ein Prozess pro Kern, mindestens 2 (ein hängender Request blockiert nicht
+# alles), höchstens 4: SQLite schreibt ohnehin nur mit einer Verbindung
+# gleichzeitig, mehr Prozesse kosten auf der NAS nur Speicher.
+workers = int(os.environ.get("WEB_WORKERS", max(2, min(available_cpus(), 4))))
+
+# Threads pro Prozess: Requests warten meist auf SQLite oder das Netz
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 4))
+
+# Lange Requests (z.B. große PDF-Stapel) nicht vorzeitig abbrechen
+timeout = int(os.environ.get("WEB_TIMEOUT", 120))
+keepalive = 5
+
+# Worker nach einer Weile ersetzen, falls Speicher wächst
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get("WEB_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+
+def on_starting(server):
+    """Im Master vor dem Start der Worker: Datenbank und Templates vorbereiten.
+
+    Schema anlegen/migrieren und Templates kompilieren passiert so einmal
+    statt in jedem Worker. Die Module sind danach schon geladen, die per
+    fork gestarteten Worker importieren sie nicht noch einmal.
+    """
+    import app
+
+    applied = app.prepare()
+    if applied:
+        server.log.info("Migrationen angewendet: %s", applied)
+
+
+def worker_exit(server, worker):
+    """Im Worker beim Beenden (auch beim Ersetzen nach ``max_requests``).
+
+    Laufende Hintergrundaufträge zurück in die Warteschlange stellen; der
+    nächste Worker mit der Sperre ``jobs.lock`` startet sie neu. Wartet, bis
+    sie den nächsten Fortschrittsschritt erreichen (höchstens ``timeout``,
+    danach beendet der Master den Prozess und ``jobs.recover_stale`` stellt
+    sie zurück).
+    """
+    import app
+
+    wsgi = getattr(worker, "wsgi", None)
+    if wsgi is None:
+        return
+    requeued = app.requeue_jobs(wsgi)
+    if requeued:
+        server.log.info("Aufträge zurückgestellt: %s", requeued)
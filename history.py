@@ -0,0 +1,351 @@
+"""Alte Tests in einer zweiten Datenbankdatei (Schuljahreswechsel).
+
+Tests vor einem Stichtag wandern samt Fragenzuordnung und Ergebnissen aus
+``questions.db`` nach ``history.db``. Die Hauptdatenbank bleibt so klein, dass sie im
+Page-Cache bleibt; alte Tests lassen sich trotzdem durchsuchen, ansehen und
+bei Bedarf zurückholen. Die Datei hängt auf jeder Verbindung der App als
+Schema ``history`` (ATTACH), Abfragen können also beide Dateien verbinden.
+
+Die Fragen selbst bleiben in der Hauptdatenbank (nicht mehr benötigte
+werden archiviert, siehe ``questions.is_active``). Wird eine Frage später
+gelöscht, fehlt sie in der Ansicht des alten Tests.
+
+Verschoben wird in Blöcken mit zwei Transaktionen: erst die Kopie in
+``history.db`` (``synchronous = FULL``), dann das Löschen in der
+Hauptdatenbank. Über zwei WAL-Dateien ist ein Commit nicht atomar; bricht
+der Vorgang dazwischen ab, steht ein Test höchstens doppelt da, und der
+nächste Lauf überschreibt die Kopie.
+
+    python history.py --db data/questions.db move --before 2025-08-01
+    python history.py --db data/questions.db list --name Schularbeit
+"""
+import argparse
+import json
+import os
+import sqlite3
+
+import database
+import search as search_index
+from connection_pool import DEFAULT_PRAGMAS
+
+# Tests pro Block beim Verschieben (je Block zwei kurze Transaktionen)
+MOVE_BATCH_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history.tests (
+    id               INTEGER PRIMARY KEY,
+    name             TEXT NOT NULL,
+    date             TEXT,
+    notes            TEXT,
+    version          INTEGER NOT NULL DEFAULT 0,
+    grading_scale_id INTEGER,
+    moved_at         TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS history.idx_history_tests_date
+    ON tests (date, id);
+
+CREATE TABLE IF NOT EXISTS history.test_questions (
+    test_id         INTEGER NOT NULL REFERENCES tests(id) ON DELETE CASCADE,
+    question_id     INTEGER NOT NULL,
+    position        INTEGER NOT NULL,
+    points_override REAL,
+    PRIMARY KEY (test_id, question_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS history.idx_history_test_questions_question
+    ON test_questions (question_id);
+
+-- Punkte der Schüler (Schüler selbst bleiben in der Hauptdatenbank)
+CREATE TABLE IF NOT EXISTS history.results (
+    test_id     INTEGER NOT NULL REFERENCES tests(id) ON DELETE CASCADE,
+    student_id  INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    score       REAL NOT NULL,
+    PRIMARY KEY (test_id, student_id, question_id)
+) WITHOUT ROWID;
+"""
+
+# Spalten, die history.tests später bekommen hat: (name, Definition)
+ADDED_COLUMNS = [
+    ("version", "INTEGER NOT NULL DEFAULT 0"),
+    ("grading_scale_id", "INTEGER"),
+]
+
+
+def default_path(db_path):
+    """``history.db`` neben der Hauptdatenbank."""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "history.db")
+
+
+def attach(conn, path):
+    """``history.db`` als Schema ``history`` anhängen, Datei und Tabellen bei Bedarf anlegen."""
+    conn.execute("ATTACH DATABASE ? AS history", (path,))
+    conn.execute("PRAGMA history.journal_mode = WAL")
+    # Die Kopie muss auf der Platte sein, bevor das Original gelöscht wird
+    conn.execute("PRAGMA history.synchronous = FULL")
+    database.execute_script(conn, SCHEMA)
+    # history.db aus älteren Versionen: Spalten nachrüsten
+    columns = {row[1] for row in conn.execute("PRAGMA history.table_info(tests)")}
+    for name, definition in ADDED_COLUMNS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE history.tests ADD COLUMN {name} {definition}")
+    conn.commit()
+
+
+def move_tests(conn, before, batch_size=MOVE_BATCH_SIZE, progress=None):
+    """Tests mit Datum vor ``before`` (JJJJ-MM-TT) nach ``history.db`` verschieben.
+
+    Tests ohne Datum bleiben (``new_test`` speichert ein leeres Datum als
+    ``''``, und ``'' < before`` wäre wahr). ``progress(moved, total)`` wird
+    nach jedem Block aufgerufen. Gibt die Anzahl verschobener Tests zurück.
+    """
+    total = conn.execute(
+        "SELECT COUNT(*) FROM main.tests WHERE date < ? AND date <> ''", (before,)
+    ).fetchone()[0]
+    moved = 0
+    while True:
+        ids = [row[0] for row in conn.execute(
+            "SELECT id FROM main.tests WHERE date < ? AND date <> '' ORDER BY date, id LIMIT ?",
+            (before, batch_size)
+        )]
+        if not ids:
+            break
+        id_list = json.dumps(ids)
+
+        # 1. Kopie (ersetzt eine Kopie aus einem abgebrochenen Lauf)
+        with conn:
+            conn.execute(
+                "DELETE FROM history.tests WHERE id IN (SELECT value FROM json_each(?))",
+                (id_list,)
+            )
+            conn.execute(
+                """
+                INSERT INTO history.tests (id, name, date, notes, version, grading_scale_id)
+                SELECT id, name, date, notes, version, grading_scale_id FROM main.tests
+                WHERE id IN (SELECT value FROM json_each(?))
+                """,
+                (id_list,)
+            )
+            conn.execute(
+                """
+                INSERT INTO history.test_questions (test_id, question_id, position, points_override)
+                SELECT test_id, question_id, position, points_override FROM main.test_questions
+                WHERE test_id IN (SELECT value FROM json_each(?))
+                """,
+                (id_list,)
+            )
+            conn.execute(
+                """
+                INSERT INTO history.results (test_id, student_id, question_id, score)
+                SELECT test_id, student_id, question_id, score FROM main.results
+                WHERE test_id IN (SELECT value FROM json_each(?))
+                """,
+                (id_list,)
+            )
+
+        # 2. Original löschen (Zuordnungen und Ergebnisse per ON DELETE CASCADE)
+        with conn:
+            conn.execute(
+                "DELETE FROM main.tests WHERE id IN (SELECT value FROM json_each(?))",
+                (id_list,)
+            )
+
+        moved += len(ids)
+        if progress:
+            progress(moved, total)
+    return moved
+
+
+def restore_test(conn, test_id):
+    """Alten Test zurück in die Hauptdatenbank holen (mit derselben ID).
+
+    Zuordnungen und Ergebnisse zu inzwischen gelöschten Fragen oder
+    Schülern entfallen, ebenso ein inzwischen gelöschter Notenschlüssel (dann
+    gilt der Standardschlüssel). Die Version zählt über der alten weiter:
+    Vorschau-Cache und Momentaufnahmen dürfen den alten Stand nicht für den
+    zurückgeholten halten. Gibt die Anzahl übernommener Fragen zurück, None, wenn es den Test nicht gibt.
+    """
+    if conn.execute("SELECT 1 FROM history.tests WHERE id = ?", (test_id,)).fetchone() is None:
+        return None
+
+    # Wie beim Verschieben: erst kopieren, dann das Original löschen
+    with conn:
+        # Höchste bisher vergebene Version (ein doppelt vorhandener Test aus
+        # einem abgebrochenen Lauf kann in main weiter sein)
+        version = conn.execute(
+            """
+            SELECT MAX(version) FROM (
+                SELECT version FROM main.tests WHERE id = :id
+                UNION ALL
+                SELECT version FROM history.tests WHERE id = :id
+            )
+            """,
+            {"id": test_id}
+        ).fetchone()[0]
+        conn.execute("DELETE FROM main.tests WHERE id = ?", (test_id,))
+        conn.execute(
+            """
+            INSERT INTO main.tests (id, name, date, notes, version, grading_scale_id)
+            SELECT h.id, h.name, h.date, h.notes, ?,
+                   (SELECT g.id FROM main.grading_scales g WHERE g.id = h.grading_scale_id)
+            FROM history.tests h WHERE h.id = ?
+            """,
+            (version + 1, test_id)
+        )
+        count = conn.execute(
+            """
+            INSERT INTO main.test_questions (test_id, question_id, position, points_override)
+            SELECT tq.test_id, tq.question_id, tq.position, tq.points_override
+            FROM history.test_questions tq
+            JOIN main.questions q ON q.id = tq.question_id
+            WHERE tq.test_id = ?
+            """,
+            (test_id,)
+        ).rowcount
+        conn.execute(
+            """
+            INSERT INTO main.results (test_id, student_id, question_id, score)
+            SELECT r.test_id, r.student_id, r.question_id, r.score
+            FROM history.results r
+            JOIN main.test_questions tq ON tq.test_id = r.test_id AND tq.question_id = r.question_id
+            JOIN main.students s ON s.id = r.student_id
+            WHERE r.test_id = ?
+            """,
+            (test_id,)
+        )
+    with conn:
+        conn.execute("DELETE FROM history.tests WHERE id = ?", (test_id,))
+    return count
+
+
+def find_tests(conn, name=None, text=None, question_id=None, limit=50, offset=0):
+    """Alte Tests suchen, neueste zuerst.
+
+    - ``name``: Teil von Name oder Notizen
+    - ``text``: Wörter, die in einer Frage des Tests vorkommen (Volltextindex)
+    - ``question_id``: Tests, die diese Frage enthalten
+    """
+    conditions = []
+    params = {"limit": limit, "offset": offset}
+    if name:
+        conditions.append("(t.name LIKE :name ESCAPE '\\' OR t.notes LIKE :name ESCAPE '\\')")
+        escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params["name"] = f"%{escaped}%"
+    if text:
+        match = search_index.build_match_query(text)
+        if match is None:
+            return []
+        conditions.append("""t.id IN (
+            SELECT tq.test_id FROM history.test_questions tq
+            WHERE tq.question_id IN (
+                SELECT rowid FROM questions_fts WHERE questions_fts MATCH :match
+            )
+        )""")
+        params["match"] = match
+    if question_id is not None:
+        conditions.append("""t.id IN (
+            SELECT test_id FROM history.test_questions WHERE question_id = :question_id
+        )""")
+        params["question_id"] = question_id
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    return conn.execute(
+        f"""
+        SELECT t.id, t.name, t.date, t.notes, t.moved_at,
+               (SELECT COUNT(*) FROM history.test_questions tq
+                WHERE tq.test_id = t.id) AS question_count
+        FROM history.tests t
+        {where}
+        ORDER BY t.date DESC, t.id DESC
+        LIMIT :limit OFFSET :offset
+        """,
+        params
+    ).fetchall()
+
+
+def load_test(conn, test_id):
+    """Alten Test mit seinen Fragen (Reihenfolge wie im Test) oder None.
+
+    Fragen, die es in der Hauptdatenbank nicht mehr gibt, haben ``text`` None.
+    """
+    test = conn.execute(
+        "SELECT id, name, date, notes, moved_at FROM history.tests WHERE id = ?",
+        (test_id,)
+    ).fetchone()
+    if test is None:
+        return None, []
+    questions = conn.execute(
+        """
+        SELECT tq.question_id, tq.position, q.text, q.is_active,
+               COALESCE(tq.points_override, q.points) AS points,
+               t.name AS topic_name
+        FROM history.test_questions tq
+        LEFT JOIN main.questions q ON q.id = tq.question_id
+        LEFT JOIN main.topics t ON t.id = q.topic_id
+        WHERE tq.test_id = ?
+        ORDER BY tq.position
+        """,
+        (test_id,)
+    ).fetchall()
+    return test, questions
+
+
+def tests_with_question(conn, question_id):
+    """Alte Tests, in denen eine Frage vorkommt (für "Verwendet in")."""
+    return conn.execute(
+        """
+        SELECT t.id, t.name, t.date
+        FROM history.test_questions tq
+        JOIN history.tests t ON t.id = tq.test_id
+        WHERE tq.question_id = ?
+        ORDER BY t.date DESC, t.id DESC
+        """,
+        (question_id,)
+    ).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    parser.add_argument("--history-db", help="Datei für alte Tests (Standard: history.db neben der DB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    move = sub.add_parser("move", help="Tests vor einem Stichtag verschieben")
+    move.add_argument("--before", required=True, help="Stichtag JJJJ-MM-TT")
+    restore = sub.add_parser("restore", help="alten Test zurückholen")
+    restore.add_argument("test_id", type=int)
+    show = sub.add_parser("list", help="alte Tests ausgeben")
+    show.add_argument("--name", help="Teil von Name oder Notizen")
+    show.add_argument("--text", help="Wörter in einer Frage des Tests")
+    show.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    for name, value in DEFAULT_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    attach(conn, args.history_db or default_path(args.db))
+    try:
+        if args.command == "move":
+            def progress(moved, total):
+                print(f"  {moved:,} von {total:,} Tests verschoben", end="\r", flush=True)
+
+            count = move_tests(conn, args.before, progress=progress)
+            if count:
+                print()
+            print(f"{count:,} Tests vor {args.before} verschoben.")
+        elif args.command == "restore":
+            count = restore_test(conn, args.test_id)
+            if count is None:
+                raise SystemExit(f"Alter Test {args.test_id} nicht gefunden.")
+            print(f"Test {args.test_id} mit {count} Fragen zurückgeholt.")
+        else:
+            for row in find_tests(conn, name=args.name, text=args.text, limit=args.limit):
+                print(f"{row['id']:>6}  {row['date'] or '':<10}  {row['question_count']:>3} Fragen"
+                      f"  {row['name']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,21 @@
+import argparse
 import csv
+import itertools
 import os
 import sqlite3
+import time
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "questions.db")
+import database
+import duplicates
+
+DB_PATH = database.DB_PATH
 TXT_PATH = os.path.join(os.path.dirname(__file__), "Fragenkatalog.txt")
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Zeilen pro Transaktion im Bulk-Modus
+DEFAULT_CHUNK_SIZE = 5000
+
+def get_db_connection(db_path=None):
+    conn = sqlite3.connect(db_path or DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -22,34 +31,45 @@ def ensure_topic(conn, name):
     )
     return cur.lastrowid
 
-def import_questions():
-    conn = get_db_connection()
+def parse_row(row):
+    """Eine Katalogzeile (ID;Frage;Thema;Punkte) prüfen.
+
+    Gibt (Fragetext, Thema, Punkte) zurück oder None bei defekten Zeilen.
+    """
+    if len(row) < 4:
+        print("Überspringe defekte Zeile:", row)
+        return None
+
+    question_text = row[1].strip().strip('"')
+    topic_name = row[2].strip().strip('"')
+    points_raw = row[3].strip()
+
+    # Punkte prüfen
+    try:
+        points = float(points_raw)
+    except ValueError:
+        points = 1.0
+
+    if not question_text or not topic_name:
+        print("Überspringe unvollständige Zeile:", row)
+        return None
+
+    return question_text, topic_name, points
+
+def import_questions(txt_path=None, db_path=None):
+    conn = get_db_connection(db_path)
 
     # Deine Datei verwendet Semikolon
-    with open(TXT_PATH, newline="", encoding="utf-8") as f:
+    with open(txt_path or TXT_PATH, newline="", encoding="utf-8") as f:
         reader = csv.reader(f, delimiter=';')
 
         count = 0
         for row in reader:
             # Format: ID;Frage;Thema;Punkte
-            if len(row) < 4:
-                print("Überspringe defekte Zeile:", row)
-                continue
-
-            _id = row[0].strip()
-            question_text = row[1].strip().strip('"')
-            topic_name = row[2].strip().strip('"')
-            points_raw = row[3].strip()
-
-            # Punkte prüfen
-            try:
-                points = float(points_raw)
-            except:
-                points = 1.0
-
-            if not question_text or not topic_name:
-                print("Überspringe unvollständige Zeile:", row)
+            parsed = parse_row(row)
+            if parsed is None:
                 continue
+            question_text, topic_name, points = parsed
 
             # Topic sicherstellen
             topic_id = ensure_topic(conn, topic_name)
@@ -70,5 +90,163 @@ def import_questions():
 
         print(f"{count} Fragen erfolgreich importiert.")
 
+def import_questions_bulk(txt_path=None, db_path=None,
+                          chunk_size=DEFAULT_CHUNK_SIZE, fast=False, quiet=False,
+                          on_duplicate=None, threshold=duplicates.DEFAULT_THRESHOLD,
+                          progress=None, skip_rows=0):
+    """Katalog als Stream in Blöcken importieren.
+
+    - Themen werden einmal in ein Dict name -> id geladen (kein SELECT pro Zeile)
+    - pro Block ein ``executemany`` in einer eigenen Transaktion
+    - ``fast=True`` schaltet Journal und fsync während des Imports ab.
+      Nur für Offline-Importe verwenden: bei Absturz kann die DB beschädigt werden.
+    - ``on_duplicate``: Zeilen, die einer vorhandenen Frage oder einer
+      früheren Zeile des Katalogs ähneln (ab ``threshold``, siehe
+      duplicates.py), werden bei ``"skip"`` übersprungen. Bei ``"merge"``
+      übernimmt die vorhandene Frage Text und Punkte der Katalogzeile.
+    - ``progress(anzahl, zeilen)`` wird nach jedem gespeicherten Block mit
+      den importierten Fragen und den bisher gelesenen Katalogzeilen (ab
+      Dateianfang) aufgerufen (z.B. für Hintergrundaufträge, siehe jobs.py)
+    - ``skip_rows``: so viele Katalogzeilen am Anfang überspringen (Fortsetzen
+      eines unterbrochenen Imports; gezählt werden nur die neuen Fragen)
+
+    Gibt die Anzahl importierter Fragen zurück.
+    """
+    conn = get_db_connection(db_path)
+    # Transaktionen selbst steuern (BEGIN/COMMIT pro Block)
+    conn.isolation_level = None
+
+    previous_journal_mode = None
+    if fast:
+        previous_journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+
+    topic_ids = {
+        row["name"]: row["id"]
+        for row in conn.execute("SELECT id, name FROM topics")
+    }
+
+    count = skipped = merged = 0
+    start = time.perf_counter()
+
+    try:
+        if on_duplicate:
+            # Ohne aktuellen Index würden Duplikate durchrutschen
+            duplicates.refresh(conn)
+
+        with open(txt_path or TXT_PATH, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f, delimiter=';')
+            rows_read = sum(1 for _ in itertools.islice(reader, skip_rows))
+
+            while True:
+                chunk = list(itertools.islice(reader, chunk_size))
+                if not chunk:
+                    break
+                rows_read += len(chunk)
+
+                batch = []
+                conn.execute("BEGIN")
+                for row in chunk:
+                    parsed = parse_row(row)
+                    if parsed is None:
+                        continue
+                    question_text, topic_name, points = parsed
+
+                    topic_id = topic_ids.get(topic_name)
+                    if topic_id is None:
+                        topic_id = ensure_topic(conn, topic_name)
+                        topic_ids[topic_name] = topic_id
+
+                    batch.append((question_text, topic_id, 1, points, ""))
+
+                if on_duplicate:
+                    matches = duplicates.match_texts(conn, [row[0] for row in batch], threshold)
+                    updates = [
+                        (row[0], row[3], match)
+                        for row, (match, _) in zip(batch, matches)
+                        if match is not None and on_duplicate == "merge"
+                    ]
+                    conn.executemany(
+                        """
+                        UPDATE questions SET text = ?, points = ?, updated_at = datetime('now')
+                        WHERE id = ?
+                        """,
+                        updates
+                    )
+                    kept = [row for row, match in zip(batch, matches) if match == (None, None)]
+                    merged += len(updates)
+                    skipped += len(batch) - len(kept) - len(updates)
+                    batch = kept
+
+                conn.executemany(
+                    """
+                    INSERT INTO questions (text, topic_id, difficulty, points, solution)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    batch
+                )
+                conn.execute("COMMIT")
+                count += len(batch)
+
+                if on_duplicate:
+                    # Neue Fragen indizieren, damit der nächste Block sie sieht
+                    duplicates.refresh(conn)
+
+                if progress:
+                    progress(count, rows_read)
+                if not quiet:
+                    elapsed = time.perf_counter() - start
+                    rate = count / elapsed if elapsed else 0
+                    print(f"{count} Fragen importiert ({rate:,.0f} Zeilen/s)")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        if previous_journal_mode is not None:
+            conn.execute(f"PRAGMA journal_mode = {previous_journal_mode}")
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    if not quiet:
+        rate = count / elapsed if elapsed else 0
+        print(f"{count} Fragen erfolgreich importiert "
+              f"in {elapsed:.1f} s ({rate:,.0f} Zeilen/s).")
+        if on_duplicate:
+            print(f"Ähnliche Fragen: {skipped} übersprungen, {merged} zusammengeführt.")
+
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fragenkatalog (ID;Frage;Thema;Punkte) in die Datenbank importieren."
+    )
+    parser.add_argument("--file", default=TXT_PATH, help="Katalogdatei")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite-Datenbank")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Streaming-Import in Blöcken mit executemany")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Zeilen pro Transaktion im Bulk-Modus")
+    parser.add_argument("--fast", action="store_true",
+                        help="journal_mode=OFF / synchronous=OFF während des Imports "
+                             "(nur offline verwenden)")
+    parser.add_argument("--duplicates", choices=("skip", "merge"),
+                        help="ähnliche Fragen überspringen bzw. vorhandene Frage "
+                             "aktualisieren (nur mit --bulk)")
+    parser.add_argument("--similarity", type=float, default=duplicates.DEFAULT_THRESHOLD,
+                        help="ab dieser Ähnlichkeit (0–1) gilt eine Frage als Duplikat")
+    args = parser.parse_args(argv)
+
+    if args.duplicates and not args.bulk:
+        parser.error("--duplicates nur zusammen mit --bulk")
+
+    if args.bulk:
+        import_questions_bulk(args.file, args.db,
+                              chunk_size=args.chunk_size, fast=args.fast,
+                              on_duplicate=args.duplicates, threshold=args.similarity)
+    else:
+        import_questions(args.file, args.db)
+
 if __name__ == "__main__":
-    import_questions()
+    main()
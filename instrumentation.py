@@ -0,0 +1,307 @@
+"""Optionale Messung von Routen und SQL-Abfragen (``INSTRUMENTATION=1``).
+
+Ist die Messung aktiv,
+- öffnet der Pool Verbindungen mit ``InstrumentedConnection``: jede
+  Anweisung wird mit Anzahl und Dauer pro SQL-Text gezählt,
+- wird jede Route gemessen (Anzahl, Dauer als Histogramm, SQL pro Request),
+- werden N+1-Muster gemeldet: dieselbe Anweisung wird in einem Request
+  mindestens ``N_PLUS_ONE_THRESHOLD`` Mal einzeln ausgeführt (Schleife statt
+  ``executemany`` oder JOIN),
+- gibt es ``/metrics`` (Prometheus-Textformat) und ``/debug/profile``
+  (cProfile für einen gewählten Request).
+
+Ist sie aus, wird nichts davon registriert: normale sqlite3-Verbindungen,
+keine Hooks, keine zusätzlichen Routen.
+
+Gemessen wird die Zeit in ``execute``/``executemany`` (Vorbereiten und
+erster Schritt der Abfrage – bei Sortierungen und Aggregaten fast die ganze
+Arbeit). Der Trace-Callback von sqlite3 liefert keine Dauer und nur SQL mit
+eingesetzten Werten, daher die eigene Connection-Klasse.
+"""
+import cProfile
+import io
+import pstats
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import Blueprint, current_app, g, render_template, request
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Ab so vielen Einzelausführungen derselben Anweisung pro Request: N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+# Verschiedene SQL-Texte, die höchstens gezählt werden (Schutz vor dynamischem SQL)
+MAX_STATEMENTS = 500
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Laufender Request des Threads (SQL-Zähler), gesetzt von den Flask-Hooks
+_local = threading.local()
+
+bp = Blueprint("instrumentation", __name__)
+
+
+def normalize_sql(sql):
+    """SQL-Text ohne Zeilenumbrüche und Mehrfach-Leerzeichen."""
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+class Metrics:
+    """Gesammelte Messwerte eines Prozesses (threadsicher)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (endpoint, method, status) -> Anzahl
+        self.requests = {}
+        # endpoint -> [bucket-zähler..., summe, anzahl]
+        self.durations = {}
+        # endpoint -> [anweisungen, sekunden]
+        self.route_sql = {}
+        # sql -> [anzahl, sekunden]
+        self.statements = {}
+        # endpoint -> Anzahl erkannter N+1-Muster
+        self.n_plus_one = {}
+        # letzte Funde für die Profilseite: (zeit, endpoint, sql, anzahl)
+        self.recent_n_plus_one = deque(maxlen=50)
+
+    def record_statement(self, sql, elapsed):
+        sql = normalize_sql(sql)
+        with self._lock:
+            entry = self.statements.get(sql)
+            if entry is None:
+                if len(self.statements) >= MAX_STATEMENTS:
+                    sql = "(weitere)"
+                entry = self.statements.setdefault(sql, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def record_request(self, endpoint, method, status, elapsed, queries):
+        """Einen Request verbuchen. Gibt die erkannten N+1-Anweisungen zurück."""
+        suspicious = [
+            (sql, count) for sql, (count, _seconds) in queries.items()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+        with self._lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            hist = self.durations.get(endpoint)
+            if hist is None:
+                hist = self.durations[endpoint] = [0] * len(DURATION_BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if elapsed <= bound:
+                    hist[i] += 1
+            hist[-2] += elapsed
+            hist[-1] += 1
+
+            sql_total = self.route_sql.setdefault(endpoint, [0, 0.0])
+            sql_total[0] += sum(count for count, _ in queries.values())
+            sql_total[1] += sum(seconds for _, seconds in queries.values())
+
+            if suspicious:
+                self.n_plus_one[endpoint] = self.n_plus_one.get(endpoint, 0) + 1
+                for sql, count in suspicious:
+                    self.recent_n_plus_one.append((time.time(), endpoint, sql, count))
+        return suspicious
+
+    def top_statements(self, limit=20):
+        with self._lock:
+            items = [(sql, count, seconds) for sql, (count, seconds) in self.statements.items()]
+        return sorted(items, key=lambda item: item[2], reverse=True)[:limit]
+
+    def prometheus(self, pool_stats=None):
+        """Alle Werte im Prometheus-Textformat."""
+        lines = []
+
+        def add(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+        with self._lock:
+            add("testgenerator_http_requests_total", "counter", "Requests pro Route und Status",
+                [({"endpoint": e, "method": m, "status": s}, n)
+                 for (e, m, s), n in sorted(self.requests.items())])
+
+            samples = []
+            for endpoint, hist in sorted(self.durations.items()):
+                for bound, count in zip(DURATION_BUCKETS, hist):
+                    samples.append(({"endpoint": endpoint, "le": f"{bound:g}"}, count))
+                samples.append(({"endpoint": endpoint, "le": "+Inf"}, hist[-1]))
+            lines.append("# HELP testgenerator_http_request_duration_seconds Dauer pro Route")
+            lines.append("# TYPE testgenerator_http_request_duration_seconds histogram")
+            for labels, value in samples:
+                lines.append(f"testgenerator_http_request_duration_seconds_bucket"
+                             f"{_labels(labels)} {value}")
+            for endpoint, hist in sorted(self.durations.items()):
+                labels = _labels({"endpoint": endpoint})
+                lines.append(f"testgenerator_http_request_duration_seconds_sum{labels} "
+                             f"{hist[-2]:.6f}")
+                lines.append(f"testgenerator_http_request_duration_seconds_count{labels} "
+                             f"{hist[-1]}")
+
+            add("testgenerator_route_sql_statements_total", "counter",
+                "SQL-Anweisungen pro Route",
+                [({"endpoint": e}, v[0]) for e, v in sorted(self.route_sql.items())])
+            add("testgenerator_route_sql_seconds_total", "counter",
+                "Zeit in SQL-Anweisungen pro Route",
+                [({"endpoint": e}, f"{v[1]:.6f}") for e, v in sorted(self.route_sql.items())])
+            add("testgenerator_sql_statements_total", "counter",
+                "Ausführungen pro SQL-Anweisung",
+                [({"sql": sql}, v[0]) for sql, v in sorted(self.statements.items())])
+            add("testgenerator_sql_seconds_total", "counter",
+                "Zeit pro SQL-Anweisung",
+                [({"sql": sql}, f"{v[1]:.6f}") for sql, v in sorted(self.statements.items())])
+            add("testgenerator_n_plus_one_total", "counter",
+                "Requests mit N+1-Muster (gleiche Anweisung vielfach einzeln ausgeführt)",
+                [({"endpoint": e}, n) for e, n in sorted(self.n_plus_one.items())])
+
+        if pool_stats:
+            for key in ("size", "idle", "hits", "misses", "waits", "timeouts"):
+                if key in ("size", "idle"):
+                    name, kind = f"testgenerator_db_pool_{key}", "gauge"
+                else:
+                    name, kind = f"testgenerator_db_pool_{key}_total", "counter"
+                add(name, kind, f"Verbindungspool: {key}", [({}, pool_stats[key])])
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor, der jede Ausführung mit Dauer verbucht."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record(self.connection.metrics, sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record(self.connection.metrics, sql, time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Verbindung für ``sqlite3.connect(factory=...)`` mit gemessenen Cursorn."""
+
+    metrics = None  # pro App gesetzt, siehe init_app
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _record(metrics, sql, elapsed):
+    if metrics is None:
+        return
+    metrics.record_statement(sql, elapsed)
+    queries = getattr(_local, "queries", None)
+    if queries is not None:
+        entry = queries.get(sql)
+        if entry is None:
+            queries[sql] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+def init_app(app):
+    """Messung für die App einschalten (vor dem Anlegen des Pools aufrufen).
+
+    Gibt die Connection-Klasse für den Pool zurück.
+    """
+    metrics = Metrics()
+    app.metrics = metrics
+    # Eigene Unterklasse pro App, damit mehrere Apps getrennt zählen
+    connection_class = type("InstrumentedConnection", (InstrumentedConnection,),
+                            {"metrics": metrics})
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        _local.queries = {}
+
+    @app.after_request
+    def record(response):
+        started = g.pop("request_started", None)
+        queries = getattr(_local, "queries", None) or {}
+        _local.queries = None
+        if started is not None:
+            endpoint = request.endpoint or "(unbekannt)"
+            suspicious = metrics.record_request(
+                endpoint, request.method, response.status_code,
+                time.perf_counter() - started, queries,
+            )
+            for sql, count in suspicious:
+                app.logger.warning("N+1 in %s: %dx %s", endpoint, count, normalize_sql(sql))
+        return response
+
+    app.register_blueprint(bp)
+    return connection_class
+
+
+@bp.route("/metrics")
+def metrics():
+    body = current_app.metrics.prometheus(current_app.db_pool.stats())
+    return current_app.response_class(body, mimetype="text/plain; version=0.0.4")
+
+
+@bp.route("/debug/profile")
+def profile():
+    """cProfile für einen Request, z.B. ``/debug/profile?path=/tests``."""
+    path = request.args.get("path", "").strip()
+    sort = request.args.get("sort", "cumulative")
+    if sort not in ("cumulative", "tottime", "ncalls"):
+        sort = "cumulative"
+
+    report = None
+    status = None
+    if path.startswith("/") and not path.startswith("/debug/"):
+        profiler = cProfile.Profile()
+        client = current_app.test_client()
+        profiler.enable()
+        try:
+            response = client.get(path)
+        finally:
+            profiler.disable()
+        status = response.status_code
+
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(40)
+        report = out.getvalue()
+
+    return render_template(
+        "debug_profile.html",
+        path=path,
+        sort=sort,
+        status=status,
+        report=report,
+        statements=current_app.metrics.top_statements(),
+        n_plus_one=list(current_app.metrics.recent_n_plus_one)[::-1],
+    )
@@ -0,0 +1,769 @@
+"""Hintergrundaufträge (Jobs) für lange Operationen.
+
+Importe, der Archiv-Export, das Löschen ganzer Themen, das Indizieren
+der Duplikaterkennung, das Auslagern alter Tests und neue Lese-Kopien
+laufen nicht im Request-Thread: die Route legt einen Auftrag an und
+leitet auf ``/jobs`` um, die Seite fragt den Fortschritt ab.
+Kein Redis oder anderer Dienst nötig.
+
+Die Aufträge stehen in einer eigenen SQLite-Datei neben der Datenbank
+(``jobs.db``). So lassen sich Fortschritt und Abbruchwunsch schreiben,
+während der Auftrag selbst die Schreibsperre von ``questions.db`` hält
+(der Archiv-Import läuft z.B. in einer einzigen Transaktion).
+
+Ausgeführt werden sie vom ``JobRunner``: ein Verteiler-Thread holt wartende
+Aufträge ab und gibt sie an einen Thread- oder Prozesspool. Bei mehreren
+gunicorn-Workern verteilt nur der Prozess mit der Dateisperre ``jobs.lock``,
+die anderen legen nur Aufträge an. Wird dieser Prozess beendet (gunicorn
+ersetzt Worker nach ``max_requests``), unterbricht ``JobRunner.shutdown``
+laufende Aufträge und stellt sie zurück in die Warteschlange. Ohne Web-Server (oder mit
+``JOB_WORKERS=0`` in der App) als eigener Prozess:
+
+    python jobs.py --db data/questions.db worker
+    python jobs.py --db data/questions.db list
+    python jobs.py --db data/questions.db cancel 12
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # nicht unter Linux: keine Sperre, jeder Prozess verteilt
+    fcntl = None
+
+import archive
+import database
+import duplicates
+import history
+import import_access_catalog
+import snapshots
+from connection_pool import DEFAULT_PRAGMAS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    title TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',  -- queued, running, done, failed, cancelled
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    message TEXT NOT NULL DEFAULT '',
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,  -- 1 = abbrechen, 2 = unterbrechen
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    started_at TEXT,
+    finished_at TEXT,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+"""
+
+# Fortschritt höchstens so oft schreiben (Sekunden)
+PROGRESS_INTERVAL = 0.5
+
+# Verteiler: so oft nach neuen Aufträgen schauen und Lebenszeichen schreiben
+POLL_INTERVAL = 2.0
+
+# Laufende Aufträge ohne Lebenszeichen seit so vielen Sekunden gelten als
+# abgebrochen (Worker-Prozess beendet, Container neu gestartet)
+STALE_AFTER = 60
+
+# Fertige Aufträge (und ihre Dateien) nach so vielen Tagen löschen
+KEEP_DAYS = 14
+
+# Sammel-Löschen: Fortschritt (und Abbruchprüfung) nach je so vielen Zeilen
+BULK_DELETE_CHUNK = 20
+
+# Werte von jobs.cancel_requested
+CANCEL = 1
+INTERRUPT = 2  # Prozess wird beendet: zurück in die Warteschlange statt abbrechen
+
+HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    """Der Auftrag wurde abgebrochen (aus ``JobContext.progress``)."""
+
+
+class JobInterrupted(JobCancelled):
+    """Der ausführende Prozess wird beendet; der Auftrag kommt zurück in die Warteschlange."""
+
+
+def handler(kind):
+    """Funktion als Ausführung für Aufträge der Art ``kind`` registrieren."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+# --- Auftragstabelle ------------------------------------------------------
+
+def connect(jobs_path):
+    """Verbindung zu ``jobs.db`` (Autocommit, legt die Tabelle bei Bedarf an)."""
+    os.makedirs(os.path.dirname(os.path.abspath(jobs_path)), exist_ok=True)
+    conn = sqlite3.connect(jobs_path, timeout=10, isolation_level=None,
+                           check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def enqueue(conn, kind, title, params=None):
+    """Auftrag anlegen, gibt seine ID zurück."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unbekannte Auftragsart '{kind}'")
+    cur = conn.execute(
+        "INSERT INTO jobs (kind, title, params) VALUES (?, ?, ?)",
+        (kind, title, json.dumps(params or {}, ensure_ascii=False))
+    )
+    return cur.lastrowid
+
+
+def enqueue_once(conn, kind, title, params=None):
+    """Wie ``enqueue``, aber nur, wenn kein gleichartiger Auftrag mehr wartet.
+
+    Für Aufträge, die nach jedem Schreiben fällig werden (Duplikat-Index):
+    einer in der Warteschlange erledigt alles. Gibt die ID zurück.
+    """
+    row = conn.execute(
+        "SELECT id FROM jobs WHERE status = 'queued' AND kind = ? ORDER BY id LIMIT 1",
+        (kind,)
+    ).fetchone()
+    if row is not None:
+        return row["id"]
+    return enqueue(conn, kind, title, params)
+
+
+def get_job(conn, job_id):
+    """Auftrag als Dict (``params`` und ``result`` entpackt) oder None."""
+    row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return None if row is None else _as_dict(row)
+
+
+def list_jobs(conn, limit=50):
+    """Die neuesten Aufträge, neueste zuerst."""
+    rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+    return [_as_dict(row) for row in rows]
+
+
+def _as_dict(row):
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["percent"] = (
+        min(100, int(job["done"] * 100 / job["total"])) if job["total"] else None
+    )
+    job.pop("heartbeat")
+    return job
+
+
+def cancel(conn, job_id):
+    """Wartenden Auftrag streichen bzw. laufenden zum Abbruch auffordern.
+
+    Laufende Aufträge brechen beim nächsten Fortschrittsschritt ab. Gibt
+    False zurück, wenn der Auftrag schon fertig ist (oder nicht existiert).
+    """
+    cur = conn.execute(
+        """
+        UPDATE jobs SET status = 'cancelled', finished_at = datetime('now')
+        WHERE id = ? AND status = 'queued'
+        """,
+        (job_id,)
+    )
+    if cur.rowcount:
+        return True
+    cur = conn.execute(
+        "UPDATE jobs SET cancel_requested = ? WHERE id = ? AND status = 'running'",
+        (CANCEL, job_id)
+    )
+    return cur.rowcount > 0
+
+
+def interrupt(conn, job_ids):
+    """Laufende Aufträge zum Unterbrechen auffordern (der Prozess wird beendet).
+
+    Sie stellen sich beim nächsten Fortschrittsschritt zurück in die
+    Warteschlange; bleibt das Lebenszeichen vorher aus, tut es
+    ``recover_stale``. Ein Abbruchwunsch geht vor. Gibt die Anzahl zurück.
+    """
+    return conn.execute(
+        """
+        UPDATE jobs SET cancel_requested = ?
+        WHERE id IN (SELECT value FROM json_each(?))
+          AND status = 'running' AND cancel_requested = 0
+        """,
+        (INTERRUPT, json.dumps(list(job_ids)))
+    ).rowcount
+
+
+# Spalten eines laufenden Auftrags, der wieder wartet (params mit Zwischenstand bleiben)
+REQUEUE_SET = """
+    status = 'queued', cancel_requested = 0, done = 0, total = NULL,
+    started_at = NULL, heartbeat = NULL,
+    message = 'Unterbrochen (Worker beendet), startet erneut'
+"""
+
+
+def requeue(conn, job_id):
+    """Laufenden Auftrag zurück in die Warteschlange stellen."""
+    conn.execute(f"UPDATE jobs SET {REQUEUE_SET} WHERE id = ? AND status = 'running'",
+                 (job_id,))
+
+
+def claim(conn):
+    """Ältesten wartenden Auftrag als laufend markieren, gibt seine ID zurück."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'running', started_at = datetime('now'), heartbeat = ?
+                WHERE id = ?
+                """,
+                (time.time(), row[0])
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return None if row is None else row[0]
+
+
+def finish(conn, job_id, status, result=None, error=None, message=None):
+    """Laufenden Auftrag abschließen (``done``, ``failed`` oder ``cancelled``).
+
+    Bei ``done`` steht der Fortschritt danach auf 100 %, die letzte
+    Fortschrittsmeldung entfällt (das Ergebnis steht in ``result``).
+    """
+    if status == "done" and message is None:
+        message = ""
+    conn.execute(
+        """
+        UPDATE jobs SET status = ?, result = ?, error = ?, message = COALESCE(?, message),
+                        done = CASE WHEN ? THEN COALESCE(total, done) ELSE done END,
+                        finished_at = datetime('now')
+        WHERE id = ? AND status = 'running'
+        """,
+        (status, None if result is None else json.dumps(result, ensure_ascii=False),
+         error, message, status == "done", job_id)
+    )
+
+
+def heartbeat(conn, job_ids):
+    """Lebenszeichen für laufende Aufträge dieses Prozesses."""
+    conn.execute(
+        "UPDATE jobs SET heartbeat = ? WHERE id IN (SELECT value FROM json_each(?))",
+        (time.time(), json.dumps(list(job_ids)))
+    )
+
+
+def recover_stale(conn, stale_after=STALE_AFTER):
+    """Laufende Aufträge ohne Lebenszeichen zurückstellen oder als fehlgeschlagen markieren.
+
+    Zurück in die Warteschlange kommen nur unterbrochene (``interrupt``), deren
+    Prozess vor dem nächsten Fortschrittsschritt beendet wurde; ein Auftrag,
+    der seinen Worker selbst zum Absturz bringt, liefe sonst endlos.
+    """
+    limit = time.time() - stale_after
+    requeued = conn.execute(
+        f"""
+        UPDATE jobs SET {REQUEUE_SET}
+        WHERE status = 'running' AND heartbeat < ? AND cancel_requested = ?
+        """,
+        (limit, INTERRUPT)
+    ).rowcount
+    failed = conn.execute(
+        """
+        UPDATE jobs SET status = 'failed', finished_at = datetime('now'),
+                        error = 'Worker beendet, bevor der Auftrag fertig war'
+        WHERE status = 'running' AND heartbeat < ?
+        """,
+        (limit,)
+    ).rowcount
+    return requeued + failed
+
+
+def cleanup(conn, keep_days=KEEP_DAYS):
+    """Alte fertige Aufträge samt Ergebnisdateien löschen."""
+    rows = conn.execute(
+        """
+        SELECT id, result FROM jobs
+        WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < datetime('now', ?)
+        """,
+        (f"-{keep_days} days",)
+    ).fetchall()
+    for row in rows:
+        result = json.loads(row["result"]) if row["result"] else {}
+        _remove(result.get("file"))
+    conn.execute(
+        "DELETE FROM jobs WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps([row["id"] for row in rows]),)
+    )
+    return len(rows)
+
+
+def _remove(path):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# --- Ausführung -----------------------------------------------------------
+
+class JobContext:
+    """Was eine Auftragsfunktion bekommt: Parameter, DB-Verbindung, Fortschritt."""
+
+    def __init__(self, job_id, params, conn, jobs_conn, db_path, files_dir):
+        self.job_id = job_id
+        self.params = params
+        self.conn = conn
+        self.db_path = db_path
+        self.files_dir = files_dir
+        self._jobs_conn = jobs_conn
+        self._last = 0.0
+
+    def progress(self, done, total=None, message=None, force=False):
+        """Fortschritt melden; wirft ``JobCancelled``, wenn abgebrochen werden soll.
+
+        ``JobInterrupted`` (Unterklasse), wenn der Prozess beendet wird: der
+        Auftrag startet danach neu, Zwischenstände siehe ``checkpoint``.
+
+        Geschrieben wird höchstens alle ``PROGRESS_INTERVAL`` Sekunden, die
+        Aufrufe dürfen also in engen Schleifen stehen.
+        """
+        now = time.monotonic()
+        if not force and now - self._last < PROGRESS_INTERVAL:
+            return
+        self._last = now
+        self._jobs_conn.execute(
+            """
+            UPDATE jobs SET done = ?, total = COALESCE(?, total),
+                            message = COALESCE(?, message), heartbeat = ?
+            WHERE id = ?
+            """,
+            (done, total, message, time.time(), self.job_id)
+        )
+        row = self._jobs_conn.execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (self.job_id,)
+        ).fetchone()
+        if row[0] == INTERRUPT:
+            raise JobInterrupted()
+        if row[0]:
+            raise JobCancelled()
+
+    def checkpoint(self, **values):
+        """Zwischenstand in ``params`` speichern; ein unterbrochener Auftrag setzt dort an.
+
+        Für Aufträge, die blockweise speichern (ein Neustart von vorn würde
+        doppelt schreiben). Vor ``progress`` aufrufen, das unterbrechen kann.
+        """
+        self.params.update(values)
+        self._jobs_conn.execute(
+            "UPDATE jobs SET params = ? WHERE id = ?",
+            (json.dumps(self.params, ensure_ascii=False), self.job_id)
+        )
+
+    def output_path(self, suffix):
+        """Pfad für eine Ergebnisdatei dieses Auftrags (z.B. Archiv zum Herunterladen)."""
+        os.makedirs(self.files_dir, exist_ok=True)
+        return os.path.join(self.files_dir, f"job-{self.job_id}{suffix}")
+
+
+def files_dir_for(jobs_path):
+    """Ordner für Uploads und Ergebnisdateien (``jobs/`` neben ``jobs.db``)."""
+    return os.path.join(os.path.dirname(os.path.abspath(jobs_path)), "jobs")
+
+
+def open_database(db_path):
+    """Verbindung zur Fragenbank mit denselben Pragmas wie der Pool der App."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    for name, value in DEFAULT_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def run_job(db_path, jobs_path, job_id):
+    """Einen als laufend markierten Auftrag ausführen und das Ergebnis eintragen.
+
+    Läuft im Worker-Thread oder -Prozess (daher nur Pfade als Argumente).
+    Hochgeladene Eingabedateien (``params["upload"]``) werden danach gelöscht,
+    außer der Auftrag wurde unterbrochen und wartet wieder.
+    """
+    jobs_conn = connect(jobs_path)
+    conn = open_database(db_path)
+    job = get_job(jobs_conn, job_id)
+    ctx = JobContext(job_id, job["params"], conn, jobs_conn, db_path,
+                     files_dir_for(jobs_path))
+    requeued = False
+    try:
+        result = HANDLERS[job["kind"]](ctx)
+    except JobInterrupted:
+        requeue(jobs_conn, job_id)
+        requeued = True
+    except JobCancelled:
+        finish(jobs_conn, job_id, "cancelled", message="Abgebrochen")
+    except Exception as e:
+        if not isinstance(e, (archive.ArchiveError, ValueError)):
+            traceback.print_exc()
+        finish(jobs_conn, job_id, "failed", error=str(e) or type(e).__name__)
+    else:
+        finish(jobs_conn, job_id, "done", result=result or {})
+    finally:
+        if not requeued:
+            _remove(job["params"].get("upload"))
+        conn.close()
+        jobs_conn.close()
+
+
+class JobRunner:
+    """Verteilt wartende Aufträge an einen begrenzten Thread- oder Prozesspool.
+
+    - ``workers``: so viele Aufträge laufen gleichzeitig (0 = keiner im
+      Hintergrund, nur ``run_pending()`` bzw. ``python jobs.py worker``)
+    - ``processes``: Prozesspool statt Threads (CPU-lastige Aufträge
+      blockieren dann keine Request-Threads)
+    - Pool und Verteiler-Thread starten erst mit ``start()``
+    """
+
+    def __init__(self, db_path, jobs_path, workers=1, processes=False,
+                 poll_interval=POLL_INTERVAL):
+        self.db_path = db_path
+        self.jobs_path = jobs_path
+        self.workers = workers
+        self.processes = processes
+        self.poll_interval = poll_interval
+
+        self._executor = None
+        self._thread = None
+        self._running = {}  # job_id -> Future
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock_file = None
+        self._last_cleanup = 0.0
+
+        self._started = 0
+        self._failed = 0
+
+    def start(self):
+        if self.workers > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="job-runner", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Nach ``enqueue`` aufrufen: der Verteiler schaut sofort nach."""
+        self._wake.set()
+
+    def _loop(self):
+        conn = connect(self.jobs_path)
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._dispatch(conn)
+                except Exception:
+                    traceback.print_exc()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        finally:
+            conn.close()
+
+    def _have_lock(self):
+        # Nur ein Prozess pro jobs.db verteilt; die Sperre endet mit dem Prozess
+        if fcntl is None or self._lock_file is not None:
+            return True
+        f = open(f"{self.jobs_path}.lock", "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        return True
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.processes:
+                # erst bei Bedarf laden (kostet sonst Zeit beim Start jedes Workers)
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _dispatch(self, conn):
+        if not self._have_lock():
+            return
+
+        for job_id, future in list(self._running.items()):
+            if future.done():
+                del self._running[job_id]
+                if future.exception() is not None:
+                    # z.B. Worker-Prozess abgestürzt
+                    self._failed += 1
+                    finish(conn, job_id, "failed", error=f"Worker-Fehler: {future.exception()}")
+
+        if self._running:
+            heartbeat(conn, self._running)
+        recover_stale(conn)
+
+        while len(self._running) < self.workers:
+            job_id = claim(conn)
+            if job_id is None:
+                break
+            future = self._get_executor().submit(run_job, self.db_path, self.jobs_path, job_id)
+            future.add_done_callback(lambda f: self._wake.set())
+            self._running[job_id] = future
+            self._started += 1
+
+        if time.monotonic() - self._last_cleanup > 3600:
+            self._last_cleanup = time.monotonic()
+            cleanup(conn)
+
+    def run_pending(self):
+        """Alle wartenden Aufträge nacheinander im aufrufenden Thread ausführen."""
+        conn = connect(self.jobs_path)
+        count = 0
+        try:
+            while True:
+                job_id = claim(conn)
+                if job_id is None:
+                    return count
+                run_job(self.db_path, self.jobs_path, job_id)
+                self._started += 1
+                count += 1
+        finally:
+            conn.close()
+
+    def shutdown(self, wait=True, requeue=False):
+        """Verteiler stoppen; laufende Aufträge werden (bei ``wait``) zu Ende geführt.
+
+        Mit ``requeue`` brechen sie beim nächsten Fortschrittsschritt ab und
+        warten wieder (``worker_exit`` in gunicorn.conf.py). Gibt die Anzahl
+        unterbrochener Aufträge zurück.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        interrupted = 0
+        if requeue and self._running:
+            conn = connect(self.jobs_path)
+            try:
+                interrupted = interrupt(conn, self._running)
+            finally:
+                conn.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        return interrupted
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "processes": self.processes,
+            "dispatching": self._lock_file is not None,
+            "running": len(self._running),
+            "started": self._started,
+            "worker_errors": self._failed,
+        }
+
+
+# --- Auftragsarten --------------------------------------------------------
+
+@handler("archive_import")
+def _archive_import(ctx):
+    """Hochgeladenes Archiv einlesen (eine Transaktion; Abbruch = nichts gespeichert)."""
+    path = ctx.params["upload"]
+    total = os.path.getsize(path)
+    with open(path, "rb") as f:
+        def records():
+            for number, record in enumerate(archive.read_archive(f)):
+                if number % 1000 == 0:
+                    ctx.progress(f.tell(), total, f"{number} Zeilen gelesen")
+                yield record
+
+        stats = archive.import_archive(ctx.conn, records())
+    # Importierte Fragen gleich in den Duplikat-Index (/duplicates liest nur)
+    ctx.progress(total, total, "Duplikat-Index wird aktualisiert", force=True)
+    duplicates.refresh(ctx.conn)
+    return stats
+
+
+@handler("archive_export")
+def _archive_export(ctx):
+    """Archiv als Datei zum späteren Herunterladen schreiben."""
+    total = sum(
+        ctx.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table, _, _ in archive.ARCHIVE_TABLES
+    )
+    path = ctx.output_path(".ndjson.gz")
+
+    def progress(rows):
+        ctx.progress(rows, total, f"{rows} Zeilen geschrieben")
+
+    counts = archive.export_archive(ctx.conn, path, progress=progress)
+    return {"file": path, "counts": counts}
+
+
+@handler("catalog_import")
+def _catalog_import(ctx):
+    """Fragenkatalog (ID;Frage;Thema;Punkte) blockweise importieren.
+
+    Bei Abbruch bleiben die schon gespeicherten Blöcke erhalten. Nach einer
+    Unterbrechung geht es nach dem letzten gespeicherten Block weiter.
+    """
+    path = ctx.params["upload"]
+    with open(path, "rb") as f:
+        total = sum(1 for _ in f)
+    resume_rows = ctx.params.get("resume_rows", 0)
+    resume_count = ctx.params.get("resume_count", 0)
+
+    def progress(count, rows):
+        # Zwischenstand vor progress(), das unterbrechen kann
+        ctx.checkpoint(resume_rows=rows, resume_count=resume_count + count)
+        ctx.progress(resume_count + count, total,
+                     f"{resume_count + count} Fragen importiert", force=True)
+
+    count = import_access_catalog.import_questions_bulk(
+        path, ctx.db_path, quiet=True, progress=progress,
+        on_duplicate=ctx.params.get("duplicates") or None, skip_rows=resume_rows,
+    )
+    return {"questions": resume_count + count}
+
+
+@handler("dedupe_index")
+def _dedupe_index(ctx):
+    """Warteschlange der Duplikaterkennung abarbeiten (``rebuild``: alle Fragen)."""
+    if ctx.params.get("rebuild"):
+        with ctx.conn:
+            ctx.conn.execute(
+                "INSERT OR IGNORE INTO dedupe_queue (question_id) SELECT id FROM questions"
+            )
+    total = duplicates.pending(ctx.conn)
+
+    def progress(done):
+        ctx.progress(done, total, f"{done} Fragen indiziert", force=True)
+
+    return {"indexed": duplicates.refresh(ctx.conn, progress=progress)}
+
+
+@handler("bulk_delete")
+def _bulk_delete(ctx):
+    """Zeilen in einer Transaktion löschen (abhängige per CASCADE), blockweise.
+
+    Wie das Sammel-Löschen im Request: alles oder nichts. Bei Abbruch oder
+    Fehler wird die Transaktion verworfen und keine Zeile ist gelöscht.
+    """
+    table = ctx.params["table"]
+    if table not in ("questions", "topics", "tests"):
+        raise ValueError(f"Unbekannte Tabelle '{table}'")
+    ids = ctx.params["ids"]
+    deleted = 0
+    ctx.conn.execute("BEGIN IMMEDIATE")
+    try:
+        for start in range(0, len(ids), BULK_DELETE_CHUNK):
+            ctx.progress(start, len(ids),
+                         f"{start} von {len(ids)} gelöscht (gespeichert wird am Ende)", force=True)
+            chunk = ids[start:start + BULK_DELETE_CHUNK]
+            deleted += ctx.conn.executemany(
+                f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id in chunk]
+            ).rowcount
+        ctx.conn.commit()
+    except BaseException:
+        ctx.conn.rollback()
+        raise
+    return {"deleted": deleted}
+
+
+@handler("history_move")
+def _history_move(ctx):
+    """Tests vor dem Stichtag nach history.db verschieben (Schuljahreswechsel).
+
+    Blockweise; bei Abbruch bleiben die schon verschobenen Tests in history.db.
+    """
+    history.attach(ctx.conn, ctx.params["history_db"])
+
+    def progress(moved, total):
+        ctx.progress(moved, total, f"{moved} von {total} Tests verschoben", force=True)
+
+    return {"moved": history.move_tests(ctx.conn, ctx.params["before"], progress=progress)}
+
+
+@handler("snapshot_publish")
+def _snapshot_publish(ctx):
+    """Neue schreibgeschützte Momentaufnahme für die lesenden Seiten veröffentlichen."""
+    path = snapshots.publish(ctx.db_path, ctx.params["snapshot_dir"])
+    return {"file": os.path.basename(path), "bytes": os.path.getsize(path)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hintergrundaufträge ausführen und verwalten.")
+    parser.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    parser.add_argument("--jobs-db", help="Auftragsdatei (Standard: jobs.db neben der DB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="Aufträge dauerhaft abarbeiten")
+    worker.add_argument("--workers", type=int, default=1)
+    worker.add_argument("--processes", action="store_true", help="Prozesse statt Threads")
+    sub.add_parser("run", help="wartende Aufträge einmal abarbeiten und beenden")
+    sub.add_parser("list", help="neueste Aufträge ausgeben")
+    stop = sub.add_parser("cancel", help="Auftrag abbrechen")
+    stop.add_argument("job_id", type=int)
+    args = parser.parse_args(argv)
+
+    jobs_path = args.jobs_db or os.path.join(
+        os.path.dirname(os.path.abspath(args.db)), "jobs.db")
+
+    if args.command == "worker":
+        runner = JobRunner(args.db, jobs_path, workers=args.workers, processes=args.processes)
+        runner.start()
+        print(f"Worker läuft ({args.workers} gleichzeitig), Strg+C beendet.")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("Beende, laufende Aufträge werden fertig …")
+            runner.shutdown()
+        return
+
+    if args.command == "run":
+        count = JobRunner(args.db, jobs_path, workers=0).run_pending()
+        print(f"{count} Aufträge ausgeführt.")
+        return
+
+    conn = connect(jobs_path)
+    try:
+        if args.command == "cancel":
+            if not cancel(conn, args.job_id):
+                raise SystemExit(f"Auftrag {args.job_id} läuft nicht (mehr).")
+            print(f"Auftrag {args.job_id} wird abgebrochen.")
+        else:
+            for job in list_jobs(conn):
+                percent = "" if job["percent"] is None else f"{job['percent']:>3} %"
+                print(f"{job['id']:>5}  {job['status']:<9} {percent:>5}  {job['title']}"
+                      f"  {job['error'] or job['message']}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""PDF-Export von Tests (serverseitig, offline mit fpdf2).
+
+Ablauf:
+1. ``load_test_data`` liest Test und Fragen in ein einfaches Dict
+   (serialisierbar, kann an einen Worker-Prozess übergeben werden).
+2. ``content_hash`` bildet daraus den Cache-Schlüssel. Gleicher Inhalt
+   ergibt dieselbe Datei – ein unveränderter Test wird nie zweimal gerendert.
+3. ``PdfExporter`` rendert fehlende PDFs in einem begrenzten Prozesspool und
+   legt sie im Cache-Ordner ab (``<hash>.pdf``).
+
+Ganze Listen von Tests lassen sich vorab rendern:
+
+    python pdf_export.py --db data/questions.db --from 2025-09-01 --solutions
+"""
+import argparse
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import database
+import results
+
+# Bei Layout-Änderungen erhöhen, damit alte PDFs nicht mehr passen
+RENDERER_VERSION = 1
+
+# TrueType-Schrift für Umlaute, Gedankenstriche usw. (Docker: fonts-dejavu-core)
+FONT_CANDIDATES = [
+    os.environ.get("PDF_FONT", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+]
+
+def load_test_data(conn, test_id, solutions=False):
+    """Test mit Fragen als Dict (oder None, wenn es den Test nicht gibt)."""
+    test = conn.execute(
+        "SELECT id, name, date, notes FROM tests WHERE id = ?",
+        (test_id,)
+    ).fetchone()
+    if test is None:
+        return None
+
+    questions = conn.execute(
+        """
+        SELECT
+            q.text,
+            q.points,
+            q.solution,
+            t.name AS topic_name
+        FROM test_questions tq
+        JOIN questions q ON q.id = tq.question_id
+        JOIN topics t ON t.id = q.topic_id
+        WHERE tq.test_id = ?
+        ORDER BY tq.position
+        """,
+        (test_id,)
+    ).fetchall()
+
+    # Notenschlüssel gehört zum Inhalt: eine Änderung ergibt ein neues PDF
+    _, steps = results.scale_for_test(conn, test_id)
+
+    return {
+        "name": test["name"],
+        "date": test["date"] or "",
+        "notes": test["notes"] or "",
+        "solutions": bool(solutions),
+        "grading": results.format_scale(steps),
+        "questions": [
+            {
+                "text": q["text"],
+                "points": q["points"] if q["points"] is not None else 1,
+                "topic": q["topic_name"],
+                "solution": (q["solution"] or "") if solutions else "",
+            }
+            for q in questions
+        ],
+    }
+
+
+def content_hash(data):
+    """Cache-Schlüssel: Hash über Inhalt und Renderer-Version."""
+    payload = json.dumps([RENDERER_VERSION, data], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _format_points(points):
+    return f"{points:g}"
+
+
+def _setup_font(pdf):
+    """DejaVu (Unicode) falls vorhanden, sonst Helvetica mit Latin-1-Text."""
+    for path in FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            bold = path.replace(".ttf", "-Bold.ttf")
+            pdf.add_font("Text", "", path)
+            pdf.add_font("Text", "B", bold if os.path.exists(bold) else path)
+            return "Text", str
+    # Kernschriften kennen nur Latin-1
+    replacements = {"–": "-", "—": "-", "≥": ">=", "≤": "<=", "…": "...",
+                    "„": '"', "“": '"', "”": '"', "‚": "'", "‘": "'", "’": "'"}
+
+    def latin1(text):
+        for char, plain in replacements.items():
+            text = text.replace(char, plain)
+        return text.encode("latin-1", "replace").decode("latin-1")
+
+    return "Helvetica", latin1
+
+
+def render_pdf(data):
+    """PDF als Bytes rendern. Läuft im Worker-Prozess (kein Datenbankzugriff)."""
+    from fpdf import FPDF  # erst im Worker laden
+
+    pdf = FPDF(format="A4")
+    pdf.set_margins(20, 20, 20)
+    pdf.set_auto_page_break(True, margin=20)
+    font, clean = _setup_font(pdf)
+    pdf.add_page()
+    width = pdf.epw
+
+    pdf.set_font(font, "B", 16)
+    pdf.multi_cell(width, 9, clean(data["name"]), new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(2)
+
+    pdf.set_font(font, "", 11)
+    meta = [("Datum:", data["date"] or "____.__.____"),
+            ("Name:", "_" * 42),
+            ("Klasse:", "_" * 18)]
+    if data["notes"]:
+        meta.append(("Hinweise:", data["notes"]))
+    for label, value in meta:
+        pdf.set_font(font, "B", 11)
+        pdf.cell(25, 7, clean(label))
+        pdf.set_font(font, "", 11)
+        pdf.multi_cell(width - 25, 7, clean(value), new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(3)
+    pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + width, pdf.get_y())
+    pdf.ln(5)
+
+    if not data["questions"]:
+        pdf.multi_cell(width, 7, clean("Diesem Test sind noch keine Fragen zugeordnet."),
+                       new_x="LMARGIN", new_y="NEXT")
+
+    total = 0
+    for number, question in enumerate(data["questions"], start=1):
+        total += question["points"]
+        # Eine Frage nie über einen Seitenumbruch verteilen
+        with pdf.unbreakable() as page:
+            page.set_font(font, "B", 11)
+            page.cell(width - 20, 7, f"{number}.)")
+            page.cell(20, 7, f"[{_format_points(question['points'])} P]", align="R",
+                      new_x="LMARGIN", new_y="NEXT")
+            page.set_font(font, "", 11)
+            page.multi_cell(width, 6, clean(question["text"]), new_x="LMARGIN", new_y="NEXT")
+            page.set_font(font, "", 8)
+            page.set_text_color(85)
+            page.cell(width, 5, clean(f"Thema: {question['topic']}"),
+                      new_x="LMARGIN", new_y="NEXT")
+            page.set_text_color(0)
+            page.ln(8)
+
+    pdf.ln(4)
+    pdf.line(pdf.l_margin, pdf.get_y(), pdf.l_margin + width, pdf.get_y())
+    pdf.ln(4)
+    with pdf.unbreakable() as page:
+        page.set_font(font, "", 8)
+        page.set_text_color(68)
+        page.multi_cell(width, 5, clean(f"Notenschlüssel: {data['grading']}"), new_x="LMARGIN", new_y="NEXT")
+        page.set_text_color(0)
+        page.ln(3)
+        page.set_font(font, "", 11)
+        page.cell(width * 0.4, 10, clean(f"Punkteanzahl:        / {_format_points(total)}"),
+                  border=1)
+        page.cell(width * 0.6, 10, clean("Beurteilung:"), border=1,
+                  new_x="LMARGIN", new_y="NEXT")
+
+    if data["solutions"]:
+        pdf.add_page()
+        pdf.set_font(font, "B", 16)
+        pdf.multi_cell(width, 9, clean(f"Lösungen – {data['name']}"),
+                       new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(4)
+        for number, question in enumerate(data["questions"], start=1):
+            with pdf.unbreakable() as page:
+                page.set_font(font, "B", 11)
+                page.cell(width - 20, 7, f"{number}.)")
+                page.cell(20, 7, f"[{_format_points(question['points'])} P]", align="R",
+                          new_x="LMARGIN", new_y="NEXT")
+                page.set_font(font, "", 11)
+                page.multi_cell(width, 6, clean(question["solution"] or "—"),
+                                new_x="LMARGIN", new_y="NEXT")
+                page.ln(5)
+
+    return bytes(pdf.output())
+
+
+class PdfUnavailable(Exception):
+    """PDF gerade nicht lieferbar (Rendern dauert zu lange oder ein Worker ist abgestürzt)."""
+
+
+class PdfExporter:
+    """Rendert PDFs in einem begrenzten Prozesspool und cacht sie auf der Platte.
+
+    - ``max_workers``: Anzahl Worker-Prozesse (Rendern blockiert so keine
+      Request-Threads mit CPU-Last und läuft echt parallel)
+    - Gleiche Inhalte, die gleichzeitig angefragt werden, rendert nur ein Worker
+    - ``max_files``: darüber hinaus werden die am längsten nicht benutzten
+      PDFs im Cache gelöscht (ein Treffer setzt die Änderungszeit neu)
+    """
+
+    def __init__(self, cache_dir, max_workers=2, max_files=2000, timeout=60.0):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.max_files = max_files
+        self.timeout = timeout
+
+        self._executor = None
+        self._pending = {}  # hash -> Future
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._renders = 0
+        self._render_time_total = 0.0
+
+    def _get_executor(self):
+        # Erst beim ersten Rendern starten (kein Prozessstart beim App-Import)
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _reset_executor(self, executor):
+        """Abgestürzten Pool verwerfen; das nächste Rendern startet einen neuen."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def path_for(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.pdf")
+
+    def submit(self, data):
+        """Rendern anstoßen (falls nötig). Gibt (hash, Future oder None) zurück."""
+        digest = content_hash(data)
+        with self._lock:
+            try:
+                # Treffer: Änderungszeit neu setzen, _prune löscht nach letzter Nutzung
+                os.utime(self.path_for(digest))
+            except FileNotFoundError:
+                pass
+            else:
+                self._hits += 1
+                return digest, None
+            future = self._pending.get(digest)
+            started = future is None
+            if started:
+                executor = self._get_executor()
+                future = executor.submit(render_pdf, data)
+                future.started = time.perf_counter()
+                future.executor = executor
+                future.write_lock = threading.Lock()
+                self._pending[digest] = future
+        if started:
+            # Außerhalb der Sperre: ist das Future schon fertig, läuft der Callback sofort
+            future.add_done_callback(functools.partial(self._finished, digest))
+        return digest, future
+
+    def _finished(self, digest, future):
+        """Rendern beendet: Ergebnis in den Cache schreiben, Future aus ``_pending`` nehmen.
+
+        Läuft auch, wenn niemand mehr wartet (Timeout beim Abholen). Bis dahin
+        warten weitere Anfragen auf dasselbe Future, statt neu zu rendern.
+        """
+        try:
+            if not future.cancelled() and future.exception() is None:
+                self._write(digest, future)
+        finally:
+            with self._lock:
+                if self._pending.get(digest) is future:
+                    del self._pending[digest]
+
+    def _write(self, digest, future):
+        """Ergebnis eines Workers atomar in den Cache schreiben (einmal pro Future)."""
+        path = self.path_for(digest)
+        written = False
+        with future.write_lock:
+            if not os.path.exists(path):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(future.result())
+                os.replace(tmp, path)  # Leser sehen nie eine halbe Datei
+                written = True
+        if written:
+            with self._lock:
+                self._renders += 1
+                self._render_time_total += time.perf_counter() - future.started
+            self._prune()
+        return path
+
+    def _store(self, digest, future):
+        """Auf den Worker warten und den Pfad im Cache zurückgeben."""
+        try:
+            future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            # Das Rendern läuft weiter und bleibt in _pending (siehe _finished)
+            raise PdfUnavailable(f"PDF nach {self.timeout} s noch nicht fertig") from None
+        except concurrent.futures.BrokenExecutor:  # BrokenProcessPool
+            self._reset_executor(future.executor)
+            raise PdfUnavailable("PDF-Worker abgestürzt") from None
+        return self._write(digest, future)
+
+    def get_pdf(self, data):
+        """Pfad zum fertigen PDF (aus dem Cache oder frisch gerendert) und Hash."""
+        digest, future = self.submit(data)
+        if future is None:
+            return self.path_for(digest), digest
+        return self._store(digest, future), digest
+
+    def open_pdf(self, data):
+        """Wie ``get_pdf``, aber die Datei schon geöffnet (binär).
+
+        ``_prune`` eines anderen Threads darf sie danach löschen, die offene
+        Datei bleibt lesbar. Verschwindet sie vor dem Öffnen, wird neu gerendert.
+        """
+        for _ in range(2):
+            path, digest = self.get_pdf(data)
+            try:
+                return open(path, "rb"), digest
+            except FileNotFoundError:
+                pass
+        raise PdfUnavailable("PDF wurde aus dem Cache gelöscht, bevor es gesendet wurde")
+
+    def render_many(self, datas):
+        """Viele Tests auf einmal: alle einreichen, dann einsammeln. Gibt Pfade zurück."""
+        submitted = [self.submit(data) for data in datas]
+        paths = []
+        for digest, future in submitted:
+            paths.append(self.path_for(digest) if future is None else self._store(digest, future))
+        return paths
+
+    def _prune(self):
+        if not self.max_files:
+            return
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".pdf")]
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cache_dir": self.cache_dir,
+                "max_workers": self.max_workers,
+                "pending": len(self._pending),
+                "hits": self._hits,
+                "renders": self._renders,
+                "render_time_avg": round(self._render_time_total / self._renders, 4)
+                if self._renders else 0.0,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDFs für Tests vorab rendern.")
+    parser.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    parser.add_argument("--cache-dir", help="Cache-Ordner (Standard: pdf-cache neben der DB)")
+    parser.add_argument("--from", dest="date_from", default="",
+                        help="Nur Tests ab diesem Datum (JJJJ-MM-TT)")
+    parser.add_argument("--solutions", action="store_true", help="Lösungsblatt anhängen")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Anzahl Worker-Prozesse")
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir or os.path.join(os.path.dirname(os.path.abspath(args.db)),
+                                               "pdf-cache")
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    test_ids = [
+        row["id"] for row in conn.execute(
+            "SELECT id FROM tests WHERE COALESCE(date, '') >= ? ORDER BY date, id",
+            (args.date_from,)
+        )
+    ]
+    datas = [load_test_data(conn, test_id, args.solutions) for test_id in test_ids]
+    conn.close()
+
+    exporter = PdfExporter(cache_dir, max_workers=args.workers, max_files=0)
+    start = time.perf_counter()
+    try:
+        exporter.render_many(datas)
+    finally:
+        exporter.shutdown()
+    stats = exporter.stats()
+    print(f"{len(datas)} Tests: {stats['renders']} gerendert, {stats['hits']} aus dem Cache, "
+          f"{time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    """LRU-Cache für fertig gerenderte HTML-Seiten.
+
+    Jeder Eintrag gehört zu einem Schlüssel (z.B. Test-ID) und einem
+    Versionsstempel. Passt der Stempel nicht mehr, gilt der Eintrag als
+    veraltet und wird ersetzt. Begrenzt nach Anzahl Einträgen und Bytes.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()  # key -> (version, body, etag)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_etag(body):
+        return hashlib.sha1(body).hexdigest()
+
+    def get(self, key, version):
+        """(body, etag) für Schlüssel und Version, sonst None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry[0] != version:
+                # Veraltet: Test oder zugehörige Fragen wurden geändert
+                self._stale += 1
+                self._misses += 1
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, version, body):
+        """Gerendertes HTML (bytes) speichern, gibt das ETag zurück."""
+        etag = self.make_etag(body)
+        if len(body) > self.max_bytes:
+            return etag  # zu groß für den Cache
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, body, etag)
+            self._bytes += len(body)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+        return etag
+
+    def _remove(self, key):
+        _version, body, _etag = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,453 @@
+"""Ergebnisse: Punkte pro Schüler und Frage, Noten nach Notenschlüssel, Statistik.
+
+Erfasst wird eine ganze Klasse auf einmal: Tabelle aus der
+Tabellenkalkulation einfügen oder als CSV hochladen (eine Zeile pro
+Schüler, Name und dann die Punkte in der Reihenfolge der Fragen).
+
+Gerechnet wird in SQLite, mengenweise über alle Punkte eines Tests bzw.
+eines Schuljahres: Summen pro Schüler und Frage per GROUP BY, die Note
+über einen Join mit den Stufen des Notenschlüssels (``LEAD`` liefert die
+Obergrenze jeder Stufe). Keine Schleife und keine Abfrage pro Schüler.
+
+Notenschlüssel stehen in ``grading_scales``/``grading_steps``; ein Test
+ohne eigenen Schlüssel verwendet den Standardschlüssel.
+"""
+import csv
+import datetime
+import json
+
+# Punktesumme und Note pro Schüler, für einen Test (:test_id) oder alle Tests
+# eines Zeitraums (:date_from bis :date_to). results wird in der Reihenfolge
+# des Primärschlüssels gelesen (test_id IN …), das GROUP BY braucht dann
+# keine Sortierung. Punkte zu Fragen, die nicht mehr im Test stehen, gibt es
+# nicht (Trigger auf test_questions).
+GRADED_CTE = """
+    scoped_tests AS (
+        SELECT id, COALESCE(grading_scale_id,
+                            (SELECT id FROM grading_scales WHERE is_default = 1)) AS scale_id
+        FROM tests
+        WHERE {where}
+    ),
+    maxima AS (
+        SELECT tq.test_id, TOTAL(COALESCE(tq.points_override, q.points, 1)) AS max_points
+        FROM scoped_tests t
+        CROSS JOIN test_questions tq ON tq.test_id = t.id  -- erst die Tests
+        JOIN questions q ON q.id = tq.question_id
+        GROUP BY tq.test_id
+    ),
+    totals AS (
+        SELECT test_id, student_id, TOTAL(score) AS points, COUNT(*) AS answered
+        FROM results
+        WHERE test_id IN (SELECT id FROM scoped_tests)
+        GROUP BY test_id, student_id
+    ),
+    bands AS (
+        SELECT scale_id, grade, label, min_percent,
+               LEAD(min_percent) OVER (PARTITION BY scale_id ORDER BY min_percent) AS next_percent
+        FROM grading_steps
+    ),
+    graded AS (
+        SELECT totals.test_id, totals.student_id, totals.points, totals.answered,
+               maxima.max_points,
+               -- Test ohne Punkte (alle Fragen 0 P): kein Prozentwert, keine Note
+               ROUND(100.0 * totals.points / NULLIF(maxima.max_points, 0), 6) AS percent,
+               t.scale_id
+        FROM totals
+        JOIN maxima ON maxima.test_id = totals.test_id
+        JOIN scoped_tests t ON t.id = totals.test_id
+    ),
+    grades AS (
+        SELECT graded.*, b.grade, b.label
+        FROM graded
+        LEFT JOIN bands b
+            ON b.scale_id = graded.scale_id
+           AND graded.percent >= b.min_percent
+           AND (b.next_percent IS NULL OR graded.percent < b.next_percent)
+    )
+"""
+
+
+class ScoreError(ValueError):
+    """Eingefügte Punkte oder Notenschlüssel sind fehlerhaft (Meldung für die Seite)."""
+
+
+def school_year(today=None):
+    """(erster, letzter Tag) des Schuljahres, in dem ``today`` liegt (September bis August)."""
+    today = today or datetime.date.today()
+    start = today.year if today.month >= 9 else today.year - 1
+    return datetime.date(start, 9, 1).isoformat(), datetime.date(start + 1, 8, 31).isoformat()
+
+
+# --- Notenschlüssel --------------------------------------------------------
+
+def load_scales(conn):
+    """Alle Notenschlüssel mit ihren Stufen (beste Note zuerst), Standard zuerst."""
+    scales = [dict(row) for row in conn.execute(
+        "SELECT id, name, is_default FROM grading_scales ORDER BY is_default DESC, name"
+    )]
+    steps = conn.execute(
+        "SELECT scale_id, grade, label, min_percent FROM grading_steps ORDER BY scale_id, grade"
+    ).fetchall()
+    for scale in scales:
+        scale["steps"] = [step for step in steps if step["scale_id"] == scale["id"]]
+    return scales
+
+
+def scale_for_test(conn, test_id):
+    """(id, Stufen) des Notenschlüssels eines Tests (eigener oder Standard)."""
+    scale_id = conn.execute(
+        """
+        SELECT COALESCE(
+            (SELECT grading_scale_id FROM tests WHERE id = ?),
+            (SELECT id FROM grading_scales WHERE is_default = 1)
+        )
+        """,
+        (test_id,)
+    ).fetchone()[0]
+    steps = conn.execute(
+        "SELECT grade, label, min_percent FROM grading_steps WHERE scale_id = ? ORDER BY grade",
+        (scale_id,)
+    ).fetchall()
+    return scale_id, steps
+
+
+def format_scale(steps):
+    """Notenschlüssel als Text, z.B. "[Sehr gut (1) ≥ 91 %] – [Gut (2) ≥ 81 %] – …"."""
+    return " – ".join(
+        f"[{step['label']} ({step['grade']}) ≥ {step['min_percent']:g} %]" for step in steps
+    )
+
+
+def parse_scale(text):
+    """Stufen aus Zeilen "Note;Bezeichnung;ab Prozent" lesen, z.B. "1;Sehr gut;91".
+
+    Die schlechteste Stufe muss bei 0 % beginnen, damit jedes Ergebnis eine
+    Note bekommt. Wirft ``ScoreError`` mit Zeilennummer.
+    """
+    steps = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        cells = [cell.strip() for cell in line.replace("\t", ";").split(";")]
+        if len(cells) != 3:
+            raise ScoreError(f"Zeile {number}: erwartet Note;Bezeichnung;ab Prozent")
+        try:
+            grade = int(cells[0])
+            min_percent = float(cells[2].replace(",", ".").rstrip("%").strip())
+        except ValueError:
+            raise ScoreError(f"Zeile {number}: Note und Prozent müssen Zahlen sein") from None
+        if not 0 <= min_percent <= 100:
+            raise ScoreError(f"Zeile {number}: Prozent zwischen 0 und 100")
+        steps.append((grade, cells[1] or str(grade), min_percent))
+
+    if not steps:
+        raise ScoreError("Der Notenschlüssel hat keine Stufen.")
+    if len({grade for grade, _, _ in steps}) < len(steps):
+        raise ScoreError("Jede Note darf nur einmal vorkommen.")
+    if len({percent for _, _, percent in steps}) < len(steps):
+        raise ScoreError("Jede Prozentgrenze darf nur einmal vorkommen.")
+    if min(percent for _, _, percent in steps) != 0:
+        raise ScoreError("Die schlechteste Note muss bei 0 % beginnen.")
+    return sorted(steps)
+
+
+def save_scale(conn, name, steps, is_default=False):
+    """Notenschlüssel anlegen oder (gleicher Name) seine Stufen ersetzen. Gibt die ID zurück."""
+    with conn:
+        conn.execute(
+            "INSERT INTO grading_scales (name) VALUES (?) ON CONFLICT (name) DO NOTHING",
+            (name,)
+        )
+        scale_id = conn.execute(
+            "SELECT id FROM grading_scales WHERE name = ?", (name,)
+        ).fetchone()[0]
+        conn.execute("DELETE FROM grading_steps WHERE scale_id = ?", (scale_id,))
+        conn.executemany(
+            "INSERT INTO grading_steps (scale_id, grade, label, min_percent) VALUES (?, ?, ?, ?)",
+            [(scale_id, grade, label, percent) for grade, label, percent in steps]
+        )
+        if is_default:
+            conn.execute(
+                "UPDATE grading_scales SET is_default = (id = ?) WHERE is_default = 1 OR id = ?",
+                (scale_id, scale_id)
+            )
+    return scale_id
+
+
+# --- Punkte erfassen -------------------------------------------------------
+
+def parse_scores(text, maxima):
+    """Eingefügte Tabelle in {name: [punkte oder None, ...]} umwandeln.
+
+    ``maxima``: Höchstpunkte der Fragen in Testreihenfolge. Trennzeichen
+    Tabulator (aus Excel/LibreOffice kopiert), Semikolon oder Komma;
+    Dezimalkomma ist bei Tabulator und Semikolon erlaubt. Leere Zellen =
+    nicht bewertet. Eine Kopfzeile wird übersprungen, ein doppelter Name
+    überschreibt die frühere Zeile. Wirft ``ScoreError`` mit Zeilennummer.
+    """
+    rows = {}
+    first = True
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        delimiter = "\t" if "\t" in line else ";" if ";" in line else ","
+        cells = [cell.strip() for cell in next(csv.reader([line], delimiter=delimiter))]
+        name, values = cells[0], cells[1:]
+        while values and not values[-1]:
+            values.pop()
+
+        try:
+            scores = [float(v.replace(",", ".")) if v else None for v in values]
+        except ValueError:
+            if first:
+                first = False
+                continue  # Kopfzeile (Name, Frage 1, …)
+            raise ScoreError(f"Zeile {number}: Punkte müssen Zahlen sein") from None
+        first = False
+
+        if not name:
+            raise ScoreError(f"Zeile {number}: Name fehlt")
+        if len(scores) > len(maxima):
+            raise ScoreError(f"Zeile {number}: {len(scores)} Werte, "
+                             f"der Test hat nur {len(maxima)} Fragen")
+        for position, (score, maximum) in enumerate(zip(scores, maxima), start=1):
+            if score is not None and not 0 <= score <= maximum:
+                raise ScoreError(f"Zeile {number}, Frage {position}: {score:g} Punkte, "
+                                 f"erlaubt 0 bis {maximum:g}")
+        rows[name] = scores + [None] * (len(maxima) - len(scores))
+    return rows
+
+
+def save_scores(conn, test_id, class_name, rows, question_ids):
+    """Punkte einer Klasse speichern (eine Transaktion).
+
+    Schüler werden bei Bedarf angelegt; jede Zeile ersetzt alle bisherigen
+    Punkte dieses Schülers im Test. Gibt die Anzahl gespeicherter Punkte zurück.
+    """
+    names = list(rows)
+    with conn:
+        conn.executemany(
+            "INSERT INTO students (class_name, name) VALUES (?, ?) "
+            "ON CONFLICT (class_name, name) DO NOTHING",
+            [(class_name, name) for name in names]
+        )
+        student_ids = dict(conn.execute(
+            """
+            SELECT name, id FROM students
+            WHERE class_name = ? AND name IN (SELECT value FROM json_each(?))
+            """,
+            (class_name, json.dumps(names))
+        ).fetchall())
+        conn.execute(
+            """
+            DELETE FROM results
+            WHERE test_id = ? AND student_id IN (SELECT value FROM json_each(?))
+            """,
+            (test_id, json.dumps(list(student_ids.values())))
+        )
+        return conn.executemany(
+            "INSERT INTO results (test_id, student_id, question_id, score) VALUES (?, ?, ?, ?)",
+            [
+                (test_id, student_ids[name], question_id, score)
+                for name, scores in rows.items()
+                for question_id, score in zip(question_ids, scores)
+                if score is not None
+            ]
+        ).rowcount
+
+
+def delete_scores(conn, test_id, student_ids):
+    """Alle Punkte der Schüler ``student_ids`` in diesem Test löschen."""
+    with conn:
+        return conn.execute(
+            """
+            DELETE FROM results
+            WHERE test_id = ? AND student_id IN (SELECT value FROM json_each(?))
+            """,
+            (test_id, json.dumps(student_ids))
+        ).rowcount
+
+
+# --- Auswertung ------------------------------------------------------------
+
+def test_report(conn, test_id):
+    """Auswertung eines Tests: Fragen mit Lösungsquote, Schüler mit Note, Notenverteilung.
+
+    ``questions``: Position, Höchstpunkte, Durchschnitt und Lösungsquote
+    (erreichte / mögliche Punkte) pro Frage; ``students``: Punkte pro Frage
+    (Liste in Testreihenfolge), Summe, Prozent und Note.
+    """
+    questions = conn.execute(
+        """
+        WITH per_question AS (
+            SELECT question_id, COUNT(*) AS answered, TOTAL(score) AS points,
+                   MIN(score) AS min_score, MAX(score) AS max_score
+            FROM results
+            WHERE test_id = :test_id
+            GROUP BY question_id
+        )
+        SELECT tq.question_id, tq.position, q.text, q.difficulty,
+               COALESCE(tq.points_override, q.points, 1) AS max_points,
+               IFNULL(p.answered, 0) AS answered,
+               p.points / p.answered AS average,
+               p.points / (p.answered * COALESCE(tq.points_override, q.points, 1)) AS solved,
+               p.min_score, p.max_score
+        FROM test_questions tq
+        JOIN questions q ON q.id = tq.question_id
+        LEFT JOIN per_question p ON p.question_id = tq.question_id
+        WHERE tq.test_id = :test_id
+        ORDER BY tq.position
+        """,
+        {"test_id": test_id}
+    ).fetchall()
+
+    students = [dict(row) for row in conn.execute(
+        "WITH " + GRADED_CTE.format(where="id = :test_id") + """
+        SELECT s.id, s.name, s.class_name, g.points, g.answered, g.max_points,
+               g.percent, g.grade, g.label
+        FROM grades g
+        JOIN students s ON s.id = g.student_id
+        ORDER BY s.class_name, s.name
+        """,
+        {"test_id": test_id}
+    )]
+
+    # Punktematrix zum Anzeigen: eine Abfrage für alle Schüler
+    positions = {row["question_id"]: i for i, row in enumerate(questions)}
+    by_student = {student["id"]: student for student in students}
+    for student in students:
+        student["scores"] = [None] * len(questions)
+    for student_id, question_id, score in conn.execute(
+        "SELECT student_id, question_id, score FROM results WHERE test_id = ?", (test_id,)
+    ):
+        if student_id in by_student and question_id in positions:
+            by_student[student_id]["scores"][positions[question_id]] = score
+
+    distribution = conn.execute(
+        "WITH " + GRADED_CTE.format(where="id = :test_id") + """
+        SELECT grade, label, COUNT(*) AS count
+        FROM grades
+        GROUP BY grade
+        ORDER BY grade
+        """,
+        {"test_id": test_id}
+    ).fetchall()
+
+    percents = [s["percent"] for s in students if s["percent"] is not None]
+    return {
+        "questions": questions,
+        "students": students,
+        "distribution": distribution,
+        "average": (sum(percents) / len(percents)) if percents else None,
+        "max_points": sum(q["max_points"] for q in questions),
+    }
+
+
+def year_report(conn, date_from, date_to, limit=10):
+    """Statistik über alle Tests mit Datum von ``date_from`` bis ``date_to``.
+
+    - ``tests``: Schüler, Durchschnitt in Prozent und Notenverteilung pro Test
+    - ``grades``: Notenverteilung gesamt
+    - ``difficulties``: Lösungsquote nach angegebener Schwierigkeit
+    - ``topics``/``questions``: die ``limit`` Themen bzw. Fragen mit der
+      niedrigsten Lösungsquote (Fragen erst ab 5 Bewertungen)
+
+    Alle Punkte des Zeitraums werden zweimal gruppiert gelesen (pro Schüler
+    und pro Frage eines Tests); zusammengefasst wird danach nur noch über
+    diese Gruppen, nicht über einzelne Punkte.
+    """
+    params = {"date_from": date_from, "date_to": date_to}
+    tests = [dict(row, students=0, average=None, grades={}) for row in conn.execute(
+        """
+        SELECT id, name, date FROM tests
+        WHERE date >= :date_from AND date <= :date_to
+        ORDER BY date, id
+        """,
+        params
+    )]
+    by_test = {test["id"]: test for test in tests}
+
+    percents = {}
+    totals = {}
+    for test_id, percent, grade, label in conn.execute(
+        "WITH " + GRADED_CTE.format(where="date >= :date_from AND date <= :date_to")
+        + "SELECT test_id, percent, grade, label FROM grades",
+        params
+    ):
+        test = by_test[test_id]
+        test["students"] += 1
+        test["grades"][grade] = test["grades"].get(grade, 0) + 1
+        if percent is not None:  # None: Test ohne Punkte
+            total = percents.setdefault(test_id, [0.0, 0])
+            total[0] += percent
+            total[1] += 1
+        entry = totals.setdefault(grade, {"grade": grade, "label": label, "count": 0})
+        entry["count"] += 1
+    for test_id, (total, count) in percents.items():
+        by_test[test_id]["average"] = total / count
+
+    # Lösungsquoten: (erreicht, möglich) pro Frage eines Tests, dann aufsummiert
+    difficulties = {}
+    topics = {}
+    questions = {}
+    for question_id, topic_id, difficulty, scores, points, possible in conn.execute(
+        """
+        WITH per_question AS (
+            SELECT test_id, question_id, COUNT(*) AS scores, TOTAL(score) AS points
+            FROM results
+            WHERE test_id IN (
+                SELECT id FROM tests WHERE date >= :date_from AND date <= :date_to
+            )
+            GROUP BY test_id, question_id
+        )
+        SELECT q.id, q.topic_id, q.difficulty, p.scores, p.points,
+               p.scores * COALESCE(tq.points_override, q.points, 1)
+        FROM per_question p
+        JOIN test_questions tq ON tq.test_id = p.test_id AND tq.question_id = p.question_id
+        JOIN questions q ON q.id = p.question_id
+        """,
+        params
+    ):
+        for groups, key in ((difficulties, difficulty), (topics, topic_id),
+                            (questions, question_id)):
+            entry = groups.setdefault(key, [0, 0.0, 0.0])
+            entry[0] += scores
+            entry[1] += points
+            entry[2] += possible
+
+    def rates(groups, key_name, min_scores=1):
+        rows = [
+            {key_name: key, "scores": scores, "solved": points / possible}
+            for key, (scores, points, possible) in groups.items()
+            if possible and scores >= min_scores
+        ]
+        return sorted(rows, key=lambda row: (row["solved"], row[key_name]))[:limit]
+
+    hardest_topics = rates(topics, "topic_id")
+    hardest_questions = rates(questions, "id", min_scores=5)
+    names = dict(conn.execute(
+        "SELECT id, name FROM topics WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps([row["topic_id"] for row in hardest_topics]),)
+    ).fetchall())
+    details = {row["id"]: row for row in conn.execute(
+        "SELECT id, text, difficulty FROM questions WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps([row["id"] for row in hardest_questions]),)
+    )}
+    for row in hardest_topics:
+        row["topic_name"] = names.get(row["topic_id"])
+    for row in hardest_questions:
+        row["text"] = details[row["id"]]["text"]
+        row["difficulty"] = details[row["id"]]["difficulty"]
+
+    return {
+        "tests": tests,
+        "grades": [totals[grade] for grade in sorted(totals, key=lambda g: (g is None, g))],
+        "difficulties": [
+            {"difficulty": key, "scores": scores, "solved": points / possible}
+            for key, (scores, points, possible) in sorted(
+                difficulties.items(), key=lambda item: (item[0] is None, item[0]))
+            if possible
+        ],
+        "topics": hardest_topics,
+        "questions": hardest_questions,
+    }
@@ -0,0 +1,139 @@
+"""Volltextsuche im Fragenpool über den FTS5-Index ``questions_fts``."""
+import re
+
+from markupsafe import Markup, escape
+
+# Steuerzeichen als Markierung im snippet(), werden erst nach dem Escapen zu <mark>
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Umschreibungen, die der Tokenizer nicht selbst faltet
+_UMLAUT_SPELLINGS = (("ae", "ä"), ("oe", "ö"), ("ue", "ü"))
+
+
+def _variants(word):
+    """Schreibvarianten eines Suchworts (oel -> öl, strasse <-> straße)."""
+    word = word.lower()
+    variants = {word}
+    spelled = word
+    for plain, umlaut in _UMLAUT_SPELLINGS:
+        spelled = spelled.replace(plain, umlaut)
+    variants.add(spelled)
+    variants.add(word.replace("ß", "ss"))
+    variants.add(word.replace("ss", "ß"))
+    return sorted(variants)
+
+
+def build_match_query(text, prefix=False):
+    """Benutzereingabe in einen FTS5-MATCH-Ausdruck übersetzen.
+
+    Alle Wörter müssen vorkommen. Mit ``prefix=True`` wird das letzte Wort
+    als Präfix gesucht (Druck findet auch Druckventil, halb getippte Wörter
+    funktionieren). Präfixe sind deutlich teurer, weil FTS5 dann viele
+    Trefferlisten zusammenführen muss. Sonderzeichen der FTS5-Syntax werden
+    nicht interpretiert. Gibt None zurück, wenn kein Suchwort übrig bleibt.
+    """
+    words = _WORD_RE.findall(text)
+    terms = []
+    for i, word in enumerate(words):
+        star = "*" if prefix and i == len(words) - 1 else ""
+        options = " OR ".join(
+            '"{}"{}'.format(v.replace('"', '""'), star) for v in _variants(word)
+        )
+        terms.append(f"({options})")
+    return " AND ".join(terms) or None
+
+
+def choose_match_query(conn, text, page_size):
+    """Exakte Wortsuche, wenn sie mindestens eine Seite füllt, sonst Präfixsuche.
+
+    Die Entscheidung hängt nur von der Eingabe ab, nicht von der Seite –
+    so bleibt die Reihenfolge beim Blättern stabil.
+    """
+    exact = build_match_query(text)
+    if exact is None:
+        return None
+    hits = conn.execute(
+        "SELECT COUNT(*) FROM questions_fts WHERE questions_fts MATCH ?",
+        (exact,)
+    ).fetchone()[0]
+    if hits >= page_size:
+        return exact
+    return build_match_query(text, prefix=True)
+
+
+def _highlight(snippet):
+    """Snippet escapen und die Treffer-Markierungen in <mark> umwandeln."""
+    html = str(escape(snippet or ""))
+    return Markup(html.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>"))
+
+
+def search_questions(conn, text, topic_id=None, page=1, page_size=20):
+    """Fragen nach Relevanz (bm25) sortiert suchen.
+
+    Archivierte Fragen werden mit gefunden (``is_active`` 0). Gibt
+    (treffer, has_next) zurück. Jeder Treffer ist ein Dict mit id, text,
+    topic_id, topic_name, difficulty, points, is_active und ``snippet``
+    (HTML mit <mark>).
+    """
+    match = choose_match_query(conn, text, page_size)
+    if match is None:
+        return [], False
+
+    offset = (max(page, 1) - 1) * page_size
+    # Ranking und LIMIT zuerst im FTS-Index (ORDER BY rank nutzt die bm25-
+    # Gewichtung aus der Migration), erst danach mit questions/topics joinen.
+    # Mit Themenfilter muss der Filter vor dem LIMIT greifen.
+    if topic_id is None:
+        source = """
+            SELECT rowid, rank FROM questions_fts
+            WHERE questions_fts MATCH :match
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        source = """
+            SELECT questions_fts.rowid, rank FROM questions_fts
+            JOIN questions ON questions.id = questions_fts.rowid
+            WHERE questions_fts MATCH :match AND questions.topic_id = :topic_id
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """
+
+    rows = conn.execute(
+        f"""
+        SELECT
+            q.id,
+            q.text,
+            q.topic_id,
+            q.difficulty,
+            q.points,
+            q.is_active,
+            t.name AS topic_name,
+            snippet(questions_fts, -1, :start, :end, '…', 16) AS snippet
+        FROM ({source}) AS hits
+        JOIN questions_fts ON questions_fts.rowid = hits.rowid
+        JOIN questions q ON q.id = hits.rowid
+        JOIN topics t ON t.id = q.topic_id
+        WHERE questions_fts MATCH :match
+        ORDER BY hits.rank, q.id
+        """,
+        {
+            "match": match,
+            "topic_id": topic_id,
+            "limit": page_size + 1,
+            "offset": offset,
+            "start": _MARK_START,
+            "end": _MARK_END,
+        }
+    ).fetchall()
+
+    has_next = len(rows) > page_size
+    results = []
+    for row in rows[:page_size]:
+        result = dict(row)
+        result["snippet"] = _highlight(row["snippet"])
+        results.append(result)
+    return results, has_next
@@ -0,0 +1,313 @@
+"""Schreibgeschützte Momentaufnahmen der Datenbank für lesende Seiten.
+
+Vorschau und Fragenkatalog lesen nur. Mit ``READ_SNAPSHOTS=1`` lesen sie
+aus einer Kopie der Datenbank statt aus ``questions.db``: ein großer Import
+oder eine Massenlöschung verdrängt dann weder ihren Page-Cache, noch halten
+lange Druckseiten den Checkpoint des WAL auf.
+
+- ``publish()`` schreibt die Kopie über die Backup-API (konsistent, auch im
+  laufenden Betrieb) als neue Datei ``snapshot-<zeit>.db`` und setzt danach
+  den Zeiger ``current.json`` per Umbenennen um. Eine veröffentlichte Datei
+  wird nie mehr verändert.
+- Die App öffnet sie deshalb mit ``mode=ro&immutable=1``: keine Sperren,
+  keine Prüfung auf Änderungen, gelesen per mmap.
+- ``SnapshotReader`` merkt eine neue Fassung am Zeiger und legt dafür einen
+  neuen Pool an. Laufende Requests lesen ihre alte Datei zu Ende; sie wird
+  erst beim übernächsten Veröffentlichen gelöscht (unter Linux bleibt sie
+  für offene Verbindungen ohnehin lesbar).
+- ``SnapshotScheduler`` erneuert die Kopie alle ``SNAPSHOT_INTERVAL``
+  Sekunden, sofern sich die Datenbank geändert hat; von mehreren
+  gunicorn-Workern nur einer (Dateisperre ``publish.lock``).
+
+    python snapshots.py --db data/questions.db publish
+    python snapshots.py --db data/questions.db status
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import urllib.request
+
+try:
+    import fcntl
+except ImportError:  # nicht unter Linux: keine Sperre, jeder Prozess veröffentlicht
+    fcntl = None
+
+import archive
+import database
+from connection_pool import ConnectionPool, PoolClosed
+
+POINTER = "current.json"
+
+# So viele Dateien bleiben liegen (die aktuelle und die davor, für laufende Requests)
+KEEP = 2
+
+# Pragmas der Lese-Verbindungen: nur lesen, ganze Datei per mmap
+SNAPSHOT_PRAGMAS = {
+    "query_only": "ON",
+    "cache_size": -16000,
+    "temp_store": "MEMORY",
+}
+
+
+def source_state(db_path):
+    """Änderungsstand der Quelldatei (mtime von DB und WAL) zum Vergleich beim nächsten Lauf."""
+    state = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            state.append(None)
+        else:
+            state.append([st.st_mtime_ns, st.st_size])
+    return state
+
+
+def read_pointer(snapshot_dir):
+    """Inhalt von ``current.json`` (file, published, source) oder None."""
+    try:
+        with open(os.path.join(snapshot_dir, POINTER), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def publish(db_path, snapshot_dir, keep=KEEP):
+    """Neue Momentaufnahme schreiben und zur aktuellen machen. Gibt den Pfad zurück."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    # Vor dem Kopieren festhalten: eine Änderung währenddessen gilt beim
+    # nächsten Lauf als neu (lieber eine Kopie zu viel als eine fehlende)
+    source = source_state(db_path)
+    name = f"snapshot-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}.db"
+    path = archive.snapshot(db_path, os.path.join(snapshot_dir, name))
+
+    pointer = os.path.join(snapshot_dir, POINTER)
+    tmp = f"{pointer}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"file": name, "published": time.time(), "source": source}, f)
+    os.replace(tmp, pointer)
+
+    prune(snapshot_dir, keep)
+    return path
+
+
+def prune(snapshot_dir, keep=KEEP):
+    """Alte Momentaufnahmen löschen, die neuesten ``keep`` bleiben."""
+    names = sorted(name for name in os.listdir(snapshot_dir)
+                   if name.startswith("snapshot-") and name.endswith(".db"))
+    for name in names[:-keep]:
+        try:
+            os.remove(os.path.join(snapshot_dir, name))
+        except FileNotFoundError:
+            pass
+
+
+def is_stale(db_path, snapshot_dir):
+    """True, wenn es keine Momentaufnahme gibt oder sich die Datenbank seitdem geändert hat."""
+    pointer = read_pointer(snapshot_dir)
+    return pointer is None or pointer.get("source") != source_state(db_path)
+
+
+class Snapshot:
+    """Eine veröffentlichte Momentaufnahme: Datei, Zeitpunkt und ihr Verbindungspool."""
+
+    def __init__(self, key, path, published, pool):
+        self.key = key
+        self.path = path
+        self.published = published
+        self.pool = pool
+
+
+class SnapshotReader:
+    """Verbindungen zur jeweils neuesten Momentaufnahme.
+
+    ``current()`` prüft den Zeiger (ein ``stat`` pro Aufruf) und tauscht
+    bei einer neuen Fassung den Pool aus. Der alte Pool wird geschlossen:
+    freie Verbindungen sofort, benutzte bei ihrer Rückgabe.
+    """
+
+    def __init__(self, snapshot_dir, max_size=8, timeout=10.0,
+                 mmap_size=256 * 1024 * 1024, factory=None):
+        self.snapshot_dir = snapshot_dir
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(SNAPSHOT_PRAGMAS, mmap_size=mmap_size)
+        self.factory = factory
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._swaps = 0
+
+    def _pointer_key(self):
+        try:
+            st = os.stat(os.path.join(self.snapshot_dir, POINTER))
+        except FileNotFoundError:
+            return None
+        # os.replace erzeugt jedes Mal eine neue Datei (neue Inode)
+        return (st.st_ino, st.st_mtime_ns)
+
+    def current(self):
+        """Aktuelle Momentaufnahme oder None (keine vorhanden, anderer Schemastand)."""
+        key = self._pointer_key()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.key == key:
+            return snapshot if snapshot.pool is not None else None
+        if key is None:
+            return None
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.key != key:
+                old, snapshot = snapshot, self._open(key)
+                self._snapshot = snapshot
+                self._swaps += 1
+                if old is not None and old.pool is not None:
+                    old.pool.close()
+        return snapshot if snapshot.pool is not None else None
+
+    def acquire(self):
+        """(Verbindung, Momentaufnahme) der aktuellen Fassung oder None.
+
+        Zwischen ``current()`` und dem Ausleihen kann ein Veröffentlichen den
+        Pool austauschen und schließen (oder die Datei schon aufräumen); dann
+        gilt eben die neue Fassung. Der geschlossene Pool schließt ausgeliehene
+        Verbindungen erst bei ihrer Rückgabe, laufende Requests lesen also zu
+        Ende. Klappt es nach mehreren Versuchen nicht, liest der Request aus
+        der Datenbank.
+        """
+        for _ in range(3):
+            snapshot = self.current()
+            if snapshot is None:
+                return None
+            try:
+                return snapshot.pool.acquire(), snapshot
+            except (PoolClosed, sqlite3.OperationalError):
+                continue
+        return None
+
+    def _open(self, key):
+        pointer = read_pointer(self.snapshot_dir)
+        path = os.path.join(self.snapshot_dir, pointer["file"]) if pointer else None
+        if path is None or not os.path.exists(path):
+            return Snapshot(key, path, None, None)
+
+        uri = ("file:" + urllib.request.pathname2url(os.path.abspath(path))
+               + "?mode=ro&immutable=1")
+        pool = ConnectionPool(uri, max_size=self.max_size, timeout=self.timeout,
+                              pragmas=self.pragmas, factory=self.factory, uri=True)
+        # Kopie von vor einem Update: Abfragen passen nicht zum Schema, nicht benutzen
+        with pool.connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != database.SCHEMA_VERSION:
+            pool.close()
+            pool = None
+        return Snapshot(key, path, pointer["published"], pool)
+
+    def stats(self):
+        snapshot = self._snapshot
+        pool = snapshot.pool if snapshot is not None else None
+        return {
+            "file": os.path.basename(snapshot.path) if snapshot and snapshot.path else None,
+            "published": snapshot.published if snapshot else None,
+            "usable": pool is not None,
+            "swaps": self._swaps,
+            "pool": pool.stats() if pool is not None else None,
+        }
+
+    def close(self):
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.pool is not None:
+            snapshot.pool.close()
+
+
+class SnapshotScheduler:
+    """Veröffentlicht regelmäßig eine neue Momentaufnahme, wenn sich die Datenbank geändert hat."""
+
+    def __init__(self, db_path, snapshot_dir, interval):
+        self.db_path = db_path
+        self.snapshot_dir = snapshot_dir
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="snapshot-scheduler",
+                                            daemon=True)
+            self._thread.start()
+
+    def _have_lock(self):
+        if fcntl is None or self._lock_file is not None:
+            return True
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        f = open(os.path.join(self.snapshot_dir, "publish.lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        return True
+
+    def due(self):
+        """Sekunden bis zur nächsten fälligen Kopie (0 = jetzt)."""
+        pointer = read_pointer(self.snapshot_dir)
+        if pointer is None:
+            return 0
+        return max(0.0, pointer["published"] + self.interval - time.time())
+
+    def _loop(self):
+        while not self._stop.is_set():
+            wait = self.interval
+            try:
+                if self._have_lock():
+                    wait = self.due()
+                    if wait == 0:
+                        if is_stale(self.db_path, self.snapshot_dir):
+                            publish(self.db_path, self.snapshot_dir)
+                        wait = self.interval
+            except Exception:
+                traceback.print_exc()
+            self._stop.wait(max(wait, 1.0))
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    parser.add_argument("--dir", help="Ordner der Momentaufnahmen (Standard: snapshots/ neben der DB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("publish", help="jetzt eine neue Momentaufnahme veröffentlichen")
+    sub.add_parser("status", help="aktuelle Momentaufnahme anzeigen")
+    args = parser.parse_args(argv)
+
+    snapshot_dir = args.dir or os.path.join(os.path.dirname(os.path.abspath(args.db)),
+                                            "snapshots")
+    if args.command == "publish":
+        start = time.perf_counter()
+        path = publish(args.db, snapshot_dir)
+        print(f"Veröffentlicht: {path} ({os.path.getsize(path) / 1e6:.1f} MB, "
+              f"{time.perf_counter() - start:.1f} s)")
+    else:
+        pointer = read_pointer(snapshot_dir)
+        if pointer is None:
+            print("Noch keine Momentaufnahme.")
+            return
+        published = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(pointer["published"]))
+        changed = "ja" if is_stale(args.db, snapshot_dir) else "nein"
+        print(f"{pointer['file']} vom {published}; Datenbank seitdem geändert: {changed}")
+
+
+if __name__ == "__main__":
+    main()
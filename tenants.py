@@ -0,0 +1,285 @@
+"""Mandanten: mehrere Schulen oder Fachgruppen auf einer Instanz.
+
+Jeder Mandant hat einen eigenen Ordner unter ``TENANTS_DIR`` mit eigener
+``questions.db`` (dazu history.db, jobs.db und PDF-Cache). Schreibt eine
+Fachgruppe (Import, Massenlöschung), hält sie nur die Sperre ihrer eigenen
+Datei; die anderen arbeiten ungestört weiter, und jede Datei wächst nur mit
+den eigenen Fragen.
+
+Welcher Mandant gemeint ist, bestimmt ``TENANT_MODE``:
+
+- ``path``: erster Teil des Pfads, ``/elektro/tests`` → Mandant ``elektro``.
+  Der Präfix wandert nach ``SCRIPT_NAME``, ``url_for`` erzeugt damit alle
+  Links samt Präfix.
+- ``subdomain``: erster Teil des Hostnamens, ``elektro.schule.local``.
+
+Pro Mandant gibt es eine eigene Flask-App (Verbindungspool, Vorschau-Cache,
+Aufträge), angelegt beim ersten Request an ihn. Neue Mandanten legt nur die
+Kommandozeile an, ein Tippfehler in der URL erzeugt also keine Datenbank.
+
+Gemeinsame Fragenbank: ``publish-common`` kopiert die Datenbank eines
+Mandanten (SQLite-Backup-API) nach ``COMMON_DB_PATH``. Alle Mandanten sehen
+sie unter "Gemeinsame Fragen" nur lesend (``mode=ro``) und können Fragen
+daraus in die eigene Bank übernehmen.
+
+    python tenants.py create elektro
+    python tenants.py list
+    python tenants.py migrate
+    python tenants.py publish-common elektro
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import urllib.request
+from contextlib import contextmanager
+from html import escape
+
+import config
+import database
+
+# Kleinbuchstaben, Ziffern, Bindestrich: gültig als Ordnername und Subdomain
+TENANT_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9-]{0,39}$")
+
+
+def tenant_dir(tenants_dir, name):
+    return os.path.join(tenants_dir, name)
+
+
+def tenant_db_path(tenants_dir, name):
+    return os.path.join(tenant_dir(tenants_dir, name), "questions.db")
+
+
+def list_tenants(tenants_dir):
+    """Namen aller angelegten Mandanten (Ordner mit questions.db), sortiert."""
+    if not os.path.isdir(tenants_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(tenants_dir)
+        if TENANT_NAME_RE.match(name) and os.path.exists(tenant_db_path(tenants_dir, name))
+    )
+
+
+def create_tenant(tenants_dir, name):
+    """Ordner und Datenbank eines neuen Mandanten anlegen. Gibt den DB-Pfad zurück."""
+    if not TENANT_NAME_RE.match(name):
+        raise ValueError(f"Ungültiger Name {name!r}: nur a-z, 0-9 und -, höchstens 40 Zeichen")
+    path = tenant_db_path(tenants_dir, name)
+    if os.path.exists(path):
+        raise ValueError(f"Mandant {name!r} gibt es schon.")
+    database.init_db(path)
+    return path
+
+
+def migrate_all(tenants_dir):
+    """Alle Mandanten migrieren. Gibt {Mandant: angewendete Versionen} zurück (nur geänderte)."""
+    applied = {}
+    for name in list_tenants(tenants_dir):
+        versions = database.init_db(tenant_db_path(tenants_dir, name))
+        if versions:
+            applied[name] = versions
+    return applied
+
+
+def tenant_settings(settings, name):
+    """Overrides für die App eines Mandanten: eigene Dateien, gemeinsame Einstellungen."""
+    folder = tenant_dir(settings["TENANTS_DIR"], name)
+    return {
+        "TENANT_MODE": "",
+        "TENANT": name,
+        "DB_PATH": os.path.join(folder, "questions.db"),
+        "HISTORY_DB_PATH": os.path.join(folder, "history.db"),
+        "JOBS_DB_PATH": os.path.join(folder, "jobs.db"),
+        "PDF_CACHE_DIR": os.path.join(folder, "pdf-cache"),
+        "SNAPSHOT_DIR": os.path.join(folder, "snapshots"),
+        "TEMPLATE_CACHE_DIR": settings["TEMPLATE_CACHE_DIR"],
+        "COMMON_DB_PATH": settings["COMMON_DB_PATH"],
+        # Ein Schlüssel für alle: das Session-Cookie gilt für den ganzen Host
+        "SECRET_KEY": settings["SECRET_KEY"],
+    }
+
+
+class TenantDispatcher:
+    """WSGI-App für ``TENANT_MODE``: reicht jeden Request an die App seines Mandanten weiter.
+
+    ``make_app(overrides)`` erzeugt die App eines Mandanten (``app.create_app``).
+    """
+
+    def __init__(self, settings, make_app):
+        self.settings = settings
+        self.mode = settings["TENANT_MODE"]
+        self.tenants_dir = settings["TENANTS_DIR"]
+        self.make_app = make_app
+        self.apps = {}
+        self._lock = threading.Lock()
+
+    def route(self, environ):
+        """(Mandant, environ für dessen App). Im Pfad-Modus wandert der Präfix nach SCRIPT_NAME."""
+        if self.mode == "subdomain":
+            host = environ.get("HTTP_HOST") or environ.get("SERVER_NAME", "")
+            return host.split(":")[0].split(".")[0].lower(), environ
+
+        name, _, rest = environ.get("PATH_INFO", "").lstrip("/").partition("/")
+        environ = dict(environ,
+                       SCRIPT_NAME=environ.get("SCRIPT_NAME", "").rstrip("/") + "/" + name,
+                       PATH_INFO="/" + rest)
+        return name, environ
+
+    def get_app(self, name):
+        """App des Mandanten (beim ersten Aufruf angelegt) oder None, wenn es ihn nicht gibt."""
+        app = self.apps.get(name)
+        if app is not None:
+            return app
+        if not TENANT_NAME_RE.match(name) or not os.path.exists(
+                tenant_db_path(self.tenants_dir, name)):
+            return None
+        with self._lock:
+            app = self.apps.get(name)
+            if app is None:
+                app = self.apps[name] = self.make_app(tenant_settings(self.settings, name))
+        return app
+
+    def __call__(self, environ, start_response):
+        name, tenant_environ = self.route(environ)
+        app = self.get_app(name)
+        if app is None:
+            return self.not_found(environ, start_response)
+        return app(tenant_environ, start_response)
+
+    def not_found(self, environ, start_response):
+        """Unbekannter Mandant: 404 mit der Liste der vorhandenen (im Pfad-Modus als Links)."""
+        script_root = environ.get("SCRIPT_NAME", "").rstrip("/")
+        items = "".join(
+            f'<li><a href="{escape(script_root)}/{name}/">{name}</a></li>'
+            if self.mode == "path" else f"<li>{name}</li>"
+            for name in list_tenants(self.tenants_dir)
+        )
+        body = (f'<!doctype html><html lang="de"><meta charset="utf-8">'
+                f"<title>Testgenerator</title><h1>Testgenerator</h1>"
+                f"<p>Unbekannter Mandant.</p><ul>{items}</ul></html>").encode("utf-8")
+        start_response("404 NOT FOUND", [("Content-Type", "text/html; charset=utf-8"),
+                                         ("Content-Length", str(len(body)))])
+        return [body]
+
+    def shutdown(self):
+        """Aufträge, PDF-Prozesse und Verbindungen aller angelegten Apps beenden."""
+        for app in self.apps.values():
+            app.job_runner.shutdown()
+            if app.snapshot_scheduler is not None:
+                app.snapshot_scheduler.shutdown()
+            app.pdf_exporter.shutdown()
+            app.db_pool.close()
+
+
+# --- Gemeinsame Fragenbank -------------------------------------------------
+
+@contextmanager
+def common_bank(conn, path):
+    """Gemeinsame Fragenbank für die Dauer des Blocks als Schema ``common`` anhängen.
+
+    Nur lesend (URI ``mode=ro``). Angehängt wird pro Request statt pro
+    Verbindung: eine neu veröffentlichte Fassung gilt sofort, ohne Neustart.
+    Liefert False, wenn keine Bank eingerichtet oder veröffentlicht ist.
+    """
+    if not path or not os.path.exists(path):
+        yield False
+        return
+    uri = "file:" + urllib.request.pathname2url(os.path.abspath(path)) + "?mode=ro"
+    conn.execute("ATTACH DATABASE ? AS common", (uri,))
+    try:
+        yield True
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("DETACH DATABASE common")
+
+
+def copy_from_common(conn, question_ids):
+    """Fragen aus der gemeinsamen Bank in die eigene übernehmen (``common`` angehängt).
+
+    Themen werden über den Namen zugeordnet und bei Bedarf angelegt. Fragen,
+    die es im Thema mit gleichem Text schon gibt, werden übersprungen. Gibt
+    die Anzahl übernommener Fragen zurück.
+    """
+    ids = json.dumps(question_ids)
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO main.topics (name, description)
+            SELECT DISTINCT t.name, t.description
+            FROM common.questions q
+            JOIN common.topics t ON t.id = q.topic_id
+            WHERE q.id IN (SELECT value FROM json_each(?))
+            ON CONFLICT (name) DO NOTHING
+            """,
+            (ids,)
+        )
+        return conn.execute(
+            """
+            INSERT INTO main.questions (text, topic_id, difficulty, points, solution)
+            SELECT q.text, mt.id, q.difficulty, q.points, q.solution
+            FROM common.questions q
+            JOIN common.topics ct ON ct.id = q.topic_id
+            JOIN main.topics mt ON mt.name = ct.name
+            WHERE q.id IN (SELECT value FROM json_each(?))
+              AND NOT EXISTS (
+                  SELECT 1 FROM main.questions m
+                  WHERE m.topic_id = mt.id AND m.text = q.text
+              )
+            ORDER BY q.id
+            """,
+            (ids,)
+        ).rowcount
+
+
+def publish_common(tenants_dir, name, target):
+    """Datenbank des Mandanten ``name`` als gemeinsame Fragenbank veröffentlichen."""
+    import archive
+
+    source = tenant_db_path(tenants_dir, name)
+    if not os.path.exists(source):
+        raise ValueError(f"Mandant {name!r} nicht gefunden.")
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    # Kopie wird erst am Ende an ihren Platz umbenannt: laufende Requests
+    # lesen die alte Fassung zu Ende, neue sehen die neue
+    return archive.snapshot(source, target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    settings = config.from_env()
+    parser.add_argument("--tenants-dir", default=settings["TENANTS_DIR"],
+                        help="Ordner der Mandanten (Standard: TENANTS_DIR)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create", help="neuen Mandanten anlegen")
+    create.add_argument("name")
+    sub.add_parser("list", help="Mandanten auflisten")
+    sub.add_parser("migrate", help="alle Mandanten auf den aktuellen Schemastand bringen")
+    publish = sub.add_parser("publish-common", help="gemeinsame Fragenbank erneuern")
+    publish.add_argument("name", help="Mandant, dessen Fragen veröffentlicht werden")
+    publish.add_argument("--out", default=settings["COMMON_DB_PATH"] or os.path.join(
+        settings["TENANTS_DIR"], "common.db"), help="Zieldatei (Standard: COMMON_DB_PATH)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "create":
+            print(f"Mandant {args.name} angelegt: {create_tenant(args.tenants_dir, args.name)}")
+        elif args.command == "list":
+            for name in list_tenants(args.tenants_dir):
+                print(name)
+        elif args.command == "migrate":
+            applied = migrate_all(args.tenants_dir)
+            for name, versions in applied.items():
+                print(f"{name}: Migrationen {', '.join(map(str, versions))}")
+            print(f"{len(list_tenants(args.tenants_dir))} Mandanten geprüft, "
+                  f"{len(applied)} migriert.")
+        else:
+            path = publish_common(args.tenants_dir, args.name, args.out)
+            print(f"Gemeinsame Fragenbank aus {args.name} veröffentlicht: {path}")
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Gruppen-Varianten (A/B/C …) eines Tests in einem Durchgang erzeugen.
+
+Jede Variante ist ein eigener Test mit denselben Fragen in gemischter
+Reihenfolge. Optional wird jede Frage durch eine gleichwertige ersetzt
+(gleiches Thema, gleiche Schwierigkeit, gleiche Punkte), damit sich
+Nachbarn nicht nur in der Reihenfolge unterscheiden.
+
+Die Mischung ist reproduzierbar: Variante i hängt nur von ``seed`` und i ab,
+nicht von der Anzahl der Varianten.
+
+    python variants.py --test 3 --count 4 --seed 2025 --substitute
+"""
+import argparse
+import random
+import sqlite3
+import time
+from collections import defaultdict
+
+import assignments
+import database
+import generator
+
+# Obergrenze pro Aufruf (Formular und CLI)
+MAX_VARIANTS = 500
+
+
+def variant_label(index):
+    """0 -> A, 25 -> Z, 26 -> AA, 27 -> AB … (wie Tabellenspalten)."""
+    label = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        label = chr(ord("A") + rest) + label
+    return label
+
+
+def equivalent_groups(pool):
+    """{(thema, schwierigkeit, punkte): [fragen-ids]} aus dem Fragenpool."""
+    groups = defaultdict(list)
+    for (topic_id, difficulty), cell in pool.cells.items():
+        for qid in cell:
+            groups[(topic_id, difficulty, pool.points[qid])].append(qid)
+    return groups
+
+
+def _pick_unused(options, used, rnd, tries=8):
+    """Zufällige Frage aus ``options``, die nicht in ``used`` ist (oder None).
+
+    Meist genügen wenige Zufallsgriffe; nur bei fast ausgeschöpften Gruppen
+    wird die Liste gefiltert.
+    """
+    for _ in range(tries):
+        candidate = rnd.choice(options)
+        if candidate not in used:
+            return candidate
+    remaining = [qid for qid in options if qid not in used]
+    return rnd.choice(remaining) if remaining else None
+
+
+def shuffle_variant(question_ids, rnd, pool=None, groups=None):
+    """Eine Variante: Fragen ggf. ersetzen, dann Reihenfolge mischen."""
+    ids = list(question_ids)
+    if groups is not None:
+        used = set(ids)
+        for i, qid in enumerate(ids):
+            if qid not in pool.points:
+                continue  # inaktive Frage: bleibt unverändert
+            key = (pool.topic_of[qid], pool.difficulty_of[qid], pool.points[qid])
+            replacement = _pick_unused(groups[key], used, rnd)
+            if replacement is not None:
+                used.add(replacement)
+                ids[i] = replacement
+    rnd.shuffle(ids)
+    return ids
+
+
+def create_variants(conn, test_id, count, seed=None, substitute=False):
+    """``count`` Varianten des Tests anlegen (eine Transaktion, executemany).
+
+    Namen: "<Testname> – Gruppe A", "… – Gruppe B" usw.; Datum, Notizen und
+    Notenschlüssel wie im Ausgangstest. Gibt die Liste der neuen Tests als Dicts mit ``id``, ``name`` und ``question_ids`` zurück.
+    """
+    if not 1 <= count <= MAX_VARIANTS:
+        raise ValueError(f"Die Anzahl der Varianten muss zwischen 1 und {MAX_VARIANTS} liegen.")
+
+    test = conn.execute(
+        "SELECT id, name, date, notes, grading_scale_id FROM tests WHERE id = ?",
+        (test_id,)
+    ).fetchone()
+    if test is None:
+        raise ValueError("Test nicht gefunden.")
+
+    question_ids = assignments.load_assignment(conn, test_id)
+    if not question_ids:
+        raise ValueError("Der Test enthält noch keine Fragen.")
+
+    pool = groups = None
+    if substitute:
+        pool = generator.get_pool(conn)
+        groups = equivalent_groups(pool)
+
+    base_seed = test_id if seed is None else seed
+    variants = []
+    for i in range(count):
+        # String-Seed: reproduzierbar und unabhängig von der Anzahl
+        rnd = random.Random(f"{base_seed}:{i}")
+        variants.append({
+            "name": f"{test['name']} – Gruppe {variant_label(i)}",
+            "question_ids": shuffle_variant(question_ids, rnd, pool, groups),
+        })
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # IDs vorab vergeben, damit alle Tests in einem executemany Platz haben
+        first_id = database.next_id(conn, "tests")
+        for offset, variant in enumerate(variants):
+            variant["id"] = first_id + offset
+
+        conn.executemany(
+            """
+            INSERT INTO tests (id, name, date, notes, grading_scale_id)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [(v["id"], v["name"], test["date"], test["notes"], test["grading_scale_id"])
+             for v in variants]
+        )
+        conn.executemany(
+            """
+            INSERT INTO test_questions (test_id, question_id, position)
+            VALUES (?, ?, ?)
+            """,
+            [
+                (v["id"], qid, pos)
+                for v in variants
+                for pos, qid in enumerate(v["question_ids"], start=1)
+            ]
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    return variants
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gruppen-Varianten eines Tests erzeugen.")
+    parser.add_argument("--db", default=database.DB_PATH, help="Pfad zur SQLite-Datenbank")
+    parser.add_argument("--test", type=int, required=True, help="ID des Ausgangstests")
+    parser.add_argument("--count", type=int, default=2, help="Anzahl Varianten (Standard: 2)")
+    parser.add_argument("--seed", type=int, help="Startwert für reproduzierbare Mischung")
+    parser.add_argument("--substitute", action="store_true",
+                        help="Fragen durch gleichwertige ersetzen (Thema, Schwierigkeit, Punkte)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.row_factory = sqlite3.Row
+    try:
+        start = time.perf_counter()
+        variants = create_variants(conn, args.test, args.count, args.seed, args.substitute)
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.close()
+
+    for variant in variants:
+        print(f"{variant['id']:>6}  {variant['name']}")
+    print(f"{len(variants)} Varianten in {elapsed * 1000:.0f} ms angelegt.")
+
+
+if __name__ == "__main__":
+    main()